@@ -1,28 +1,20 @@
 #Python code
 from codrone_edu.drone import *
-import time
+from fast_drone import FastDrone
 
-drone = Drone()
+drone = FastDrone()
 drone.pair()
 
 
 dataset = "custom_color_data"
 colors = ["blue", "green", "pink", "yellow",  ]
 for color in colors:
-    data = []
     samples = 500
     for i in range(1):
         print("Sample: ", i+1)
         next = input("Press enter to calibrate " + color)
-        print("0% ", end="")
-        for j in range(samples):
-            color_data = drone.get_color_data()[0:9]
-            data.append(color_data)
-            time.sleep(0.005)
-            if j % 10 == 0:
-                print("-", end="")
-        print(" 100%")
-    drone.new_color_data(color, data, dataset)
+        # samples go straight to custom_color_data/<color>.bin as they are read
+        drone.capture_color_data(color, dataset, samples, append=i > 0)
 print("Done calibrating.")
 
 
@@ -0,0 +1,285 @@
+#Python code
+import asyncio
+
+import serial
+from serial.tools.list_ports import comports
+from codrone_edu.drone import *
+
+from fast_drone import FastDrone, CONNECT_REQUESTS
+from telemetry import TELEMETRY
+
+
+class AsyncDrone(FastDrone):
+    """
+    FastDrone for asyncio programs: no receive thread, and every command is awaitable.
+
+    The serial port is read by an event loop callback (loop.add_reader, or a
+    polling task where the loop has none), so replies are decoded on the loop
+    itself. Commands run the library's swarm/emscripten coroutine bodies, which
+    await asyncio.sleep instead of blocking in time.sleep; telemetry getters
+    return as soon as the reply is handled. Monitoring tasks then keep running
+    while the drone flies:
+
+        drone = AsyncDrone()
+        await drone.pair()
+        await drone.takeoff()
+        await asyncio.gather(drone.move_forward(50), watch_range(drone))
+        await drone.aclose()
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._loop = None
+        self._poller = None
+        self._reader_fd = None
+        self._waiters = {}  # (DataType, DeviceType) -> futures, oldest first, one resolved per reply from that device
+        # swarm mode makes the library hand out tasks of its coroutine bodies
+        kwargs["swarm"] = True
+        super().__init__(*args, **kwargs)
+
+    # --- Connection ---
+    async def open(self, portname=None):
+        """Opens the controller's port, starts reading it on the running loop and checks the drone is there."""
+        if portname is None:
+            for item in comports():
+                if item.vid == 1155:
+                    portname = item.device
+                    print(Fore.GREEN + "Detected CoDrone EDU controller at port {0}".format(portname) + Style.RESET_ALL)
+                    break
+
+        try:
+            # timeout=0 makes reads return whatever is waiting, so the loop never blocks on the port
+            self._serialport = serial.Serial(port=portname, baudrate=57600, timeout=0)
+        except (serial.SerialException, ValueError) as e:
+            self._printError("Could not connect to device.")
+            print(Fore.RED + "Could not connect to CoDrone EDU controller. {0}".format(e) + Style.RESET_ALL)
+            return False
+
+        self.attach(self._serialport)
+        self._printLog("Connected.({0})".format(portname))
+
+        for i in range(10):
+            await self.request(DataType.State, 0.1)
+            if self.state_data[2] is ModeFlight.Ready:
+                break
+
+        if self.state_data[2] is not ModeFlight.Ready:
+            print(Fore.RED + "Could not connect to CoDrone EDU. "
+                             "Check that the drone is on and paired to the controller." + Style.RESET_ALL)
+            print(Fore.YELLOW + "How to pair: https://youtu.be/kMJhf5ykLSo " + Style.RESET_ALL)
+            return True
+
+        await self.request_many(CONNECT_REQUESTS, 0.2)
+        if self.information_data[1] == ModelNumber.Drone_12_Drone_P1:
+            print(Fore.GREEN + "Connected to CoDrone EDU (JROTC ed.)." + Style.RESET_ALL)
+        else:
+            print(Fore.GREEN + "Connected to CoDrone EDU." + Style.RESET_ALL)
+        print(Fore.GREEN + "Battery = {0}%".format(self.state_data[6]) + Style.RESET_ALL)
+
+        # set the speed to medium level and disable the previous YPRT commands, as the library does
+        await self.speed_change(speed_level=2)
+        await self.sendControl(0, 0, 0, 0)
+        return True
+
+    def pair(self, portname=None):
+        return self.open(portname)
+
+    def connect(self, portname=None):
+        return self.open(portname)
+
+    def attach(self, serialport):
+        """Reads an already open port (anything with read/in_waiting/write) on the running loop."""
+        self._loop = asyncio.get_running_loop()
+        self._serialport = serialport
+        self._flagThreadRun = True
+        try:
+            self._loop.add_reader(serialport.fileno(), self._on_readable)
+            self._reader_fd = serialport.fileno()
+        except (AttributeError, NotImplementedError, ValueError, OSError):
+            # Windows' proactor loop and ports without a file descriptor
+            self._poller = asyncio.ensure_future(self._poll_port())
+
+    def _on_readable(self):
+        serialport = self._serialport
+        try:
+            data = serialport.read(serialport.in_waiting or 1)
+        except (serial.SerialException, OSError) as e:
+            self._printError("Serial read failed: {0}".format(e))
+            self._stop_reading()
+            return
+
+        if data:
+            self._bufferQueue.put(data)
+            self._chunk_read(data)
+            if self._flagCheckBackground:
+                self.check()
+
+    async def _poll_port(self, interval=0.001):
+        while self._flagThreadRun:
+            if self._serialport.in_waiting:
+                self._on_readable()
+            await asyncio.sleep(interval)
+
+    def _stop_reading(self):
+        self._flagThreadRun = False
+        if self._reader_fd is not None:
+            self._loop.remove_reader(self._reader_fd)
+            self._reader_fd = None
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+
+    def disconnect(self):
+        """Stops reading and closes the port; synchronous whether or not a loop is attached."""
+        if self._loop is None:
+            # never opened on a loop, e.g. from __del__
+            return super()._disconnect_desktop()
+        self.stop_telemetry()
+        self.stop_metrics_log()
+        self._stop_reading()
+        self.stop_capture()
+        self._printLog("Port Close.")
+        if self._serialport is not None and self._serialport.isOpen():
+            self._serialport.close()
+        self._loop = None
+
+    def close(self):
+        self.disconnect()
+
+    async def aclose(self):
+        """close() for coroutines: also lets the cancelled polling task finish before returning."""
+        self.disconnect()
+        await asyncio.sleep(0)
+
+    # --- Transfer ---
+    def _done(self, result):
+        """Writes are finished when they return; hand back an awaitable so the coroutine bodies can await them."""
+        future = self._loop.create_future() if self._loop is not None else asyncio.get_running_loop().create_future()
+        future.set_result(result)
+        return future
+
+    def transfer(self, header, data):
+        if self._serialport is None or not self._serialport.isOpen():
+            return self._done(None)
+
+        with self._transfer_lock:
+            dataArray = self.makeTransferDataArray(header, data)
+            self._serialport.write(dataArray)
+            self._printTransferData(dataArray)
+            self._frame_sent(header.dataType, dataArray)
+        return self._done(dataArray)
+
+    def sendRequest(self, deviceType, dataType):
+        if (not isinstance(deviceType, DeviceType)) or (not isinstance(dataType, DataType)):
+            return None
+        return self._done(self._send_frame(self._encoder.request(deviceType), dataType.value))
+
+    def sendControl(self, roll, pitch, yaw, throttle):
+        if ((not isinstance(roll, int)) or (not isinstance(pitch, int)) or (not isinstance(yaw, int)) or (
+                not isinstance(throttle, int))):
+            return None
+
+        self._control.roll = roll
+        self._control.pitch = pitch
+        self._control.yaw = yaw
+        self._control.throttle = throttle
+
+        return self._done(self._send_frame(self._encoder.control, roll, pitch, yaw, throttle))
+
+    def sendControlPosition(self, positionX, positionY, positionZ, velocity, heading, rotationalVelocity):
+        for value in (positionX, positionY, positionZ, velocity):
+            if not (isinstance(value, float) or isinstance(value, int)):
+                return None
+
+        if (not isinstance(heading, int)) or (not isinstance(rotationalVelocity, int)):
+            return None
+
+        return self._done(self._send_frame(self._encoder.control_position,
+                                           positionX, positionY, positionZ, velocity, heading, rotationalVelocity))
+
+    # --- Requests ---
+    def _handler(self, header, dataArray):
+        dataType = super()._handler(header, dataArray)
+        waiters = self._waiters.get((dataType, header.from_))
+        # one reply answers one request: a second waiter for the same data waits for its own reply
+        while waiters:
+            future = waiters.pop(0)
+            if not future.done():
+                future.set_result(True)
+                break
+        return dataType
+
+    async def request(self, dataType, timeout=None, deviceType=DeviceType.Drone):
+        """
+        Requests dataType and returns as soon as the reply is handled.
+
+        :param timeout: seconds to wait for the reply, defaults to request_timeout
+        :return: True if the reply arrived before the timeout
+        """
+        key = (dataType, deviceType)
+        future = self._loop.create_future()
+        self._waiters.setdefault(key, []).append(future)
+        if self._send_frame(self._encoder.request(deviceType), dataType.value) is None:
+            self._waiters[key].remove(future)
+            return False
+
+        try:
+            return await asyncio.wait_for(future, self.request_timeout if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            waiters = self._waiters.get(key, [])
+            if future in waiters:
+                waiters.remove(future)
+            return False
+
+    async def request_many(self, requests, timeout=None):
+        """Sends every request back to back and waits for all replies; dict of DataType -> arrived."""
+        pairs = [request if isinstance(request, tuple) else (DeviceType.Drone, request) for request in requests]
+        results = await asyncio.gather(*(self.request(dataType, timeout, deviceType) for deviceType, dataType in pairs))
+        arrived = {}
+        for (deviceType, dataType), result in zip(pairs, results):
+            arrived[dataType] = arrived.get(dataType, True) and result
+        return arrived
+
+    # --- Telemetry ---
+    def _start_telemetry_scheduler(self):
+        self._telemetry.start_async()
+
+    async def _get_telemetry(self, dataType, delay, max_age_ms):
+        data = getattr(self, TELEMETRY[dataType])
+
+        if max_age_ms is None:
+            max_age_ms = self._max_age_ms.get(dataType)
+        if max_age_ms is not None and self.data_age_ms(dataType) <= max_age_ms:
+            return data
+
+        await self.request(dataType, max(delay, self.request_timeout))
+        return data
+
+    def get_altitude_data(self, delay=0.01, max_age_ms=None):
+        return self._get_telemetry(DataType.Altitude, delay, max_age_ms)
+
+    def get_range_data(self, delay=0.01, max_age_ms=None):
+        return self._get_telemetry(DataType.Range, delay, max_age_ms)
+
+    def get_position_data(self, delay=0.01, max_age_ms=None):
+        return self._get_telemetry(DataType.Position, delay, max_age_ms)
+
+    def get_flow_data(self, delay=0.01, max_age_ms=None):
+        return self._get_telemetry(DataType.RawFlow, delay, max_age_ms)
+
+    def get_state_data(self, delay=0.01, max_age_ms=None):
+        return self._get_telemetry(DataType.State, delay, max_age_ms)
+
+    def get_motion_data(self, delay=0.01, max_age_ms=None):
+        return self._get_telemetry(DataType.Motion, delay, max_age_ms)
+
+    def get_raw_motion_data(self, delay=0.01, max_age_ms=None):
+        return self._get_telemetry(DataType.RawMotion, delay, max_age_ms)
+
+    def get_color_data(self, delay=0.01, max_age_ms=None):
+        return self._get_telemetry(DataType.CardColor, delay, max_age_ms)
+
+    def get_joystick_data(self, delay=0.01, max_age_ms=None):
+        return self._get_telemetry(DataType.Joystick, delay, max_age_ms)
+
+    def get_trim_data(self, delay=0.08, max_age_ms=None):
+        return self._get_telemetry(DataType.Trim, delay, max_age_ms)
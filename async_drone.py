@@ -1,37 +1,39 @@
 import asyncio
 import time
 from codrone_edu.drone import *
+from aio_drone import AsyncDrone
 
 async def monitor_position(drone):
     try:
       for i in range(40):
           # print(drone.get_pos_x())
-          distance = drone.get_front_range('cm')
+          distance = await drone.get_front_range('cm')
           print(f'distance: {distance}')
 
           drone.load_color_data()
-          color_data = drone.get_color_data()
+          color_data = await drone.get_color_data()
           print('sensor data acquired?')
           color = drone.predict_colors(color_data)
           print(color_data)
           print(f'predicted color: {color}')
           if distance < 150 and i > 20:
-              drone.set_drone_LED(255, 0, 0, 100)
+              await drone.set_drone_LED(255, 0, 0, 100)
               # drone.start_drone_buzzer(500)
           await asyncio.sleep(0.2)
     except Exception as e:
         print('monitoring failed')
         print(e)
-        drone.land()
-        drone.close()
+        await drone.land()
+        await drone.aclose()
 
 async def main():
     try:
         # Initialize drone
-        drone = Drone()
-        drone.pair()
-        loop = asyncio.get_running_loop()
-        drone.set_drone_LED(0, 0, 255, 100)
+        drone = AsyncDrone()
+        await drone.pair()
+        # keep range and color fresh in the background so the monitor loop never waits on a request
+        drone.start_telemetry({DataType.Range: 20, DataType.CardColor: 10})
+        await drone.set_drone_LED(0, 0, 255, 100)
 
         
         # drone.stop_drone_buzzer()
@@ -39,10 +41,9 @@ async def main():
         # Start the monitoring task
         task = asyncio.create_task(monitor_position(drone))
         
-        # Perform drone movements
-        # await loop.run_in_executor(None, drone.takeoff)
-        # await loop.run_in_executor(None, lambda: drone.move_distance(0, 0, 0.25, 1))
-        # await loop.run_in_executor(None, lambda: drone.keep_distance(8, 10))
+        # Perform drone movements; the monitor keeps running while they await
+        # await drone.takeoff()
+        # await drone.move_distance(0, 0, 0.25, 1)
         
         # Allow monitoring to complete (or cancel after movements)
         try:
@@ -52,16 +53,16 @@ async def main():
             
         # Land and close connection
         if drone:
-            drone.set_drone_LED(0, 0, 255, 100)
+            await drone.set_drone_LED(0, 0, 255, 100)
             # drone.stop_drone_buzzer()
-            drone.land()
-            drone.close()
+            await drone.land()
+            await drone.aclose()
             
     except Exception as e:
         print('fail')
         print(e)
         if drone:
-            drone.land()
-            drone.close()
+            await drone.land()
+            await drone.aclose()
 
 asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,644 @@
+#Python code
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from struct import pack
+
+from codrone_edu.protocol import *
+from codrone_edu.receiver import Receiver, StateLoading
+from codrone_edu.storage import Parser
+
+import codrone_edu
+import numpy as np
+from codrone_edu.drone import Drone, ColorClassifier
+
+import codec
+from capture import CaptureWriter, CaptureReader, replay, RX
+from control_loop import ControlLoop
+from fast_drone import FastDrone
+from fast_swarm import FastSwarm
+from frame_decoder import FrameDecoder
+from histogram import Histogram
+from shm_drone import SharedDrone
+from color_classifier import FastColorClassifier
+from firmware_update import WindowedUpdater
+from simulator import FakeBootloader, Simulator, make_frame, synthetic_firmware, REPLIES
+
+
+# --- Helpers ---
+def sample_stream(count):
+    """A telemetry burst that cycles through the types the getters request most."""
+    payloads = [
+        (DataType.Range, pack("<hhhhhh", 0, 420, 0, 0, 0, 310)),
+        (DataType.Motion, pack("<hhhhhhhhh", 10, -20, 980, 1, 2, 3, 4, 5, 90)),
+        (DataType.Position, pack("<fff", 0.25, -0.5, 0.8)),
+        (DataType.State, pack("<BBBBBBBB", 0x12, 0x10, 0x10, 0x01, 0x02, 2, 0x01, 87)),
+        (DataType.CardColor, pack("<hhhhhhhhBBB", 180, 65, 100, 67, 180, 58, 100, 70, 5, 5, 0)),
+        (DataType.Altitude, pack("<ffff", 24.5, 101325.0, 12.0, 0.31)),
+    ]
+    frames = [make_frame(data_type, payload) for data_type, payload in payloads]
+    return b"".join(frames[i % len(frames)] for i in range(count))
+
+
+def chunks(stream, size):
+    return [stream[i:i + size] for i in range(0, len(stream), size)]
+
+
+class NullPort:
+    """Stands in for serial.Serial and keeps a reference to the last frame written."""
+
+    in_waiting = 0
+
+    def __init__(self):
+        self.last = None
+
+    def isOpen(self):
+        return True
+
+    def write(self, data):
+        self.last = data
+        return len(data)
+
+    def close(self):
+        pass
+
+
+def close_drone(drone):
+    """
+    drone.close(), but the library Drone's receive thread is woken and joined first: it blocks
+    in serial.read() and traces back when the port is closed under it.
+    """
+    drone._flagThreadRun = False
+    if drone._serialport is not None and hasattr(drone._serialport, "cancel_read"):
+        drone._serialport.cancel_read()
+    if drone._thread is not None:
+        drone._thread.join(timeout=1)
+    drone.close()
+
+
+def offline_drone(drone_class=Drone):
+    """A drone whose writes go to a NullPort instead of the controller."""
+    drone = drone_class()
+    drone._serialport = NullPort()
+    return drone
+
+
+def alloc_bytes(send, samples=200):
+    """Average peak of memory allocated during one call of send(), minus the cost of measuring."""
+    def measure(call):
+        total = 0
+        for i in range(samples):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            call(i)
+            total += tracemalloc.get_traced_memory()[1] - before
+        return total / samples
+
+    tracemalloc.start()
+    overhead = measure(lambda i: None)
+    result = measure(send)
+    tracemalloc.stop()
+    return max(0, round(result - overhead))
+
+
+# --- Benchmarks ---
+def bench_decoder(count=20000, chunk=256):
+    """Frames/second for the library Receiver (as driven by Drone.check) against FrameDecoder."""
+    reads = chunks(sample_stream(count), chunk)
+
+    receiver = Receiver()
+    buffer = bytearray()
+    received = 0
+    start = time.perf_counter()
+    for data in reads:
+        buffer.extend(data)
+        while len(buffer) > 0:
+            receiver.call(buffer.pop(0))
+            if receiver.state == StateLoading.Loaded:
+                received += 1
+                receiver.checked()
+    receiver_time = time.perf_counter() - start
+
+    decoder = FrameDecoder()
+    decoded = 0
+    start = time.perf_counter()
+    for data in reads:
+        decoder.feed(data)
+        decoded += len(decoder.decode())
+    decoder_time = time.perf_counter() - start
+
+    return {
+        "frames": count,
+        "chunk_bytes": chunk,
+        "receiver_frames": received,
+        "decoder_frames": decoded,
+        "receiver_fps": round(received / receiver_time),
+        "decoder_fps": round(decoded / decoder_time),
+        "speedup": round(receiver_time / decoder_time, 1),
+    }
+
+
+def bench_encoder(count=20000):
+    """Frames/second and bytes allocated per frame for sendControl and sendControlPosition."""
+    commands = {
+        "control": lambda drone, i: drone.sendControl(i % 100, -(i % 100), 0, 10),
+        "control_position": lambda drone, i: drone.sendControlPosition(0.5, 0.0, 0.1 * (i % 5), 0.5, i % 90, 30),
+    }
+    drones = {"library": offline_drone(Drone), "template": offline_drone(FastDrone)}
+
+    results = {}
+    for command, send in commands.items():
+        result = results[command] = {}
+        frames = {}
+        for name, drone in drones.items():
+            start = time.perf_counter()
+            for i in range(count):
+                send(drone, i)
+            result[name + "_fps"] = round(count / (time.perf_counter() - start))
+            result[name + "_peak_alloc_bytes"] = alloc_bytes(lambda i: send(drone, i))
+            send(drone, 7)
+            frames[name] = bytes(drone._serialport.last)
+        result["identical_frames"] = frames["library"] == frames["template"]
+    return results
+
+
+def bench_codec(count=50000):
+    """Nanoseconds per payload for the library parse, the compiled codec and a bulk numpy decode, per DataType."""
+    library = Parser()
+    results = {}
+    for dataType, compiled in codec.CODECS.items():
+        payload = REPLIES.get(dataType) or bytes(compiled.size)
+        parse = library.d[dataType]
+
+        start = time.perf_counter()
+        for i in range(count):
+            parse(payload)
+        library_time = time.perf_counter() - start
+
+        fast_parse = compiled.parse
+        start = time.perf_counter()
+        for i in range(count):
+            fast_parse(payload)
+        codec_time = time.perf_counter() - start
+
+        frames = make_frame(dataType, payload) * count
+        out = np.empty(count, dtype=compiled.dtype)
+        start = time.perf_counter()
+        compiled.decode_frames(frames, out)
+        bulk_time = time.perf_counter() - start
+
+        results[dataType.name] = {
+            "library_ns": round(library_time / count * 1e9),
+            "codec_ns": round(codec_time / count * 1e9),
+            "bulk_ns": round(bulk_time / count * 1e9, 1),
+            "speedup": round(library_time / codec_time, 1),
+            "identical": tuple(getattr(parse(payload), name) for name in compiled.message._fields) == fast_parse(payload),
+        }
+    return results
+
+
+def bench_metrics(count=20000, chunk=256, rounds=5):
+    """Frames/second through FastDrone.check with link metrics off and on, and what they cost per frame."""
+    reads = chunks(sample_stream(count), chunk)
+
+    # alternate the two and keep each one's best round, so warm-up and noise do not land on one side
+    results = {"off": float("inf"), "on": float("inf")}
+    for i in range(rounds):
+        for name in ("off", "on"):
+            drone = offline_drone(FastDrone)
+            if name == "off":
+                drone.metrics = None
+            start = time.perf_counter()
+            for data in reads:
+                drone._bufferQueue.put(data)
+                if drone.metrics is not None:
+                    drone.metrics.read(len(data), drone._bufferQueue.qsize())
+                drone.check()
+            results[name] = min(results[name], time.perf_counter() - start)
+
+    return {
+        "frames": count,
+        "off_fps": round(count / results["off"]),
+        "on_fps": round(count / results["on"]),
+        "overhead_us_per_frame": round((results["on"] - results["off"]) / count * 1e6, 2),
+        "overhead_percent": round((results["on"] / results["off"] - 1) * 100, 1),
+    }
+
+
+def bench_replay(filename=None, count=20000, chunk=256):
+    """
+    Frames/second when a capture is replayed through check() and the handlers, library Drone
+    against FastDrone. Without a capture file a synthetic telemetry capture is recorded first.
+    """
+    directory = None
+    if filename is None:
+        directory = tempfile.TemporaryDirectory()
+        filename = os.path.join(directory.name, "sample.cdcap")
+        writer = CaptureWriter(filename)
+        for data in chunks(sample_stream(count), chunk):
+            writer.write(RX, data)
+        writer.close()
+
+    reader = CaptureReader(filename)
+    results = {"capture": reader.summary()}
+    for name, drone_class in (("library", Drone), ("fast", FastDrone)):
+        results[name] = replay(offline_drone(drone_class), reader, speed=None)
+    results["speedup"] = round(results["library"]["seconds"] / results["fast"]["seconds"], 1)
+    reader.close()
+    if directory is not None:
+        directory.cleanup()
+    return results
+
+
+def bench_color(readings=500, lut_step=10):
+    """Milliseconds to classify one front + back reading with the bundled dataset, per classifier."""
+    path = os.path.join(os.path.dirname(codrone_edu.__file__), "data")
+    x_train, y_train = [], []
+    for filename in sorted(os.listdir(path)):
+        data = np.loadtxt(os.path.join(path, filename))
+        x_train.append(data[:, 1:5])
+        y_train += [os.path.splitext(filename)[0]] * len(data)
+    x_train = np.vstack(x_train)
+
+    # training rows with sensor noise, as (front, back) pairs
+    rng = np.random.default_rng(0)
+    samples = x_train[rng.integers(0, len(x_train), readings * 2)] + rng.normal(0, 3, (readings * 2, 4))
+    pairs = samples.reshape(readings, 2, 4)
+
+    library = ColorClassifier(n_neighbors=9)
+    library.fit(x_train.tolist(), y_train)
+    fast = FastColorClassifier(n_neighbors=9)
+    fast.fit(x_train, y_train)
+    start = time.perf_counter()
+    lut = FastColorClassifier(n_neighbors=9, lut_step=lut_step)
+    lut.fit(x_train, y_train)
+    lut_build = time.perf_counter() - start
+
+    def timed(classify):
+        start = time.perf_counter()
+        labels = [classify(pair) for pair in pairs]
+        return (time.perf_counter() - start) * 1000 / readings, np.array(labels)
+
+    library_ms, expected = timed(lambda pair: [library.predict(pair[0]), library.predict(pair[1])])
+    fast_ms, fast_labels = timed(fast.predict_batch)
+    lut_ms, lut_labels = timed(lut.predict_batch)
+
+    return {
+        "training_rows": len(x_train),
+        "readings": readings,
+        "library_ms": round(library_ms, 4),
+        "fast_ms": round(fast_ms, 4),
+        "lut_ms": round(lut_ms, 4),
+        "fast_speedup": round(library_ms / fast_ms, 1),
+        "lut_speedup": round(library_ms / lut_ms, 1),
+        "fast_agreement": float((fast_labels == expected).mean()),
+        "lut_agreement": float((lut_labels == expected).mean()),
+        "lut_step": lut_step,
+        "lut_build_s": round(lut_build, 2),
+    }
+
+
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from codrone_edu.drone import Drone
+from fast_drone import FastDrone
+imported = time.perf_counter()
+drone = FastDrone() if sys.argv[2] == "fast" else Drone()
+constructed = time.perf_counter()
+drone.pair(sys.argv[1])
+paired = time.perf_counter()
+for i in range(100):
+    drone.get_position_data()
+    if drone.position_data[0] != 0:
+        break
+usable = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "construct_ms": (constructed - imported) * 1000,
+    "pair_ms": (paired - constructed) * 1000,
+    "first_telemetry_ms": (usable - start) * 1000,
+    "telemetry_ok": drone.position_data[0] != 0,
+    "connect_stats": getattr(drone, "connect_stats", None),
+}), flush=True)
+# wake the library receive thread out of serial.read() so closing the port does not trace back
+drone._flagThreadRun = False
+drone._serialport.cancel_read()
+drone._thread.join(timeout=1)
+drone.close()
+"""
+
+
+def bench_startup(runs=3, latency=0.01):
+    """
+    Milliseconds from a fresh interpreter to the first telemetry reply after pair(), library Drone against FastDrone.
+
+    Each run is a new process talking to a Simulator, so imports count too.
+    process_ms also includes starting the interpreter, up to the result being printed.
+    """
+    controller = Simulator(latency)
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    try:
+        for engine in ("library", "fast"):
+            runs_ = []
+            for i in range(runs):
+                start = time.perf_counter()
+                child = subprocess.Popen([sys.executable, "-c", STARTUP_SCRIPT, controller.path, engine],
+                                         cwd=here, stdout=subprocess.PIPE, text=True)
+                # the last line is the result; skip the connect messages before it
+                for line in child.stdout:
+                    if line.startswith("{"):
+                        break
+                process_ms = (time.perf_counter() - start) * 1000
+                child.communicate(timeout=60)
+                run = json.loads(line)
+                run["process_ms"] = process_ms
+                runs_.append(run)
+
+            best = min(runs_, key=lambda run: run["first_telemetry_ms"])
+            results[engine] = {
+                name: round(value, 1) if isinstance(value, float) else value
+                for name, value in best.items()
+            }
+    finally:
+        controller.close()
+
+    results["latency_ms"] = latency * 1000
+    results["speedup"] = round(results["library"]["first_telemetry_ms"] / results["fast"]["first_telemetry_ms"], 1)
+    return results
+
+
+# a Simulator in its own process, so a busy benchmark process cannot slow the replies
+RESPONDER_SCRIPT = """
+import sys
+from simulator import Simulator
+controller = Simulator(float(sys.argv[1]))
+print(controller.path, flush=True)
+sys.stdin.read()
+"""
+
+
+def _hog(stop):
+    while not stop.is_set():
+        sum(range(10000))
+
+
+def bench_shared(samples=200, latency=0.002):
+    """
+    Telemetry latency with the receive thread in the program's process (FastDrone) against the
+    decoder process (SharedDrone), idle and while a CPU-bound thread competes for the GIL.
+
+    request_ms is a getter that asks and waits for the reply; cached_us is a getter served from
+    background telemetry at 50 Hz, and age_ms how old the value it returned was.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    responder = subprocess.Popen([sys.executable, "-c", RESPONDER_SCRIPT, str(latency)], cwd=here,
+                                 stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    path = responder.stdout.readline().strip()
+
+    results = {"latency_ms": latency * 1000}
+    try:
+        for name, drone_class in (("threaded", FastDrone), ("shared", SharedDrone)):
+            drone = drone_class()
+            drone.pair(path)
+            for load in ("idle", "gil"):
+                stop = threading.Event()
+                if load == "gil":
+                    threading.Thread(target=_hog, args=(stop,), daemon=True).start()
+
+                request = Histogram()
+                for i in range(samples):
+                    start = time.perf_counter()
+                    drone.get_position_data()
+                    request.record((time.perf_counter() - start) * 1000)
+
+                drone.start_telemetry({DataType.Position: 50})
+                time.sleep(0.2)
+                cached = 0.0
+                age = Histogram()
+                for i in range(samples):
+                    start = time.perf_counter()
+                    drone.get_position_data()
+                    cached += time.perf_counter() - start
+                    age.record(drone.data_age_ms(DataType.Position))
+                    time.sleep(0.002)
+                drone.stop_telemetry()
+                stop.set()
+
+                request = request.snapshot()
+                results.setdefault(name, {})[load] = {
+                    "request_ms": {key: request[key] for key in ("mean", "p50", "p99", "max")},
+                    "cached_us": round(cached / samples * 1e6, 1),
+                    "age_ms": {key: age.snapshot()[key] for key in ("mean", "max")},
+                }
+            drone.close()
+    finally:
+        responder.communicate("", timeout=10)
+    return results
+
+
+def bench_update(size=8192, latency=0.005, loss=0.02, window=8):
+    """
+    Firmware update throughput over a 57600 baud link to a FakeBootloader, for the library's
+    stop-and-wait (one block in flight, fixed 100 ms timeout) against the windowed updater,
+    on a clean link and with loss of Update frames.
+    """
+    firmware = synthetic_firmware(size)
+    senders = (("stop_and_wait", dict(window=1, adaptive=False, timeout=0.1)),
+               ("windowed", dict(window=window)))
+    results = {"bytes": size, "latency_ms": latency * 1000, "window": window}
+    for link, link_loss in (("clean", 0.0), ("lossy", loss)):
+        for name, options in senders:
+            bootloader = FakeBootloader(firmware.resource, firmware.header.modelNumber, latency, link_loss)
+            drone = FastDrone()
+            drone.open_raw(bootloader.path)
+            try:
+                stats = WindowedUpdater(drone, firmware, **options).run(DeviceType.Drone)
+            finally:
+                drone.close()
+                bootloader.close()
+            stats["verified"] = bootloader.verified
+            stats["lost"] = bootloader.lost
+            results.setdefault(link, {})[name] = stats
+        clean = results[link]
+        if clean["stop_and_wait"]["bytes_per_second"]:
+            clean["speedup"] = round(clean["windowed"]["bytes_per_second"] / clean["stop_and_wait"]["bytes_per_second"], 1)
+    return results
+
+
+GETTERS = {
+    "position": ("get_position_data", DataType.Position),
+    "height": ("get_height", DataType.Range),
+    "battery": ("get_battery", DataType.State),
+}
+
+
+def bench_getters(samples=100, latency=0.005, loss=0.05, corrupt=0.05):
+    """
+    Milliseconds per getter call against a Simulator, library Drone against FastDrone, on a clean
+    link, with lost requests and with corrupted replies. fresh is the share of calls whose reply
+    arrived (the rest returned the previous value); faults start after pair().
+    """
+    links = (("clean", 0.0, 0.0), ("loss", loss, 0.0), ("corrupt", 0.0, corrupt))
+    results = {"latency_ms": latency * 1000}
+    for link, link_loss, link_corrupt in links:
+        for engine, drone_class in (("library", Drone), ("fast", FastDrone)):
+            simulator = Simulator(latency)
+            drone = drone_class()
+            drone.pair(simulator.path)
+            simulator.loss, simulator.corrupt = link_loss, link_corrupt
+
+            getters = {}
+            for name, (method, dataType) in GETTERS.items():
+                getter = getattr(drone, method)
+                histogram = Histogram()
+                fresh = 0
+                for i in range(samples):
+                    count = drone.getCount(dataType)
+                    start = time.perf_counter()
+                    getter()
+                    histogram.record((time.perf_counter() - start) * 1000)
+                    fresh += drone.getCount(dataType) > count
+                snapshot = histogram.snapshot()
+                getters[name] = {key: snapshot[key] for key in ("mean", "p50", "p99", "max")}
+                getters[name]["fresh"] = round(fresh / samples, 3)
+            getters["lost"] = simulator.lost
+            getters["corrupted"] = simulator.corrupted
+            results.setdefault(link, {})[engine] = getters
+            close_drone(drone)
+            simulator.close()
+    return results
+
+
+def bench_control_loop(rate=50, seconds=3.0, latency=0.005, target=1.2):
+    """
+    A 50 Hz height-hold loop (ControlLoop with Position telemetry) flying a Simulator, idle and
+    while a CPU-bound thread competes for the GIL. jitter_ms is how late each tick started;
+    arrival_ms is how far the gaps between Control frames reaching the drone were from the period.
+    """
+    period_ms = 1000.0 / rate
+
+    def hold_height(drone, elapsed):
+        error = target - drone.position_data[3]
+        drone.sendControl(0, 0, 0, max(-100, min(100, int(error * 100))))
+
+    results = {"rate": rate, "latency_ms": latency * 1000}
+    for load in ("idle", "gil"):
+        simulator = Simulator(latency)
+        drone = FastDrone()
+        drone.pair(simulator.path)
+        drone.sendTakeOff()
+        while drone.get_state_data()[2] is not ModeFlight.Flight:
+            time.sleep(0.05)
+
+        stop = threading.Event()
+        if load == "gil":
+            threading.Thread(target=_hog, args=(stop,), daemon=True).start()
+        simulator.trace = []
+        stats = ControlLoop(drone, hold_height, rate, telemetry=(DataType.Position,)).run(seconds)
+        stop.set()
+
+        arrivals = [arrival for arrival, dataType in simulator.trace if dataType == DataType.Control.value]
+        gaps = Histogram()
+        for before, after in zip(arrivals, arrivals[1:]):
+            gaps.record(abs((after - before) * 1000 - period_ms))
+        results[load] = {
+            "achieved_rate": stats["achieved_rate"],
+            "overruns": stats["overruns"],
+            "jitter_ms": {key: stats["jitter_ms"][key] for key in ("mean", "p99", "max")},
+            "arrival_ms": {key: gaps.snapshot()[key] for key in ("mean", "p99", "max")},
+            "height_error_m": round(abs(target - simulator.z), 3),
+        }
+        drone.close()
+        simulator.close()
+    return results
+
+
+def bench_swarm(drones=4, commands=50, latency=0.005):
+    """
+    Fan-out skew across a FastSwarm of Simulators: milliseconds between the first and the last
+    drone receiving the same Control frame, for broadcast_control (one burst of writes) and
+    all_drones("sendControl", ...) (one task per drone). start_skew_ms is the swarm's own
+    measure of how far apart the all_drones tasks started.
+    """
+    simulators = [Simulator(latency) for i in range(drones)]
+    swarm = FastSwarm(enable_color=False, enable_print=False, enable_pause=False)
+    swarm.connect([simulator.path for simulator in simulators])
+
+    def fan_out(send):
+        skew = Histogram()
+        for i in range(commands):
+            before = [simulator.arrivals.get(DataType.Control) for simulator in simulators]
+            send(i)
+            deadline = time.perf_counter() + 1.0
+            while time.perf_counter() < deadline:
+                after = [simulator.arrivals.get(DataType.Control) for simulator in simulators]
+                if all(a is not None and a != b for a, b in zip(after, before)):
+                    skew.record((max(after) - min(after)) * 1000)
+                    break
+                time.sleep(0.0005)
+            time.sleep(0.01)
+        snapshot = skew.snapshot()
+        return {key: snapshot[key] for key in ("count", "mean", "p50", "p99", "max")}
+
+    results = {"drones": drones, "latency_ms": latency * 1000}
+    try:
+        results["broadcast_ms"] = fan_out(lambda i: swarm.broadcast_control(0, 0, 0, i % 2))
+        results["all_drones_ms"] = fan_out(lambda i: swarm.all_drones("sendControl", 0, 0, 0, i % 2))
+        start_skew = swarm.stats()["skew_ms"]
+        results["start_skew_ms"] = {key: start_skew[key] for key in ("count", "mean", "p50", "p99", "max")}
+    finally:
+        swarm.close()
+        for simulator in simulators:
+            simulator.close()
+    return results
+
+
+BENCHMARKS = {
+    "decoder": bench_decoder,
+    "encoder": bench_encoder,
+    "color": bench_color,
+    "metrics": bench_metrics,
+    "codec": bench_codec,
+    "shared": bench_shared,
+    "replay": bench_replay,
+    "startup": bench_startup,
+    "update": bench_update,
+    "getters": bench_getters,
+    "control_loop": bench_control_loop,
+    "swarm": bench_swarm,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline performance benchmarks for the drone link.")
+    parser.add_argument("names", nargs="*", default=list(BENCHMARKS), help="benchmarks to run: " + ", ".join(BENCHMARKS))
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    parser.add_argument("--capture", help="capture file for the replay benchmark instead of synthetic traffic")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error("unknown benchmark '{0}'".format(name))
+        print("Running " + name + "...")
+        if name == "replay" and args.capture:
+            results[name] = bench_replay(args.capture)
+        else:
+            results[name] = BENCHMARKS[name]()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+#Python code
+import argparse
+import mmap
+import os
+import time
+from bisect import bisect_right
+from struct import Struct
+from threading import Lock
+
+import numpy as np
+from codrone_edu.protocol import DataType
+
+from codec import CODECS, FRAME_OVERHEAD
+from frame_decoder import FrameDecoder, DATA_TYPES
+from histogram import Histogram
+
+
+RX = 0
+TX = 1
+
+MAGIC = b"CDCAP001"
+INDEX_MAGIC = b"CDIDX001"
+
+# file header: magic, wall clock time the capture started
+FILE_HEADER = Struct("<8sd")
+# record header before every chunk: seconds since the capture started (monotonic), direction, length
+RECORD = Struct("<dBH")
+MAX_CHUNK = 0xFFFF
+
+# sidecar index entry per frame: time its last byte arrived, file offset of the record holding its
+# first byte, where in that record's payload it starts, frame size, DataType byte, direction
+INDEX = Struct("<dQHHBB")
+INDEX_DTYPE = np.dtype([("time", "<f8"), ("record", "<u8"), ("skip", "<u2"), ("size", "<u2"),
+                        ("data_type", "u1"), ("direction", "u1")])
+
+FLUSH_INTERVAL = 0.1  # seconds; a crash loses at most this much of the capture
+
+
+class _StreamIndex:
+    """Finds the frames in one direction's chunks and where each one starts in the capture file."""
+
+    def __init__(self):
+        self.decoder = FrameDecoder()
+        self.position = 0  # stream bytes seen so far
+        self.starts = []  # stream offset of each chunk the decoder may still need
+        self.records = []  # file offset of the record holding that chunk
+
+    def add(self, t, direction, record, data):
+        """Index entries for the frames completed by data, the payload of the record at file offset record."""
+        self.starts.append(self.position)
+        self.records.append(record)
+        self.position += len(data)
+        self.decoder.feed(data)
+
+        offsets = []
+        frames = self.decoder.decode(offsets)
+        entries = []
+        for (header, payload), start in zip(frames, offsets):
+            i = bisect_right(self.starts, start) - 1
+            entries.append(INDEX.pack(t, self.records[i], start - self.starts[i], len(payload) + 8,
+                                      header.dataType.value, direction))
+
+        # forget chunks that end before the decoder's buffer starts
+        keep = bisect_right(self.starts, self.decoder.consumed) - 1
+        if keep > 0:
+            del self.starts[:keep]
+            del self.records[:keep]
+        return entries
+
+
+class CaptureWriter:
+    """
+    Appends every chunk read from or written to the port to a binary capture file.
+
+    A sidecar index (filename + ".idx") gets one fixed-size entry per complete
+    frame, so CaptureReader can seek by time or DataType without parsing the
+    capture. Safe to call from the receive thread and senders at once.
+    """
+
+    def __init__(self, filename, index=True):
+        self.filename = filename
+        self.chunks = 0
+        self.frames = 0
+        self.bytes = 0
+
+        self._lock = Lock()
+        self._file = open(filename, "wb")
+        self._file.write(FILE_HEADER.pack(MAGIC, time.time()))
+        self._offset = FILE_HEADER.size
+        self._index = None
+        if index:
+            self._index = open(filename + ".idx", "wb")
+            self._index.write(INDEX_MAGIC)
+        self._streams = (_StreamIndex(), _StreamIndex())
+        self._started = time.perf_counter()
+        self._flushed = 0.0
+
+    def write(self, direction, data):
+        """Records one chunk; direction is RX or TX."""
+        with self._lock:
+            if self._file is None:
+                return
+            t = time.perf_counter() - self._started
+            view = memoryview(data)
+            for i in range(0, len(view), MAX_CHUNK):
+                part = view[i:i + MAX_CHUNK]
+                self._file.write(RECORD.pack(t, direction, len(part)))
+                self._file.write(part)
+                if self._index is not None:
+                    entries = self._streams[direction].add(t, direction, self._offset, part)
+                    if entries:
+                        self._index.write(b"".join(entries))
+                        self.frames += len(entries)
+                self._offset += RECORD.size + len(part)
+                self.chunks += 1
+            self.bytes += len(view)
+
+            if t - self._flushed > FLUSH_INTERVAL:
+                self._flush()
+                self._flushed = t
+
+    def _flush(self):
+        self._file.flush()
+        if self._index is not None:
+            self._index.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.close()
+            self._file = None
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+
+
+def index_capture(filename):
+    """Writes (or rewrites) the sidecar index of a capture made with index=False or cut short."""
+    reader = CaptureReader(filename, index=False)
+    streams = (_StreamIndex(), _StreamIndex())
+    count = 0
+    with open(filename + ".idx", "wb") as f:
+        f.write(INDEX_MAGIC)
+        for offset, t, direction, data in reader.records():
+            entries = streams[direction].add(t, direction, offset, data)
+            f.write(b"".join(entries))
+            count += len(entries)
+    reader.close()
+    return count
+
+
+class CaptureReader:
+    """Memory-mapped view of a capture; the index is a numpy array mapped from the sidecar file."""
+
+    def __init__(self, filename, index=True):
+        self.filename = filename
+        self._file = open(filename, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.wall_start = FILE_HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError("{0} is not a capture file".format(filename))
+
+        self.index = np.zeros(0, dtype=INDEX_DTYPE)
+        if index:
+            if not os.path.exists(filename + ".idx"):
+                index_capture(filename)
+            count = (os.path.getsize(filename + ".idx") - len(INDEX_MAGIC)) // INDEX_DTYPE.itemsize
+            if count > 0:
+                # a partly written last entry (the capture was cut short) is left out
+                self.index = np.memmap(filename + ".idx", dtype=INDEX_DTYPE, mode="r",
+                                       offset=len(INDEX_MAGIC), shape=(count,))
+
+    def close(self):
+        self.index = None
+        self._map.close()
+        self._file.close()
+
+    def records(self, offset=FILE_HEADER.size):
+        """Yields (file offset, time, direction, payload bytes) for every complete record from offset on."""
+        m = self._map
+        size = len(m)
+        while offset + RECORD.size <= size:
+            t, direction, length = RECORD.unpack_from(m, offset)
+            start = offset + RECORD.size
+            if start + length > size:
+                break
+            yield offset, t, direction, m[start:start + length]
+            offset = start + length
+
+    def duration(self):
+        last = 0.0
+        for offset, t, direction, data in self.records():
+            last = t
+        return last
+
+    def select(self, start=None, end=None, data_type=None, direction=RX):
+        """Index entries of frames that completed between start and end seconds, optionally one DataType."""
+        times = self.index["time"]
+        lo = 0 if start is None else int(np.searchsorted(times, start, "left"))
+        hi = len(times) if end is None else int(np.searchsorted(times, end, "right"))
+        rows = self.index[lo:hi]
+        mask = np.ones(len(rows), dtype=bool)
+        if direction is not None:
+            mask &= rows["direction"] == direction
+        if data_type is not None:
+            mask &= rows["data_type"] == getattr(data_type, "value", data_type)
+        return rows[mask]
+
+    def frame(self, row):
+        """The wire bytes of one indexed frame, joined across the records it was split over."""
+        m = self._map
+        offset = int(row["record"])
+        skip = int(row["skip"])
+        size = int(row["size"])
+        direction = int(row["direction"])
+        frame = bytearray()
+        while len(frame) < size:
+            t, d, length = RECORD.unpack_from(m, offset)
+            start = offset + RECORD.size
+            if d == direction:
+                frame += m[start + skip:start + min(length, skip + size - len(frame))]
+                skip = 0
+            offset = start + length
+        return bytes(frame)
+
+    def frames(self, start=None, end=None, data_type=None, direction=RX):
+        """Yields (time, DataType, wire bytes) for the selected frames."""
+        for row in self.select(start, end, data_type, direction):
+            yield float(row["time"]), DATA_TYPES[int(row["data_type"])], self.frame(row)
+
+    def array(self, data_type, start=None, end=None, direction=RX):
+        """
+        Every frame of one DataType decoded at once into a numpy structured array.
+
+        :return: (times, values), one entry per frame; frames of the wrong size are left out
+        """
+        compiled = CODECS[data_type]
+        rows = self.select(start, end, data_type, direction)
+        rows = rows[rows["size"] == compiled.size + FRAME_OVERHEAD]
+        frames = b"".join(self.frame(row) for row in rows)
+        return np.array(rows["time"]), compiled.decode_frames(frames)
+
+    def chunks(self, start=None, end=None, direction=None):
+        """Yields (time, direction, bytes) for each recorded chunk between start and end seconds."""
+        offset = FILE_HEADER.size
+        if start is not None and len(self.index):
+            # a frame that completed before start begins at or before every record after start
+            i = int(np.searchsorted(self.index["time"], start, "left")) - 1
+            if i >= 0:
+                offset = int(self.index[i]["record"])
+
+        for record, t, d, data in self.records(offset):
+            if start is not None and t < start:
+                continue
+            if end is not None and t > end:
+                break
+            if direction is None or d == direction:
+                yield t, d, data
+
+    def summary(self):
+        """Frame counts per direction and DataType, from the index alone."""
+        result = {"rx": {}, "tx": {}}
+        for direction, name in ((RX, "rx"), (TX, "tx")):
+            rows = self.index[self.index["direction"] == direction]
+            values, counts = np.unique(rows["data_type"], return_counts=True)
+            result[name] = {DATA_TYPES[int(value)].name: int(count) for value, count in zip(values, counts)}
+        result["frames"] = len(self.index)
+        result["seconds"] = round(float(self.index["time"][-1]), 3) if len(self.index) else 0.0
+        result["started"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.wall_start))
+        return result
+
+
+def replay(drone, reader, speed=1.0, start=None, end=None):
+    """
+    Feeds the received chunks of a capture through drone.check() and its handlers.
+
+    :param drone: a Drone or FastDrone that is not reading a port itself
+    :param speed: 1.0 for real time, 10.0 for ten times faster, None for as fast as possible
+    :return: dict with frames, seconds taken, frames per second and how late chunks were delivered
+    """
+    lag = Histogram()
+    chunks = 0
+    first = None
+    began = time.perf_counter()
+    for t, direction, data in reader.chunks(start, end, RX):
+        if first is None:
+            first = t
+        if speed:
+            delay = began + (t - first) / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                lag.record(-delay * 1000)
+        drone._bufferQueue.put(data)
+        while drone.check() != DataType.None_:
+            pass
+        chunks += 1
+    elapsed = time.perf_counter() - began
+
+    frames = len(reader.select(start, end, direction=RX))
+    result = {
+        "chunks": chunks,
+        "frames": frames,
+        "seconds": round(elapsed, 3),
+        "frames_per_second": round(frames / elapsed) if elapsed else None,
+    }
+    if speed:
+        result["lag_ms"] = lag.snapshot()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a serial capture made with Drone.start_capture.")
+    parser.add_argument("filename")
+    parser.add_argument("--type", help="only frames of this DataType, e.g. Position")
+    parser.add_argument("--start", type=float, help="seconds from the start of the capture")
+    parser.add_argument("--end", type=float, help="seconds from the start of the capture")
+    parser.add_argument("--tx", action="store_true", help="frames sent to the drone instead of received")
+    parser.add_argument("--reindex", action="store_true", help="rebuild the .idx file first")
+    args = parser.parse_args()
+
+    if args.reindex:
+        print("Indexed {0} frames.".format(index_capture(args.filename)))
+    reader = CaptureReader(args.filename)
+    if args.type is None and args.start is None and args.end is None:
+        for key, value in reader.summary().items():
+            print("{0}: {1}".format(key, value))
+    else:
+        data_type = DataType[args.type] if args.type else None
+        for t, dataType, frame in reader.frames(args.start, args.end, data_type, TX if args.tx else RX):
+            print("{0:10.4f} {1:<16} {2}".format(t, dataType.name, frame.hex(" ")))
+    reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#Python code
+from collections import namedtuple
+from struct import Struct
+
+import numpy as np
+from codrone_edu.protocol import *
+
+
+# struct format character -> numpy type, all little endian like the wire
+NUMPY_TYPES = {"b": "i1", "B": "u1", "h": "<i2", "H": "<u2", "i": "<i4", "I": "<u4",
+               "q": "<i8", "Q": "<u8", "f": "<f4", "d": "<f8"}
+
+FRAME_OVERHEAD = 8  # sync, header and crc around every payload
+PAYLOAD_START = 6  # sync and header before the payload
+
+
+def _members(enum):
+    """value -> member, so converting a byte is a dict lookup instead of an Enum() call."""
+    return {member.value: member for member in enum}
+
+
+class _Message:
+    """Shared methods of the message types: the library's toArray/parse on top of a cached codec."""
+    __slots__ = ()
+    codec = None
+
+    def toArray(self):
+        return self.codec.pack(self)
+
+    @classmethod
+    def parse(cls, dataArray):
+        return cls.codec.parse(dataArray)
+
+    @classmethod
+    def getSize(cls):
+        return cls.codec.size
+
+
+# Field names and order match the codrone_edu.protocol classes, so handlers written
+# against those (data.accelX, data.hsvl[0][1], ...) read these unchanged.
+class State(_Message, namedtuple("State", "modeSystem modeFlight modeControlFlight modeMovement "
+                                          "headless controlSpeed sensorOrientation battery")):
+    __slots__ = ()
+
+
+class Attitude(_Message, namedtuple("Attitude", "roll pitch yaw")):
+    __slots__ = ()
+
+
+class Position(_Message, namedtuple("Position", "x y z")):
+    __slots__ = ()
+
+
+class Altitude(_Message, namedtuple("Altitude", "temperature pressure altitude rangeHeight")):
+    __slots__ = ()
+
+
+class Motion(_Message, namedtuple("Motion", "accelX accelY accelZ gyroRoll gyroPitch gyroYaw "
+                                            "angleRoll anglePitch angleYaw")):
+    __slots__ = ()
+
+
+class RawMotion(_Message, namedtuple("RawMotion", "accelX accelY accelZ gyroRoll gyroPitch gyroYaw")):
+    __slots__ = ()
+
+
+class Range(_Message, namedtuple("Range", "left front right rear top bottom")):
+    __slots__ = ()
+
+
+class RawFlow(_Message, namedtuple("RawFlow", "x y")):
+    __slots__ = ()
+
+
+class Trim(_Message, namedtuple("Trim", "roll pitch yaw throttle")):
+    __slots__ = ()
+
+
+class Count(_Message, namedtuple("Count", "timeSystem timeFlight countTakeOff countLanding countAccident")):
+    __slots__ = ()
+
+
+class CardColor(_Message, namedtuple("CardColor", "hsvl color card")):
+    __slots__ = ()
+
+
+MODE_SYSTEM = _members(ModeSystem)
+MODE_FLIGHT = _members(ModeFlight)
+MODE_CONTROL_FLIGHT = _members(ModeControlFlight)
+MODE_MOVEMENT = _members(ModeMovement)
+HEADLESS = _members(Headless)
+SENSOR_ORIENTATION = _members(SensorOrientation)
+CARD_COLOR_INDEX = _members(CardColorIndex)
+CARD = _members(Card)
+
+
+def _state(values):
+    system, flight, control, movement, headless, speed, orientation, battery = values
+    return (MODE_SYSTEM.get(system, system), MODE_FLIGHT.get(flight, flight),
+            MODE_CONTROL_FLIGHT.get(control, control), MODE_MOVEMENT.get(movement, movement),
+            HEADLESS.get(headless, headless), speed, SENSOR_ORIENTATION.get(orientation, orientation), battery)
+
+
+def _card_color(values):
+    return ([list(values[0:4]), list(values[4:8])],
+            [CARD_COLOR_INDEX.get(values[8], values[8]), CARD_COLOR_INDEX.get(values[9], values[9])],
+            CARD.get(values[10], values[10]))
+
+
+def _flat_card_color(message):
+    return tuple(message.hsvl[0]) + tuple(message.hsvl[1]) + tuple(message.color) + (message.card,)
+
+
+def _raw(value):
+    return value.value if isinstance(value, Enum) else value
+
+
+class Codec:
+    """
+    One DataType's payload layout, compiled once.
+
+    parse/unpack_from build a message from a payload without slicing it out of
+    the frame; decode_many fills a numpy structured array with one row per frame.
+    """
+
+    def __init__(self, data_type, fmt, message, columns=None, convert=None, flatten=None):
+        """
+        :param fmt: struct format of the payload
+        :param message: namedtuple-based message class
+        :param columns: names of the flat fields, for numpy; defaults to the message's fields
+        :param convert: maps the unpacked tuple to the message's fields (enums, nesting)
+        :param flatten: inverse of convert for pack
+        """
+        self.data_type = data_type
+        self.struct = Struct(fmt)
+        self.size = self.struct.size
+        self.message = message
+        self.columns = columns or message._fields
+        self.convert = convert
+        self.flatten = flatten
+        self.dtype = np.dtype([(name, NUMPY_TYPES[code]) for name, code in zip(self.columns, fmt.lstrip("<"))])
+        self.parse = self._compile_parse()
+        message.codec = self
+
+    def _compile_parse(self):
+        """parse(dataArray) with everything it needs bound in, since it runs once per received frame."""
+        unpack_from = self.struct.unpack_from
+        new = tuple.__new__
+        message = self.message
+        size = self.size
+        convert = self.convert
+
+        if convert is None:
+            def parse(dataArray):
+                if len(dataArray) != size:
+                    return None
+                return new(message, unpack_from(dataArray))
+        else:
+            def parse(dataArray):
+                if len(dataArray) != size:
+                    return None
+                return new(message, convert(unpack_from(dataArray)))
+        # same contract as the library's Class.parse: None when the size is wrong
+        return parse
+
+    def unpack_from(self, buffer, offset=0):
+        """Message from the payload at offset of a larger buffer, e.g. a whole frame, without slicing it."""
+        values = self.struct.unpack_from(buffer, offset)
+        if self.convert is not None:
+            values = self.convert(values)
+        return tuple.__new__(self.message, values)
+
+    def pack(self, message):
+        values = self.flatten(message) if self.flatten is not None else message
+        return self.struct.pack(*[_raw(value) for value in values])
+
+    def decode_many(self, buffer, offsets, out=None):
+        """
+        Decodes the payloads starting at each offset of buffer into a structured array.
+
+        :param buffer: bytes-like holding the frames, e.g. a joined capture
+        :param offsets: payload start offsets, one per frame
+        :param out: optional preallocated array of self.dtype with room for every frame
+        :return: the filled rows (a view of out when given)
+        """
+        offsets = np.asarray(offsets, dtype=np.intp)
+        count = len(offsets)
+        if out is None:
+            out = np.empty(count, dtype=self.dtype)
+        if count:
+            raw = np.frombuffer(buffer, dtype=np.uint8)
+            out[:count] = raw[offsets[:, None] + np.arange(self.size)].view(self.dtype).reshape(count)
+        return out[:count]
+
+    def decode_frames(self, buffer, out=None):
+        """decode_many for back-to-back frames of this DataType, e.g. from CaptureReader.frames."""
+        stride = self.size + FRAME_OVERHEAD
+        count = len(buffer) // stride
+        if out is None:
+            out = np.empty(count, dtype=self.dtype)
+        if count:
+            # every payload sits at the same place in its frame, so the frames are a strided view
+            rows = np.ndarray((count,), dtype=np.dtype({"names": list(self.columns),
+                                                        "formats": [self.dtype.fields[name][0] for name in self.columns],
+                                                        "offsets": [PAYLOAD_START + self.dtype.fields[name][1] for name in self.columns],
+                                                        "itemsize": stride}),
+                              buffer=buffer, strides=(stride,))
+            out[:count] = rows
+        return out[:count]
+
+
+CODECS = {
+    DataType.State: Codec(DataType.State, "<BBBBBBBB", State, convert=_state),
+    DataType.Attitude: Codec(DataType.Attitude, "<hhh", Attitude),
+    DataType.Position: Codec(DataType.Position, "<fff", Position),
+    DataType.Altitude: Codec(DataType.Altitude, "<ffff", Altitude),
+    DataType.Motion: Codec(DataType.Motion, "<hhhhhhhhh", Motion),
+    DataType.RawMotion: Codec(DataType.RawMotion, "<hhhhhh", RawMotion),
+    DataType.Range: Codec(DataType.Range, "<hhhhhh", Range),
+    DataType.RawFlow: Codec(DataType.RawFlow, "<ff", RawFlow),
+    DataType.Trim: Codec(DataType.Trim, "<hhhh", Trim),
+    DataType.Count: Codec(DataType.Count, "<IIHHH", Count),
+    DataType.CardColor: Codec(DataType.CardColor, "<hhhhhhhhBBB", CardColor,
+                              columns=("h0", "s0", "v0", "l0", "h1", "s1", "v1", "l1", "color0", "color1", "card"),
+                              convert=_card_color, flatten=_flat_card_color),
+}
+
+
+def install(parser):
+    """Points a library Parser (drone._parser) at the compiled codecs; other DataTypes keep their parse."""
+    for dataType, codec in CODECS.items():
+        parser.d[dataType] = codec.parse
@@ -0,0 +1,105 @@
+#Python code
+import numpy as np
+
+
+# HSVL ranges the color sensor reports, used to size the lookup table
+HSVL_RANGES = ((0, 360), (0, 100), (0, 100), (0, 100))
+
+
+class FastColorClassifier:
+    """
+    Drop-in replacement for codrone_edu's ColorClassifier.
+
+    Labels are kept as int codes, neighbors are found on squared distances with
+    argpartition, and votes are counted with array ops, so one call can classify
+    both sensors (or any number of readings) at once. Ties go to the label whose
+    nearest neighbor is closest, the same as the library classifier.
+    """
+
+    def __init__(self, n_neighbors=9, lut_step=None):
+        """
+        :param n_neighbors: k nearest training rows that vote
+        :param lut_step: if set, precompute a lookup table on a grid of this many units per axis
+                         so a prediction is one array index (approximate near class borders)
+        """
+        self.n_neighbors = n_neighbors
+        self.lut_step = lut_step
+        self.reset()
+
+    def reset(self):
+        self.x_train = None
+        self.y_train = None
+        self.labels = None
+        self.lut = None
+
+    def fit(self, x_train, y_train):
+        labels, codes = np.unique(np.asarray(y_train), return_inverse=True)
+        self.fit_codes(x_train, codes, labels)
+
+    def fit_codes(self, x_train, codes, labels, lut=None):
+        """Fits on label codes directly; lut is a table built earlier with the same data and lut_step."""
+        self.x_train = np.asarray(x_train, dtype=np.float64)
+        self.y_train = np.asarray(codes, dtype=np.intp)
+        self.labels = np.asarray(labels)
+        self._train_norms = np.einsum("ij,ij->i", self.x_train, self.x_train)
+        if not self.lut_step:
+            self.lut = None
+        else:
+            self.lut = lut if lut is not None else self._build_lut()
+
+    def predict(self, x_test):
+        return self.labels[self.predict_codes(np.asarray(x_test, dtype=np.float64).reshape(1, -1))[0]]
+
+    def predict_batch(self, x_test):
+        """Labels for every row of x_test, e.g. [front_hsvl, back_hsvl]."""
+        return self.labels[self.predict_codes(np.asarray(x_test, dtype=np.float64))]
+
+    def predict_codes(self, x_test):
+        if self.lut is not None:
+            return self.lut[self._lut_index(x_test)]
+        return self._vote(self._neighbors(x_test))
+
+    def _neighbors(self, x_test):
+        # squared distances: |t|^2 - 2 t.x + |x|^2, without the sqrt
+        distances = self._train_norms - 2.0 * (x_test @ self.x_train.T)
+        distances += np.einsum("ij,ij->i", x_test, x_test)[:, None]
+
+        k = min(self.n_neighbors, self.x_train.shape[0])
+        if k < self.x_train.shape[0]:
+            nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        else:
+            nearest = np.broadcast_to(np.arange(k), (x_test.shape[0], k))
+        # only the k winners get sorted, for the tie-break
+        order = np.take_along_axis(distances, nearest, axis=1).argsort(axis=1, kind="stable")
+        return self.y_train[np.take_along_axis(nearest, order, axis=1)]
+
+    def _vote(self, neighbor_codes):
+        rows, k = neighbor_codes.shape
+        row_index = np.arange(rows)
+
+        counts = np.zeros((rows, len(self.labels)), dtype=np.intp)
+        # rank of each label's closest neighbor; writing back to front leaves the first one
+        first = np.full((rows, len(self.labels)), k, dtype=np.intp)
+        for j in range(k - 1, -1, -1):
+            counts[row_index, neighbor_codes[:, j]] += 1
+            first[row_index, neighbor_codes[:, j]] = j
+
+        return np.argmax(counts * (k + 1) + (k - first), axis=1)
+
+    def _lut_index(self, x_test):
+        index = 0
+        for axis, (low, high) in enumerate(HSVL_RANGES):
+            size = (high - low) // self.lut_step + 1
+            cell = np.clip(((x_test[:, axis] - low) / self.lut_step).round().astype(np.intp), 0, size - 1)
+            index = index * size + cell
+        return index
+
+    def _build_lut(self, chunk=1024):
+        axes = [np.arange(low, high + self.lut_step, self.lut_step, dtype=np.float64)[:(high - low) // self.lut_step + 1]
+                for low, high in HSVL_RANGES]
+        grid = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, len(axes))
+
+        lut = np.empty(grid.shape[0], dtype=np.min_scalar_type(len(self.labels)))
+        for start in range(0, grid.shape[0], chunk):
+            lut[start:start + chunk] = self._vote(self._neighbors(grid[start:start + chunk]))
+        return lut
@@ -0,0 +1,126 @@
+#Python code
+import hashlib
+import json
+import os
+
+import codrone_edu
+import numpy as np
+
+import color_store
+
+
+# the dataset load_color_data() uses when none is given
+BUNDLED_DATA = os.path.join(os.path.dirname(os.path.abspath(codrone_edu.__file__)), "data")
+
+# compiled datasets live outside the dataset folder, so the bundled data works from a read-only install
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "codrone_edu", "color_models")
+
+# path -> ColorModel, so repeat loads in a loop never touch the disk beyond a stat
+_MODELS = {}
+
+
+class ColorModel:
+    """A color dataset compiled to arrays: every sample row plus a label code per row."""
+
+    def __init__(self, key, labels, counts, data, luts=None):
+        self.key = key
+        self.labels = labels
+        self.counts = counts
+        self.data = data
+        self.luts = luts if luts is not None else {}
+
+    @property
+    def x_train(self):
+        # hue, saturation, value, luminosity of the front sensor, as the library trains on
+        return self.data[:, 1:5]
+
+    @property
+    def codes(self):
+        return np.repeat(np.arange(len(self.labels)), self.counts)
+
+    @property
+    def y_train(self):
+        return self.labels[self.codes]
+
+    def samples(self):
+        """The per-label arrays Drone.load_color_data returns."""
+        return np.split(self.data, np.cumsum(self.counts)[:-1])
+
+
+def dataset_key(path):
+    """(name, size, mtime) of every label file; any edit to the dataset changes it."""
+    key = []
+    for label, filename in color_store.label_files(path).items():
+        stat = os.stat(os.path.join(path, filename))
+        key.append([filename, stat.st_size, stat.st_mtime_ns])
+    return key
+
+
+def cache_file(path):
+    name = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, name + ".npz")
+
+
+def load_model(path):
+    """
+    Returns (model, source) for the dataset folder at path.
+
+    source is "memory" when nothing changed since the last call, "cache" for a
+    binary load of the compiled model, and "files" when the label files had to be read.
+    """
+    key = dataset_key(path)
+    model = _MODELS.get(path)
+    if model is not None and model.key == key:
+        return model, "memory"
+
+    model = _read_cache(path, key)
+    source = "cache"
+    if model is None:
+        model = compile_dataset(path, key)
+        source = "files"
+        save_model(path, model)
+
+    _MODELS[path] = model
+    return model, source
+
+
+def compile_dataset(path, key=None):
+    """Reads every label file (.bin or .txt) in path into one ColorModel."""
+    if key is None:
+        key = dataset_key(path)
+    labels, counts, data = [], [], []
+    for filename, size, mtime in key:
+        rows = color_store.load(os.path.join(path, filename))
+        labels.append(os.path.splitext(filename)[0])
+        counts.append(len(rows))
+        data.append(rows)
+
+    data = np.vstack(data) if data else np.empty((0, 9))
+    return ColorModel(key, np.array(labels), np.array(counts, dtype=np.intp), data)
+
+
+def save_model(path, model):
+    """Writes model to the binary cache; a cache that can't be written only costs the next cold start."""
+    arrays = {"key": np.array(json.dumps(model.key)), "labels": model.labels, "counts": model.counts, "data": model.data}
+    for step, lut in model.luts.items():
+        arrays["lut_" + str(step)] = lut
+
+    filename = cache_file(path)
+    temporary = filename + ".tmp.npz"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        np.savez(temporary, **arrays)
+        os.replace(temporary, filename)
+    except OSError:
+        pass
+
+
+def _read_cache(path, key):
+    try:
+        with np.load(cache_file(path)) as cached:
+            if json.loads(str(cached["key"])) != key:
+                return None
+            luts = {int(name[4:]): cached[name] for name in cached.files if name.startswith("lut_")}
+            return ColorModel(key, cached["labels"], cached["counts"], cached["data"], luts)
+    except (OSError, KeyError, ValueError):
+        return None
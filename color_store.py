@@ -0,0 +1,114 @@
+#Python code
+import os
+from struct import Struct
+
+import numpy as np
+
+
+# <label>.bin: this header, then float64 rows appended back to back
+HEADER = Struct("<4sHHQ")  # magic, version, columns, reserved
+MAGIC = b"CDCS"
+VERSION = 1
+COLUMNS = 9  # what get_color_data()[0:9] returns
+
+BINARY = ".bin"
+TEXT = ".txt"
+
+
+def label_files(path):
+    """label -> file for every label in a dataset folder; a label's .bin wins over its old .txt."""
+    files = {}
+    for filename in sorted(os.listdir(path)):
+        label, extension = os.path.splitext(filename)
+        if extension == BINARY or (extension == TEXT and label not in files):
+            files[label] = filename
+    return files
+
+
+def create(filename, columns=COLUMNS):
+    with open(filename, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, columns, 0))
+
+
+def columns(filename):
+    with open(filename, "rb") as f:
+        magic, version, columns, reserved = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(filename + " is not a color data file")
+    return columns
+
+
+def count(filename):
+    """Rows in a .bin file, from its size alone."""
+    return (os.path.getsize(filename) - HEADER.size) // (columns(filename) * 8)
+
+
+def append(filename, rows):
+    """Adds rows to the end of a .bin file; costs only the new rows."""
+    rows = np.atleast_2d(np.asarray(rows, dtype="<f8"))
+    if rows.size == 0:
+        return 0
+    if rows.shape[1] != columns(filename):
+        raise ValueError("expected " + str(columns(filename)) + " values per sample, got " + str(rows.shape[1]))
+    with open(filename, "ab") as f:
+        f.write(rows.tobytes())
+    return len(rows)
+
+
+def read(filename):
+    """Every row of a .bin file as a read-only memory-mapped array."""
+    rows = count(filename)
+    if rows == 0:
+        return np.empty((0, columns(filename)))
+    return np.memmap(filename, dtype="<f8", mode="r", offset=HEADER.size, shape=(rows, columns(filename)))
+
+
+def load(filename):
+    """Rows of a .bin or .txt label file."""
+    if filename.endswith(BINARY):
+        return read(filename)
+    return np.atleast_2d(np.loadtxt(filename))
+
+
+def import_txt(text_file, binary_file):
+    """Converts a label .txt file written by np.savetxt into a .bin file."""
+    data = np.atleast_2d(np.loadtxt(text_file))
+    create(binary_file, data.shape[1])
+    append(binary_file, data)
+    return len(data)
+
+
+def export_txt(binary_file, text_file):
+    """Writes a .bin file back out as the .txt the library's load_color_data reads."""
+    np.savetxt(text_file, read(binary_file))
+
+
+class ColorWriter:
+    """Streams samples into a .bin file in small batches instead of holding a whole calibration in memory."""
+
+    def __init__(self, filename, columns=COLUMNS, append=False, flush_rows=50):
+        if not (append and os.path.exists(filename)):
+            create(filename, columns)
+        self.filename = filename
+        self.flush_rows = flush_rows
+        self.written = 0
+        self._pending = []
+
+    def write(self, sample):
+        self._pending.append(sample)
+        if len(self._pending) >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self.written += append(self.filename, self._pending)
+            self._pending = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,217 @@
+#Python code
+import heapq
+import itertools
+import time
+from contextlib import nullcontext
+from threading import Condition, Thread
+
+from colorama import Fore, Style
+
+from histogram import Histogram
+
+
+# lower runs first; anything not listed gets DEFAULT_PRIORITY
+PRIORITIES = {"emergency_stop": 0, "land": 1, "stop_moving": 2}
+DEFAULT_PRIORITY = 5
+
+# commands that interrupt whatever is running and drop lower-priority commands still queued
+PREEMPTING = {"emergency_stop", "land", "stop_moving"}
+
+# preempting commands that leave the drone holding where the cancel caught it
+HOLDING = {"stop_moving"}
+
+# preempting commands whose first frame is written by submit itself, not the flight thread
+DIRECT = {"emergency_stop"}
+
+# queued commands of these kinds fold into the one queued before them
+DISTANCE_COMMANDS = {"move_forward", "move_backward", "move_left", "move_right"}
+DURATION_COMMANDS = {"turn_left", "turn_right", "move_up", "move_down", "hover"}
+SETTING_COMMANDS = {"set_throttle", "set_yaw", "set_roll", "set_pitch"}
+
+
+class _Pending:
+    def __init__(self, priority, seq, command_data):
+        self.priority = priority
+        self.seq = seq
+        self.command_data = command_data
+        self.submitted = time.perf_counter()
+        self.collapsed = 1
+        self.preempted = False
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class CommandExecutor:
+    """
+    Runs command dicts ({"command": ..., "parameters": {...}}) on a dedicated flight thread.
+
+    Commands wait in a priority queue. emergency_stop, land and stop_moving cancel
+    the running command through drone.cancel_motion, so it ends within one control
+    tick, and drop the commands queued behind them. emergency_stop also writes the stop
+    frame straight from the submitting thread, since the drone serializes port
+    writes. Repeated moves that are still queued are merged into one.
+    """
+
+    def __init__(self, drone, execute):
+        """
+        :param drone: FastDrone, or None to only print (dry run)
+        :param execute: callback(drone, command_data) that flies one command
+        """
+        self.drone = drone
+        self.execute = execute
+
+        self.log = []  # one dict per finished command
+        self.emergency_latency = Histogram()  # ms from submit to the first emergency_stop, land or stop_moving frame
+        self.collapsed = 0
+        self.dropped = 0
+
+        self._queue = []
+        self._seq = itertools.count()
+        self._condition = Condition()
+        self._current = None
+        self._closed = False
+        self._thread = Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, command_data):
+        """Queues a command; returns immediately."""
+        name = command_data.get("command")
+        priority = PRIORITIES.get(name, DEFAULT_PRIORITY)
+
+        if name in DIRECT and self.drone is not None:
+            # the fast path: stop the motors now rather than after the flight thread wakes up
+            start = time.perf_counter()
+            self.drone.sendStop()
+            self.emergency_latency.record((time.perf_counter() - start) * 1000)
+
+        with self._condition:
+            if name in PREEMPTING:
+                kept = [pending for pending in self._queue if pending.priority <= priority]
+                self.dropped += len(self._queue) - len(kept)
+                self._queue = kept
+                heapq.heapify(self._queue)
+
+                current = self._current
+                if current is None or current.priority > priority:
+                    if current is not None:
+                        current.preempted = True
+                    if self.drone is not None:
+                        # also reaches a mission flying in the background after its command returned
+                        self.drone.cancel_motion(hold=name in HOLDING)
+
+            if not self._collapse(name, command_data):
+                heapq.heappush(self._queue, _Pending(priority, next(self._seq), command_data))
+            self._condition.notify_all()
+
+    def _collapse(self, name, command_data):
+        """Merges command_data into the newest queued command when that is the same move; True if merged."""
+        if not self._queue:
+            return False
+        last = max(self._queue, key=lambda pending: pending.seq)
+        if last.command_data.get("command") != name:
+            return False
+
+        params = command_data.get("parameters", {})
+        merged = last.command_data.setdefault("parameters", {})
+        if name in DISTANCE_COMMANDS:
+            if (merged.get("unit", "cm"), merged.get("speed", 1.0)) != (params.get("unit", "cm"), params.get("speed", 1.0)):
+                return False
+            merged["distance"] = float(merged.get("distance", 50.0)) + float(params.get("distance", 50.0))
+        elif name in DURATION_COMMANDS:
+            default = 3.0 if name == "hover" else 1.0
+            merged["duration"] = float(merged.get("duration", default)) + float(params.get("duration", default))
+        elif name in SETTING_COMMANDS or name in PREEMPTING:
+            # only the latest setting matters, and a second stop or land adds nothing
+            last.command_data["parameters"] = dict(params)
+        else:
+            return False
+
+        last.collapsed += 1
+        self.collapsed += 1
+        return True
+
+    def pending(self):
+        with self._condition:
+            return [pending.command_data for pending in sorted(self._queue)]
+
+    def _run(self):
+        while True:
+            # the motion scope is open before the command becomes current, so close() can always cancel it
+            with self.drone.motion() if self.drone is not None else nullcontext():
+                with self._condition:
+                    while not self._queue and not self._closed:
+                        self._condition.wait()
+                    if self._closed and not self._queue:
+                        return
+                    current = heapq.heappop(self._queue)
+                    self._current = current
+                    if self.drone is not None:
+                        # a cancel meant for the previous command must not stop this one
+                        self.drone.clear_cancel()
+
+                started = time.perf_counter()
+                first_frame = []
+                if self.drone is not None:
+                    self.drone.on_next_frame(first_frame.append)
+
+                try:
+                    self.execute(self.drone, current.command_data)
+                except Exception as e:
+                    print(Fore.RED + "Error running {0}: {1}".format(current.command_data.get("command"), e) + Style.RESET_ALL)
+                finished = time.perf_counter()
+                with self._condition:
+                    self._current = None
+                    self._condition.notify_all()
+            self._record(current, started, first_frame[0] if first_frame else None, finished)
+
+    def _record(self, pending, started, first_frame, finished):
+        entry = {
+            "command": pending.command_data.get("command"),
+            "wait_ms": round((started - pending.submitted) * 1000, 3),
+            "first_frame_ms": round((first_frame - pending.submitted) * 1000, 3) if first_frame else None,
+            "run_ms": round((finished - started) * 1000, 3),
+            "collapsed": pending.collapsed,
+            "preempted": pending.preempted,
+        }
+        self.log.append(entry)
+        if entry["command"] in PREEMPTING - DIRECT and entry["first_frame_ms"] is not None:
+            self.emergency_latency.record(entry["first_frame_ms"])
+        print("[executor] {command}: waited {wait_ms}ms, first frame {first_frame_ms}ms, ran {run_ms}ms".format(**entry)
+              + (" (preempted)" if entry["preempted"] else ""))
+
+    def wait_idle(self, timeout=None):
+        """Blocks until the queue is empty and nothing is running; False on timeout."""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        with self._condition:
+            while self._queue or self._current is not None:
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self, cancel=True):
+        """Stops the flight thread once the queue drains; cancel=True drops the queue and ends the running command."""
+        with self._condition:
+            if cancel:
+                self.dropped += len(self._queue)
+                self._queue = []
+                if self.drone is not None:
+                    self.drone.cancel_motion()
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout=5 if cancel else None)
+
+    def stats(self):
+        return {
+            "commands": len(self.log),
+            "collapsed": self.collapsed,
+            "dropped": self.dropped,
+            "preempted": sum(1 for entry in self.log if entry["preempted"]),
+            "emergency_ms": self.emergency_latency.snapshot(),
+        }
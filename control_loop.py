@@ -0,0 +1,82 @@
+#Python code
+import time
+
+from codrone_edu.protocol import DeviceType
+
+from histogram import Histogram
+
+
+class ControlLoop:
+    """
+    Runs a controller callback at a fixed rate.
+
+    Deadlines are absolute perf_counter times, so a slow iteration never shifts
+    the ones after it. Telemetry for the next tick is requested without waiting,
+    and the callback reads whatever has arrived in the drone's *_data lists.
+    """
+
+    def __init__(self, drone, controller, rate=50, telemetry=()):
+        """
+        :param drone: connected FastDrone
+        :param controller: callback(drone, elapsed_seconds); return False to stop early
+        :param rate: loop frequency in Hz
+        :param telemetry: DataTypes requested once per tick
+        """
+        self.drone = drone
+        self.controller = controller
+        self.rate = rate
+        self.telemetry = tuple(telemetry)
+
+        self.iterations = 0
+        self.overruns = 0
+        self.elapsed = 0.0
+        self.latency = Histogram()  # time spent in the callback
+        self.jitter = Histogram()   # how late each tick started against its deadline
+
+    def run(self, timeout):
+        """Runs until timeout seconds pass or the controller returns False."""
+        period = 1.0 / self.rate
+        start = time.perf_counter()
+        deadline = start
+
+        while True:
+            now = time.perf_counter()
+            elapsed = now - start
+            if elapsed >= timeout:
+                break
+
+            self.jitter.record((now - deadline) * 1000)
+
+            # ask for fresh data now so it has landed by the next tick
+            for dataType in self.telemetry:
+                self.drone.sendRequest(DeviceType.Drone, dataType)
+
+            keep_running = self.controller(self.drone, elapsed)
+            finished = time.perf_counter()
+            self.latency.record((finished - now) * 1000)
+            self.iterations += 1
+
+            if keep_running is False:
+                break
+
+            deadline += period
+            if finished > deadline:
+                # skip the ticks we missed instead of running them back to back
+                missed = int((finished - deadline) / period) + 1
+                self.overruns += missed
+                deadline += missed * period
+
+            time.sleep(max(0.0, deadline - time.perf_counter()))
+
+        self.elapsed = time.perf_counter() - start
+        return self.stats()
+
+    def stats(self):
+        return {
+            "rate": self.rate,
+            "iterations": self.iterations,
+            "achieved_rate": round(self.iterations / self.elapsed, 1) if self.elapsed else 0.0,
+            "overruns": self.overruns,
+            "latency_ms": self.latency.snapshot(),
+            "jitter_ms": self.jitter.snapshot(),
+        }
@@ -0,0 +1,172 @@
+#Python code
+import time
+
+import numpy as np
+import PIL.Image
+
+from codrone_edu.protocol import DisplayPixel
+
+
+# controller screen size
+WIDTH = 128
+HEIGHT = 64
+
+# controller_draw_image pixel lists are 127 wide, like controller_create_canvas
+LIST_WIDTH = 127
+
+
+def to_bitmap(image):
+    """
+    Black/white bitmap (True = black) of a PIL image or a controller_draw_image pixel list.
+
+    Uses the library's thresholds: a pixel is white when every channel is above 200,
+    or when a PNG pixel is fully transparent. Returns None for an unknown pixel format.
+    """
+    if isinstance(image, PIL.Image.Image):
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        pixels = np.asarray(image)
+    else:
+        pixels = np.asarray(image)
+        if pixels.ndim != 2:
+            return None
+        rows = -(-len(pixels) // LIST_WIDTH)
+        padded = np.full((rows * LIST_WIDTH, pixels.shape[1]), 255, dtype=pixels.dtype)
+        padded[:len(pixels)] = pixels
+        pixels = padded.reshape(rows, LIST_WIDTH, pixels.shape[1])
+
+    if pixels.shape[2] not in (3, 4):
+        return None
+
+    white = (pixels > 200).all(axis=2)
+    if pixels.shape[2] == 4:
+        white |= (pixels == 0).all(axis=2)
+
+    bitmap = np.zeros((HEIGHT, WIDTH), dtype=bool)
+    height, width = min(HEIGHT, white.shape[0]), min(WIDTH, white.shape[1])
+    bitmap[:height, :width] = ~white[:height, :width]
+    return bitmap
+
+
+def _rectangles(mask):
+    """Covers mask with rectangles (x, y, width, height): runs per row, merged down while the span repeats."""
+    rectangles = []
+    open_runs = {}
+    for y in range(mask.shape[0] + 1):
+        runs = set()
+        if y < mask.shape[0]:
+            row = np.concatenate(([False], mask[y], [False]))
+            edges = np.flatnonzero(row[1:] != row[:-1])
+            runs = set(zip(edges[0::2].tolist(), edges[1::2].tolist()))
+
+        for run in list(open_runs):
+            if run not in runs:
+                top = open_runs.pop(run)
+                rectangles.append((run[0], top, run[1] - run[0], y - top))
+        for run in runs:
+            open_runs.setdefault(run, y)
+    return rectangles
+
+
+def _fill(x, y, width, height, black):
+    if width == 1 and height == 1:
+        return ("point", x, y, black)
+    if height == 1:
+        return ("line", x, y, x + width - 1, y, black)
+    return ("rect", x, y, width, height, black)
+
+
+def plan(target, shadow):
+    """
+    Fewest display commands that turn shadow into target.
+
+    Two plans are tried and the shorter one kept: fill runs of each color that
+    contain a change (runs may cover pixels that already have that color), or
+    cover the changed pixels and fill or invert each rectangle.
+    """
+    changed = target != shadow
+    if not changed.any():
+        return []
+
+    fills = []
+    for black in (True, False):
+        color = target if black else ~target
+        # rows without a change of this color don't need drawing
+        rows = (changed & color).any(axis=1)
+        mask = color & rows[:, None]
+        for x, y, width, height in _rectangles(mask):
+            if (changed[y:y + height, x:x + width] & color[y:y + height, x:x + width]).any():
+                fills.append(_fill(x, y, width, height, black))
+
+    flips = []
+    for x, y, width, height in _rectangles(changed):
+        block = target[y:y + height, x:x + width]
+        if block.all() or not block.any():
+            flips.append(_fill(x, y, width, height, bool(block[0, 0])))
+        else:
+            flips.append(("invert", x, y, width, height))
+
+    return fills if len(fills) <= len(flips) else flips
+
+
+class Display:
+    """Shadow framebuffer for the controller screen; draws send only what differs from it."""
+
+    def __init__(self, drone, pace=0.002):
+        self.drone = drone
+        self.pace = pace  # seconds between frames so the controller keeps up
+        self.shadow = None  # unknown until the first clear
+        self.last_draw = None
+
+    def reset(self):
+        """Forget what the screen shows, e.g. after drawing on it some other way."""
+        self.shadow = None
+
+    def cleared(self, pixel):
+        if pixel is DisplayPixel.Black:
+            self.shadow = np.ones((HEIGHT, WIDTH), dtype=bool)
+        elif pixel is DisplayPixel.White:
+            self.shadow = np.zeros((HEIGHT, WIDTH), dtype=bool)
+        else:
+            self.shadow = None
+
+    def draw(self, target):
+        """Brings the screen to bitmap target and returns frames sent, pixels changed and seconds taken."""
+        start = time.perf_counter()
+        frames = 0
+        if self.shadow is None:
+            # start from whichever color covers most of the image
+            pixel = DisplayPixel.Black if target.sum() * 2 > target.size else DisplayPixel.White
+            self.drone.sendDisplayClearAll(pixel)
+            self.cleared(pixel)
+            frames += 1
+            time.sleep(self.pace)
+
+        changed = int((target != self.shadow).sum())
+        for command in plan(target, self.shadow):
+            self._send(command)
+            frames += 1
+            time.sleep(self.pace)
+        self.shadow = target.copy()
+
+        self.last_draw = {
+            "frames": frames,
+            "changed_pixels": changed,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+        return self.last_draw
+
+    def _send(self, command):
+        kind = command[0]
+        if kind == "invert":
+            x, y, width, height = command[1:]
+            self.drone.sendDisplayInvert(x, y, width, height)
+            return
+
+        pixel = DisplayPixel.Black if command[-1] else DisplayPixel.White
+        if kind == "point":
+            self.drone.sendDisplayDrawPoint(command[1], command[2], pixel)
+        elif kind == "line":
+            self.drone.sendDisplayDrawLine(command[1], command[2], command[3], command[4], pixel)
+        else:
+            self.drone.sendDisplayDrawRect(command[1], command[2], command[3], command[4], pixel, True)
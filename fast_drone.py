@@ -0,0 +1,1212 @@
+#Python code
+from contextlib import contextmanager
+from functools import wraps
+from math import sqrt, cos, sin, radians
+from threading import Lock, Condition, Event, Thread
+
+from codrone_edu.drone import *
+
+from frame_decoder import FrameDecoder
+from frame_encoder import FrameEncoder
+from telemetry import TelemetryScheduler, TELEMETRY
+from metrics import LinkMetrics, NdjsonExporter
+from capture import CaptureWriter, RX, TX
+from codec import CODECS, install as install_codecs
+from control_loop import ControlLoop
+from motion import Completion, body_to_world, to_meters
+import color_store
+
+
+# identification, plus the telemetry Drone() asks for before its port is even open
+CONNECT_REQUESTS = [
+    (DeviceType.Drone, DataType.Information), (DeviceType.Controller, DataType.Information),
+    DataType.Altitude, DataType.Range, DataType.Position, DataType.RawFlow, DataType.Motion,
+    DataType.Trim, DataType.CardColor, DataType.Count,
+]
+
+
+def motion_command(method):
+    """Runs a FastDrone method inside drone.motion(), so cancel_motion can end it."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.motion():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class FastDrone(Drone):
+    """Drone that reads and decodes the serial link in chunks instead of byte by byte."""
+
+    def __init__(self, *args, fast_connect=True, **kwargs):
+        self.fast_connect = fast_connect
+        self.connect_stats = None
+        self._decoder = FrameDecoder(CODECS)
+        self.metrics = LinkMetrics(self._decoder)  # None turns every hook off
+        self._metrics_log = None
+        self._capture = None
+        self._encoder = FrameEncoder()
+        self._transfer_lock = Lock()
+        self._received_at = {}
+        self._handled = 0
+        self._max_age_ms = {}
+        self._telemetry = None
+        self._arrival = Condition()
+        self.request_timeout = 0.05
+        self.control_rate = 50
+        self.last_loop_stats = None
+        self.motion_completion = True
+        self.motion_log = []
+        self._color_setup = None
+        self._display = None
+        self._cancel = Event()
+        self._hold_on_cancel = True
+        self._motion_lock = Lock()
+        self._motion_depth = 0
+        self._mission = None  # the running Mission, see Mission.start
+        self._frame_hooks = []
+        super().__init__(*args, **kwargs)
+        install_codecs(self._parser)
+
+    # --- Receiving ---
+    def _receiving(self):
+        while self._flagThreadRun:
+            serialport = self._serialport
+            try:
+                # block for the first byte, then take everything that is already waiting
+                data = serialport.read(1)
+                if not data:
+                    continue  # read timed out, check whether to stop
+                waiting = serialport.in_waiting
+                if waiting:
+                    data += serialport.read(waiting)
+            except (serial.SerialException, OSError, TypeError):
+                if not self._flagThreadRun:
+                    break  # the port was closed under the read
+                raise
+            self._bufferQueue.put(data)
+            self._chunk_read(data)
+
+            if self._flagCheckBackground:
+                self.check()
+
+    def _chunk_read(self, data):
+        if self.metrics is not None:
+            self.metrics.read(len(data), self._bufferQueue.qsize())
+        if self._capture is not None:
+            self._capture.write(RX, data)
+
+    def _decode(self):
+        """Moves queued chunks into the decoder and returns the complete frames."""
+        while not self._bufferQueue.empty():
+            dataArray = self._bufferQueue.get_nowait()
+            self._bufferQueue.task_done()
+
+            if (dataArray is not None) and (len(dataArray) > 0):
+                self._printReceiveData(dataArray)
+                self._decoder.feed(dataArray)
+
+        frames = self._decoder.decode()
+
+        for message in self._decoder.errors:
+            self._printReceiveDataEnd()
+            self._printError(message)
+
+        return frames
+
+    def check(self):
+        """Handles every complete frame that has arrived and returns the DataType of the last one."""
+        dataType = DataType.None_
+        for header, dataArray in self._decode():
+            self._printReceiveDataEnd()
+            if self._flagShowLogMessage:
+                self._printLog("Success / FrameDecoder / Receive complete / {0}".format(header.dataType))
+            dataType = self._handler(header, dataArray)
+        return dataType
+
+    def _handler(self, header, dataArray):
+        metrics = self.metrics
+        self._handled += 1
+        timed = metrics is not None and self._handled % metrics.handler_sample == 0
+        start = time.perf_counter() if timed else None
+        dataType = super()._handler(header, dataArray)
+        now = self._received_at[dataType] = time.perf_counter()
+        if metrics is not None:
+            metrics.received(header.dataType.value, header.length, (now - start) * 1000 if timed else None)
+        with self._arrival:
+            self._arrival.notify_all()
+        return dataType
+
+    def _runHandler(self, header, dataArray):
+        if isinstance(dataArray, tuple):
+            # the decoder already parsed it with the codec, see FrameDecoder.decode
+            self._storageHeader.d[header.dataType] = header
+            self._storage.d[header.dataType] = dataArray
+            self._storageCount.d[header.dataType] += 1
+        else:
+            super()._runHandler(header, dataArray)
+
+    def checkDetail(self):
+        header, data = None, None
+        for header, data in self._decode():
+            self._printReceiveDataEnd()
+            if self._flagShowLogMessage:
+                self._printLog("Success / FrameDecoder / Receive complete / {0}".format(header.dataType))
+            self._handler(header, data)
+        return header, data
+
+    # --- Telemetry handlers ---
+    # The codec messages are tuples in the order the lists keep, so these copy with one slice.
+    def update_position_data(self, drone_type):
+        data = self.position_data
+        data[0] = time.time() - self.timeStartProgram
+        data[1:4] = drone_type
+
+    def update_motion_data(self, drone_type):
+        data = self.motion_data
+        data[0] = time.time() - self.timeStartProgram
+        data[1:10] = drone_type
+
+    def update_raw_motion_data(self, drone_type):
+        data = self.raw_motion_data
+        data[0] = time.time() - self.timeStartProgram
+        data[1:7] = drone_type
+
+    def update_altitude_data(self, drone_type):
+        data = self.altitude_data
+        data[0] = time.time() - self.timeStartProgram
+        data[1:5] = drone_type
+
+    def update_flow_data(self, drone_type):
+        data = self.flow_data
+        data[0] = time.time() - self.timeStartProgram
+        data[1:3] = drone_type
+
+    def update_trim_data(self, drone_type):
+        data = self.trim_data
+        data[0] = time.time() - self.timeStartProgram
+        data[1:5] = drone_type
+
+    def update_range_data(self, drone_type):
+        data = self.range_data
+        data[0] = time.time() - self.timeStartProgram
+        data[1] = drone_type.front
+        data[2] = drone_type.bottom
+
+    # --- Transfer ---
+    def _send_frame(self, template, *values):
+        """Writes a preallocated frame; the returned buffer is reused by the next send."""
+        serialport = self._serialport
+        if serialport is None or not serialport.isOpen():
+            return None
+
+        with self._transfer_lock:
+            dataArray = template.encode(*values)
+            if template.data_type is DataType.Request and self.metrics is not None:
+                # before the write: the receive thread may handle the reply before write returns
+                self.metrics.requested(values[0])
+            serialport.write(dataArray)
+            self._printTransferData(dataArray)
+            self._frame_sent(template.data_type, dataArray)
+        return dataArray
+
+    def transfer(self, header, data):
+        if self._swarm:
+            return super().transfer(header, data)
+
+        # share the lock with the template path so frames never interleave on the port
+        with self._transfer_lock:
+            dataArray = super().transfer(header, data)
+            if dataArray is not None:
+                self._frame_sent(header.dataType, dataArray)
+        return dataArray
+
+    def on_next_frame(self, callback):
+        """Calls callback(perf_counter) once, when the next command frame (not a telemetry request) is written."""
+        self._frame_hooks.append(callback)
+
+    def _frame_sent(self, dataType, dataArray):
+        if self.metrics is not None:
+            self.metrics.sent(dataType.value, len(dataArray))
+        if self._capture is not None:
+            self._capture.write(TX, dataArray)
+        if self._frame_hooks and dataType is not DataType.Request:
+            now = time.perf_counter()
+            hooks, self._frame_hooks = self._frame_hooks, []
+            for callback in hooks:
+                callback(now)
+
+    def sendRequest(self, deviceType, dataType):
+        if (not isinstance(deviceType, DeviceType)) or (not isinstance(dataType, DataType)):
+            return None
+        if self._swarm:
+            return super().sendRequest(deviceType, dataType)
+
+        return self._send_frame(self._encoder.request(deviceType), dataType.value)
+
+    def sendControl(self, roll, pitch, yaw, throttle):
+        if ((not isinstance(roll, int)) or (not isinstance(pitch, int)) or (not isinstance(yaw, int)) or (
+                not isinstance(throttle, int))):
+            return None
+        if self._swarm:
+            return super().sendControl(roll, pitch, yaw, throttle)
+
+        self._control.roll = roll
+        self._control.pitch = pitch
+        self._control.yaw = yaw
+        self._control.throttle = throttle
+
+        return self._send_frame(self._encoder.control, roll, pitch, yaw, throttle)
+
+    def sendControlPosition(self, positionX, positionY, positionZ, velocity, heading, rotationalVelocity):
+        for value in (positionX, positionY, positionZ, velocity):
+            if not (isinstance(value, float) or isinstance(value, int)):
+                return None
+
+        if (not isinstance(heading, int)) or (not isinstance(rotationalVelocity, int)):
+            return None
+        if self._swarm:
+            return super().sendControlPosition(positionX, positionY, positionZ, velocity, heading, rotationalVelocity)
+
+        return self._send_frame(self._encoder.control_position, positionX, positionY, positionZ, velocity, heading, rotationalVelocity)
+
+    def sendLightDefaultColor(self, lightMode, interval, r, g, b):
+        if ((not isinstance(interval, int)) or
+                (not isinstance(r, int)) or
+                (not isinstance(g, int)) or
+                (not isinstance(b, int))):
+            return None
+        if self._swarm:
+            return super().sendLightDefaultColor(lightMode, interval, r, g, b)
+
+        if isinstance(lightMode, LightModeDrone):
+            return self._send_frame(self._encoder.light_drone, lightMode.value, interval, r, g, b)
+        elif isinstance(lightMode, LightModeController):
+            return self._send_frame(self._encoder.light_controller, lightMode.value, interval, r, g, b)
+        elif isinstance(lightMode, int):
+            return self._send_frame(self._encoder.light_drone, lightMode, interval, r, g, b)
+        return None
+
+    def _start_drone_buzzer_desktop(self, header, data):
+        self._send_frame(self._encoder.buzzer_drone, data.mode.value, data.value, data.time)
+        sleep(0.07)
+
+    def _stop_drone_buzzer_desktop(self, header, data):
+        self._send_frame(self._encoder.buzzer_drone, data.mode.value, data.value, data.time)
+        sleep(0.1)
+
+    # --- Requests ---
+    def request_and_wait(self, dataType, timeout=None, deviceType=DeviceType.Drone):
+        """
+        Requests dataType and returns as soon as the reply is handled.
+
+        :param dataType: DataType to request
+        :param timeout: seconds to wait for the reply, defaults to request_timeout
+        :param deviceType: device the request is sent to
+        :return: True if the reply arrived before the timeout
+        """
+        return self.request_many([(deviceType, dataType)], timeout)[dataType]
+
+    def request_many(self, requests, timeout=None):
+        """
+        Sends every request back to back, then waits until all replies are handled.
+
+        :param requests: list of DataType or (DeviceType, DataType) tuples
+        :param timeout: seconds to wait for all replies, defaults to request_timeout
+        :return: dict of DataType -> True if every reply of that type arrived
+        """
+        expected = {}
+        for request in requests:
+            deviceType, dataType = request if isinstance(request, tuple) else (DeviceType.Drone, request)
+            count = expected.get(dataType, self.getCount(dataType))
+            # a request that never reached the port has no reply to wait for
+            if self.sendRequest(deviceType, dataType) is not None:
+                count += 1
+            expected[dataType] = count
+
+        return self._wait_for(expected, timeout)
+
+    def _wait_for(self, expected, timeout):
+        deadline = time.perf_counter() + (self.request_timeout if timeout is None else timeout)
+        with self._arrival:
+            while any(self.getCount(dataType) < count for dataType, count in expected.items()):
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._arrival.wait(remaining)
+
+        return {dataType: self.getCount(dataType) >= count for dataType, count in expected.items()}
+
+    def _get_sensor_data_desktop(self, delay=0.01):
+        self.request_many([DataType.Altitude, DataType.Motion, DataType.Position, DataType.Range, DataType.State],
+                          max(delay * 5, self.request_timeout))
+        return self.altitude_data + self.motion_data + self.position_data + self.range_data + self.state_data
+
+    def _get_error_data_desktop(self, delay=0.2, print_error=True):
+        self.request_and_wait(DataType.Error, delay)
+        self._print_error_data(print_error)
+        return self.error_data
+
+    def _get_count_desktop(self, delay=0.05):
+        self.request_and_wait(DataType.Count, max(delay, self.request_timeout))
+        return self.count_data
+
+    def _get_information_data_desktop(self, delay=0.05):
+        self.request_many([(DeviceType.Drone, DataType.Information), (DeviceType.Controller, DataType.Information)],
+                          max(delay * 2, self.request_timeout))
+        return self.information_data
+
+    def _get_address_data_desktop(self, delay=0.05):
+        # the reply handler keeps only the latest address, so ask one device at a time
+        self.request_and_wait(DataType.Address, max(delay, self.request_timeout), DeviceType.Drone)
+        self.update_address(DeviceType.Drone, self._address)
+
+        self.request_and_wait(DataType.Address, max(delay, self.request_timeout), DeviceType.Controller)
+        self.update_address(DeviceType.Controller, self._address)
+
+        return self.address_data
+
+    def _get_cpu_id_data_desktop(self, delay):
+        self.request_and_wait(DataType.CpuID, max(delay, self.request_timeout), DeviceType.Drone)
+        self.update_cpu_id_data(DeviceType.Drone, self._cpuId)
+        self._cpuId = []
+
+        self.request_and_wait(DataType.CpuID, max(delay, self.request_timeout), DeviceType.Controller)
+        self.update_cpu_id_data(DeviceType.Controller, self._cpuId)
+        self._cpuId = []
+
+        return self.cpu_id_data
+
+    def _get_lostconnection_data_desktop(self, delay=0.05):
+        # the library has no parser for LostConnection replies, so there is nothing to wait for
+        self.sendRequest(DeviceType.Controller, DataType.LostConnection)
+        return self.lostconnection_data
+
+    # --- Telemetry ---
+    def start_telemetry(self, rates, max_age_ms=None):
+        """
+        Requests telemetry in the background so getters can return cached data.
+
+        :param rates: dict of DataType -> requests per second, e.g. {DataType.Range: 20}; 0 stops one
+        :param max_age_ms: how old cached data may be before a getter requests it again,
+        defaults to two request periods
+        :return: None
+        """
+        if self._telemetry is None:
+            self._telemetry = TelemetryScheduler(self)
+
+        for dataType, rate in rates.items():
+            self._telemetry.register(dataType, rate)
+            if rate == 0:
+                self._max_age_ms.pop(dataType, None)
+            else:
+                self._max_age_ms[dataType] = max_age_ms if max_age_ms is not None else 2000.0 / rate
+
+        self._start_telemetry_scheduler()
+
+    def _start_telemetry_scheduler(self):
+        self._telemetry.start()
+
+    def stop_telemetry(self):
+        if self._telemetry is not None:
+            self._telemetry.stop()
+            self._telemetry = None
+        self._max_age_ms.clear()
+
+    def telemetry_rates(self):
+        """Target, requested and received rates (Hz) for every scheduled DataType."""
+        if self._telemetry is None:
+            return {}
+        return self._telemetry.rates()
+
+    def data_age_ms(self, dataType):
+        """Milliseconds since a frame of dataType was last received."""
+        received = self._received_at.get(dataType)
+        if received is None:
+            return float("inf")
+        return (time.perf_counter() - received) * 1000
+
+    def _get_telemetry(self, dataType, delay, max_age_ms):
+        data = getattr(self, TELEMETRY[dataType])
+
+        if max_age_ms is None:
+            max_age_ms = self._max_age_ms.get(dataType)
+        if max_age_ms is not None and self.data_age_ms(dataType) <= max_age_ms:
+            return data
+
+        self.request_and_wait(dataType, max(delay, self.request_timeout))
+        return data
+
+    def get_altitude_data(self, delay=0.01, max_age_ms=None):
+        if self._swarm:
+            return super().get_altitude_data(delay)
+        return self._get_telemetry(DataType.Altitude, delay, max_age_ms)
+
+    def get_range_data(self, delay=0.01, max_age_ms=None):
+        if self._swarm:
+            return super().get_range_data(delay)
+        return self._get_telemetry(DataType.Range, delay, max_age_ms)
+
+    def get_position_data(self, delay=0.01, max_age_ms=None):
+        if self._swarm:
+            return super().get_position_data(delay)
+        return self._get_telemetry(DataType.Position, delay, max_age_ms)
+
+    def get_flow_data(self, delay=0.01, max_age_ms=None):
+        if self._swarm:
+            return super().get_flow_data(delay)
+        return self._get_telemetry(DataType.RawFlow, delay, max_age_ms)
+
+    def get_state_data(self, delay=0.01, max_age_ms=None):
+        if self._swarm:
+            return super().get_state_data(delay)
+        return self._get_telemetry(DataType.State, delay, max_age_ms)
+
+    def get_motion_data(self, delay=0.01, max_age_ms=None):
+        if self._swarm:
+            return super().get_motion_data(delay)
+        return self._get_telemetry(DataType.Motion, delay, max_age_ms)
+
+    def get_raw_motion_data(self, delay=0.01, max_age_ms=None):
+        if self._swarm:
+            return super().get_raw_motion_data(delay)
+        return self._get_telemetry(DataType.RawMotion, delay, max_age_ms)
+
+    def get_color_data(self, delay=0.01, max_age_ms=None):
+        if self._swarm:
+            return super().get_color_data(delay)
+        return self._get_telemetry(DataType.CardColor, delay, max_age_ms)
+
+    def get_joystick_data(self, delay=0.01, max_age_ms=None):
+        if self._swarm:
+            return super().get_joystick_data(delay)
+        return self._get_telemetry(DataType.Joystick, delay, max_age_ms)
+
+    def get_trim_data(self, delay=0.08, max_age_ms=None):
+        if self._swarm:
+            return super().get_trim_data(delay)
+        return self._get_telemetry(DataType.Trim, delay, max_age_ms)
+
+    # --- Control loops ---
+    @motion_command
+    def run_control_loop(self, controller, timeout, rate=None, telemetry=()):
+        """
+        Runs controller(drone, elapsed) at a fixed rate, see ControlLoop.
+
+        :return: loop statistics, also kept in last_loop_stats
+        """
+        def cancellable(drone, elapsed):
+            if self._cancel.is_set():
+                return False
+            return controller(drone, elapsed)
+
+        loop = ControlLoop(self, cancellable, rate or self.control_rate, telemetry)
+        self.last_loop_stats = loop.run(timeout)
+        return self.last_loop_stats
+
+    @motion_command
+    def _turn_degree_desktop(self, degree, timeout=3, p_value=10):
+        # make sure you arent moving
+        self.hover(0.01)
+        desired_angle = max(-180, min(180, degree))
+
+        def controller(drone, elapsed):
+            # find the distance to the desired angle and the shorter way around
+            degree_diff = desired_angle - drone.motion_data[9]
+            degree_dist_1 = abs(degree_diff)
+            sign = degree_diff / degree_dist_1 if degree_dist_1 > 0 else 1
+            degree_dist_2 = 360 - degree_dist_1
+
+            if degree_dist_1 <= degree_dist_2:
+                error_percent = min(100, int(int(degree_dist_1 / 360 * 100) * p_value))
+                speed = int(sign * error_percent)
+            else:
+                error_percent = min(100, int(int(degree_dist_2 / 360 * 100) * p_value))
+                speed = int(-1 * sign * error_percent)
+            drone.sendControl(0, 0, speed, 0)
+
+        self.run_control_loop(controller, timeout, telemetry=[DataType.Motion])
+
+        # stop any movement just in case
+        self.hover(0.05)
+
+    @motion_command
+    def _keep_distance_desktop(self, timeout=2, distance=50):
+        threshold = 10
+        p_value = 0.4
+
+        def controller(drone, elapsed):
+            current_distance = drone.convert_millimeter(drone.range_data[1], "cm")
+            speed = int(drone.percent_error(desired=distance, current=current_distance) * p_value)
+
+            if current_distance > distance + threshold or current_distance < distance - threshold:
+                drone.sendControl(0, speed, 0, 0)
+            else:
+                drone.sendControl(0, 0, 0, 0)
+
+        self.run_control_loop(controller, timeout, telemetry=[DataType.Range])
+
+    @motion_command
+    def _avoid_wall_desktop(self, timeout=2, distance=70):
+        threshold = 20
+        p_value = 0.4
+        settled = 0
+
+        def controller(drone, elapsed):
+            nonlocal settled
+            current_distance = drone.convert_millimeter(drone.range_data[1], "cm")
+            speed = int(drone.percent_error(desired=distance, current=current_distance) * p_value)
+
+            if current_distance > distance + threshold or current_distance < distance - threshold:
+                drone.sendControl(0, speed, 0, 0)
+            else:
+                drone.sendControl(0, 0, 0, 0)
+                settled += 1
+                if settled == 20:
+                    return False
+
+        self.run_control_loop(controller, timeout, telemetry=[DataType.Range])
+        self.hover()
+
+    # --- Cancellation ---
+    def cancel_motion(self, hold=True):
+        """
+        Ends the running motion command within one control tick, from any thread.
+
+        :param hold: send a zero position move so a cancelled position move stops where it is;
+                     pass False when the next command (land, emergency_stop) takes over anyway
+        """
+        mission = self._mission
+        if mission is not None:
+            # a mission started with wait=False runs outside the caller's motion scope
+            mission.cancel(hold)
+        with self._motion_lock:
+            if self._motion_depth == 0:
+                # nothing is moving, and a cancel must not outlive the command it was meant for
+                return
+            self._hold_on_cancel = hold
+            self._cancel.set()
+
+    def clear_cancel(self):
+        self._cancel.clear()
+
+    @contextmanager
+    def motion(self):
+        """
+        Scope of one motion command: cancel_motion ends it, and the cancel is spent once it is over.
+
+        Scopes nest, so a command built from other commands is cancelled as a whole.
+        """
+        with self._motion_lock:
+            self._motion_depth += 1
+        try:
+            yield
+        finally:
+            with self._motion_lock:
+                self._motion_depth -= 1
+                if self._motion_depth == 0:
+                    self._cancel.clear()
+
+    def motion_cancelled(self):
+        return self._cancel.is_set()
+
+    def wait(self, seconds):
+        """Sleeps like time.sleep, but returns early once cancel_motion is called."""
+        return self._cancel.wait(seconds)
+
+    @motion_command
+    def _hover_desktop(self, duration=0.01):
+        self.sendControl(0, 0, 0, 0)
+        self.wait(duration)
+
+    @motion_command
+    def _sendControlWhile_desktop(self, roll, pitch, yaw, throttle, timeMs):
+        if ((not isinstance(roll, int)) or
+                (not isinstance(pitch, int)) or
+                (not isinstance(yaw, int)) or
+                (not isinstance(throttle, int))):
+            return None
+
+        time_sec = timeMs / 1000
+        time_start = time.perf_counter()
+        while (time.perf_counter() - time_start) < time_sec and not self._cancel.is_set():
+            self.sendControl(roll, pitch, yaw, throttle)
+            self.wait(0.003)
+
+    @motion_command
+    def _spiral_desktop(self, speed=50, seconds=5, direction=1):
+        power = int(speed)
+        self.sendControl(0, power, 100 * -direction, -power)
+        self.wait(seconds)
+
+    # --- Motion completion ---
+    def _finish_motion(self, command, ceiling, completion):
+        """
+        Waits until completion says the command is done, or ceiling seconds at most.
+
+        The ceiling is the library's worst-case sleep, so nothing waits longer than before.
+        A cancelled command stops where it is.
+        """
+        if not self.motion_completion:
+            if self.wait(ceiling):
+                self._hold_cancelled(completion)
+            return
+
+        telemetry = [DataType.Position, DataType.State]
+        if completion.heading is not None:
+            telemetry.append(DataType.Motion)
+
+        start = time.perf_counter()
+        self.run_control_loop(completion, ceiling, telemetry=telemetry)
+        elapsed = time.perf_counter() - start
+        if self._cancel.is_set():
+            self._hold_cancelled(completion)
+
+        self.motion_log.append({
+            "command": command,
+            "completed": completion.completed,
+            "elapsed": round(elapsed, 3),
+            "ceiling": round(ceiling, 3),
+            "saved": round(max(0.0, ceiling - elapsed), 3),
+        })
+
+    def _hold_cancelled(self, completion):
+        if self._hold_on_cancel and completion.target is not None:
+            # hold the current position instead of flying on to the old target
+            self.sendControlPosition(0.0, 0.0, 0.0, 0.5, 0, 0)
+
+    def motion_time_saved(self):
+        """Seconds saved against the library sleeps by every motion command so far."""
+        return round(sum(entry["saved"] for entry in self.motion_log), 3)
+
+    @motion_command
+    def _move_relative(self, command, dx, dy, speed):
+        if speed <= 0:
+            # checked before anything is sent, so the drone never moves without a completion wait
+            print(Fore.RED + "Error: speed must be greater than 0." + Style.RESET_ALL)
+            return
+        # cap the speed
+        speed = min(2, speed)
+
+        self.request_many([DataType.Position, DataType.Motion])
+        target = body_to_world(self, dx, dy, 0)
+
+        self.sendControlPosition(positionX=dx, positionY=dy, positionZ=0, velocity=speed, heading=0, rotationalVelocity=0)
+        self._finish_motion(command, sqrt(dx ** 2 + dy ** 2) / speed + 1.0, Completion(target))
+
+    def _move_forward_desktop(self, distance, units="cm", speed=1.0):
+        distance_meters = to_meters(distance, units)
+        if distance_meters is None:
+            print(Fore.RED + "Error: Not a valid unit." + Style.RESET_ALL)
+            return
+        self._move_relative("move_forward", distance_meters, 0, speed)
+
+    def _move_backward_desktop(self, distance, units="cm", speed=1.0):
+        distance_meters = to_meters(distance, units)
+        if distance_meters is None:
+            print(Fore.RED + "Error: Not a valid unit." + Style.RESET_ALL)
+            return
+        self._move_relative("move_backward", -distance_meters, 0, speed)
+
+    def _move_left_desktop(self, distance, units="cm", speed=1.0):
+        distance_meters = to_meters(distance, units)
+        if distance_meters is None:
+            print(Fore.RED + "Error: Not a valid unit." + Style.RESET_ALL)
+            return
+        self._move_relative("move_left", 0, distance_meters, speed)
+
+    def _move_right_desktop(self, distance, units="cm", speed=1.0):
+        distance_meters = to_meters(distance, units)
+        if distance_meters is None:
+            print(Fore.RED + "Error: Not a valid unit." + Style.RESET_ALL)
+            return
+        self._move_relative("move_right", 0, -distance_meters, speed)
+
+    @motion_command
+    def _move_distance_desktop(self, positionX, positionY, positionZ, velocity):
+        if velocity <= 0:
+            print(Fore.RED + "Error: velocity must be greater than 0." + Style.RESET_ALL)
+            return
+        self.request_many([DataType.Position, DataType.Motion])
+        target = body_to_world(self, positionX, positionY, positionZ)
+
+        self.sendControlPosition(positionX, positionY, positionZ, velocity, 0, 0)
+        distance = sqrt(positionX ** 2 + positionY ** 2 + positionZ ** 2)
+        self._finish_motion("move_distance", distance / velocity + 2.5, Completion(target))
+
+    @motion_command
+    def _send_absolute_position_desktop(self, positionX, positionY, positionZ, velocity, heading, rotationalVelocity):
+        for name, value in (("positionX", positionX), ("positionY", positionY), ("positionZ", positionZ), ("velocity", velocity)):
+            if not (isinstance(value, float) or isinstance(value, int)):
+                print(Fore.RED + "Error: " + name + " must be an int or float." + Style.RESET_ALL)
+                return
+
+        if (not isinstance(heading, int)) or (not isinstance(rotationalVelocity, int)):
+            print(Fore.RED + "Error: heading or rotationalVelocity must be an int." + Style.RESET_ALL)
+            return
+
+        # one fresh reading replaces the library's three sleeps
+        self.request_many([DataType.Position, DataType.Motion], 0.1)
+        pos_data = self.position_data
+        z_angle = self.motion_data[9]
+        z_angle_rad = radians(z_angle)
+
+        # deltas in the world reference frame (the original reference frame when the drone is paired)
+        dx = float(positionX) - (self.previous_land[0] + pos_data[1])
+        dy = float(positionY) - (self.previous_land[1] + pos_data[2])
+        dz = positionZ - pos_data[3]
+
+        # transform deltas into drone's reference frame
+        dx_prime = dx * cos(z_angle_rad) + dy * sin(z_angle_rad)
+        dy_prime = -dx * sin(z_angle_rad) + dy * cos(z_angle_rad)
+        # shortest delta from "z_angle" to "heading"
+        heading_delta = ((int(heading) - z_angle + 180) % 360) - 180
+
+        distance = sqrt(dx_prime ** 2 + dy_prime ** 2 + dz ** 2)
+        if rotationalVelocity == 0:
+            wait = (distance / velocity) + 1
+        elif velocity == 0:
+            wait = (abs(heading_delta) / rotationalVelocity) + 1
+        else:
+            wait = max((distance / velocity) + 1, (abs(heading_delta) / rotationalVelocity) + 1)
+
+        target = (pos_data[1] + dx, pos_data[2] + dy, positionZ)
+        self.sendControlPosition(dx_prime, dy_prime, dz, float(velocity), heading_delta, rotationalVelocity)
+        self._finish_motion("send_absolute_position", wait + 1.25, Completion(target, heading=int(heading)))
+
+    @motion_command
+    def _goto_waypoint_desktop(self, waypoint, velocity):
+        for value in (waypoint[0], waypoint[1], waypoint[2], velocity):
+            if not (isinstance(value, float) or isinstance(value, int)):
+                return None
+        if velocity <= 0:
+            print(Fore.RED + "Error: velocity must be greater than 0." + Style.RESET_ALL)
+            return None
+
+        self.request_and_wait(DataType.Position)
+        positionX = float(waypoint[0]) - (self.previous_land[0] + self.position_data[1])
+        positionY = float(waypoint[1]) - (self.previous_land[1] + self.position_data[2])
+        target = (self.position_data[1] + positionX, self.position_data[2] + positionY, self.position_data[3])
+
+        self.sendControlPosition(positionX, positionY, 0.0, float(velocity), 0, 0)
+        self._finish_motion("goto_waypoint", sqrt(positionX ** 2 + positionY ** 2) / velocity + 1, Completion(target))
+
+    @motion_command
+    def _takeoff_desktop(self):
+        self.reset_move_values()
+        self.sendTakeOff()
+
+        timeout = 4
+        init_time = time.perf_counter()
+        while time.perf_counter() - init_time < timeout:
+            if self.get_state_data()[2] is ModeFlight.TakeOff:
+                break
+            self.sendTakeOff()
+            if self.wait(0.01):
+                return
+
+        self._finish_motion("takeoff", 4, Completion(flight=ModeFlight.Flight))
+
+    @motion_command
+    def _land_desktop(self):
+        self.reset_move_values()
+        # reset the land coordinate back to zero
+        position = self.get_position_data()
+        self.previous_land[0] = self.previous_land[0] + position[1]
+        self.previous_land[1] = self.previous_land[1] + position[2]
+        self.sendLanding()
+
+        timeout = 4
+        init_time = time.perf_counter()
+        while time.perf_counter() - init_time < timeout:
+            if self.get_state_data()[2] is ModeFlight.Landing:
+                break
+            self.sendLanding()
+            if self.wait(0.01):
+                return
+
+        self._finish_motion("land", 4, Completion(flight=ModeFlight.Ready))
+
+    # --- Missions ---
+    @motion_command
+    def fly_mission(self, waypoints=None, velocity=0.5, blend=0.0, on_progress=None, wait=True):
+        """
+        Flies waypoints (default: the ones saved with set_waypoint) back to back.
+
+        :param blend: corner radius in meters, 0 to stop at every waypoint
+        :param wait: False to return the running Mission for pause/abort
+        """
+        from mission import Mission
+        mission = Mission(self, velocity=velocity, blend=blend, on_progress=on_progress)
+        mission.add_waypoints(self.waypoint_data if waypoints is None else waypoints)
+        if not wait:
+            mission.start()
+            return mission
+        return mission.run()
+
+    @motion_command
+    def goto_waypoints(self, waypoints, velocity=0.5):
+        """Flies the same path one goto_waypoint call at a time, for comparison with fly_mission."""
+        start = time.perf_counter()
+        first = len(self.motion_log)
+        for waypoint in waypoints:
+            self.goto_waypoint(waypoint, velocity)
+        total = time.perf_counter() - start
+        busy = sum(entry["elapsed"] for entry in self.motion_log[first:])
+        return {"legs": len(waypoints), "total_time": round(total, 3), "idle_gap_ms": round((total - busy) * 1000, 3)}
+
+    # --- Color ---
+    def load_color_data(self, dataset=None, show_graph=False, engine="fast", lut_step=None):
+        """
+        Loads a color dataset into the classifier picked by engine.
+
+        The dataset is compiled once into a binary cache keyed on its files' names,
+        sizes and mtimes; calling this again with nothing changed does no work.
+
+        :param engine: "fast" for FastColorClassifier, "library" for codrone_edu's ColorClassifier
+        :param lut_step: grid step for the fast engine's lookup table, None to skip it
+        """
+        if engine not in ("fast", "library"):
+            print(Fore.RED + "Error: Unknown color engine \"" + str(engine) + "\"." + Style.RESET_ALL)
+            return None
+
+        from color_classifier import FastColorClassifier
+        from color_model import load_model, save_model
+
+        path = self._color_dataset_path(dataset)
+        model, source = load_model(path)
+        setup = (path, engine, lut_step)
+        if source == "memory" and self._color_setup == setup and self.knn.x_train is not None:
+            return model.samples()
+
+        if len(model.labels) < 3:
+            print(Fore.RED + "Error: Dataset must have at least 3 labels to call load_color_data()." + Style.RESET_ALL)
+        if len(set(model.counts.tolist())) > 1:
+            print(Fore.RED + "Error: Files do not have the same number of samples." + Style.RESET_ALL)
+            for (filename, size, mtime), count in zip(model.key, model.counts):
+                print("samples ", count, " filename ", filename)
+
+        if engine == "fast":
+            self.knn = FastColorClassifier(n_neighbors=9, lut_step=lut_step)
+            self.knn.fit_codes(model.x_train, model.codes, model.labels, model.luts.get(lut_step))
+            if lut_step and lut_step not in model.luts:
+                model.luts[lut_step] = self.knn.lut
+                save_model(path, model)
+        else:
+            self.knn = ColorClassifier(n_neighbors=9)
+            self.knn.fit(model.x_train.tolist(), model.y_train.tolist())
+        self._color_setup = setup
+
+        if show_graph:
+            from mpl_toolkits import mplot3d
+            import matplotlib.pyplot as plt
+            fig = plt.figure()
+            ax = fig.add_subplot(projection='3d')
+            ax.scatter3D(model.data[:, 1], model.data[:, 2], model.data[:, 3], c=model.data[:, 3])
+            plt.show()
+        print("Successfully loaded \"" + (dataset if dataset is not None else "default") + "\" dataset.")
+        return model.samples()
+
+    def _color_dataset_path(self, dataset):
+        if dataset is None:  # path to default data inside of cde lib
+            from color_model import BUNDLED_DATA
+            return BUNDLED_DATA
+
+        path = os.path.join(self.parent_dir, dataset)  # user defined data
+        if not os.path.isdir(path):
+            print(Fore.RED + "Error: Cannot load color data. Dataset \"" + dataset + "\" does not exist.")
+            print("Use new_color_data() method to add data." + Style.RESET_ALL)
+            self.disconnect()
+            exit()
+        if len(os.listdir(path)) == 0:
+            print(Fore.RED + "Error: Cannot load color data. Dataset \"" + dataset + "\" is empty.")
+            print("Use the new_color_data() method to add data." + Style.RESET_ALL)
+            self.disconnect()
+            exit()
+        return path
+
+    def detect_colors(self, color_data):
+        from color_classifier import FastColorClassifier
+        if not isinstance(self.knn, FastColorClassifier) or self.knn.x_train is None:
+            return super().detect_colors(color_data)
+        # front and back sensor in one call
+        prediction = self.knn.predict_batch([color_data[1:5], color_data[5:9]])
+        return [str(prediction[0]), str(prediction[1])]
+
+    # --- Color data storage ---
+    def new_color_data(self, label, data, dataset):
+        """
+        Creates label.bin in a dataset folder, replacing any earlier data for the label.
+
+        :param label: String label name that will be used for the filename
+        :param data: List of HSV data samples
+        :param dataset: String folder name where the file will be stored.
+        """
+        path = os.path.join(self.parent_dir, dataset)
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        print("Adding " + label + " to", dataset)
+
+        data = np.atleast_2d(np.asarray(data, dtype=float))
+        filename = os.path.join(path, label + color_store.BINARY)
+        color_store.create(filename, data.shape[1])
+        color_store.append(filename, data)
+
+        # the .bin replaces the label's old text file
+        text_file = os.path.join(path, label + color_store.TEXT)
+        if os.path.exists(text_file):
+            os.remove(text_file)
+
+    def append_color_data(self, label, data, dataset):
+        """
+        Appends samples to an existing label without rewriting what is already stored.
+
+        A label still in .txt form is converted to .bin on its first append.
+        """
+        filename = self._color_label_file(label, dataset)
+        if filename is None:
+            print(Fore.RED + "Error: Cannot append data. Folder and file do not exist. Use new_color_data()." + Style.RESET_ALL)
+            return
+
+        print("Appending data to " + label + "...")
+        if filename.endswith(color_store.TEXT):
+            binary_file = filename[:-len(color_store.TEXT)] + color_store.BINARY
+            color_store.import_txt(filename, binary_file)
+            os.remove(filename)
+            filename = binary_file
+        color_store.append(filename, data)
+
+    def print_num_data(self, label, dataset):
+        filename = self._color_label_file(label, dataset)
+        if filename is None:
+            print(Fore.RED + "Error: Cannot count data. Folder and file do not exist. Use new_color_data()." + Style.RESET_ALL)
+            return
+
+        if filename.endswith(color_store.BINARY):
+            return color_store.count(filename)
+        with open(filename) as f:
+            return sum(1 for line in f if line.strip())
+
+    def capture_color_data(self, label, dataset, samples=500, interval=0.005, append=False):
+        """
+        Samples get_color_data() straight into label.bin, so a long calibration never sits in memory.
+
+        :param append: add to the label's existing samples instead of replacing them
+        :return: number of samples written
+        """
+        path = os.path.join(self.parent_dir, dataset)
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+        filename = os.path.join(path, label + color_store.BINARY)
+        text_file = os.path.join(path, label + color_store.TEXT)
+        if append and not os.path.exists(filename) and os.path.exists(text_file):
+            color_store.import_txt(text_file, filename)
+        if os.path.exists(text_file):
+            os.remove(text_file)
+
+        print("0% ", end="")
+        with color_store.ColorWriter(filename, append=append) as writer:
+            for i in range(samples):
+                writer.write(self.get_color_data()[0:9])
+                time.sleep(interval)
+                if i % 10 == 0:
+                    print("-", end="")
+        print(" 100%")
+        return writer.written
+
+    def import_color_data(self, dataset):
+        """Converts every label .txt in a dataset to .bin."""
+        path = os.path.join(self.parent_dir, dataset)
+        for label, filename in color_store.label_files(path).items():
+            if filename.endswith(color_store.TEXT):
+                color_store.import_txt(os.path.join(path, filename), os.path.join(path, label + color_store.BINARY))
+                os.remove(os.path.join(path, filename))
+
+    def export_color_data(self, dataset, folder=None):
+        """Writes every label of a dataset as the .txt files the library's load_color_data reads."""
+        path = os.path.join(self.parent_dir, dataset)
+        folder = path if folder is None else os.path.join(self.parent_dir, folder)
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        for label, filename in color_store.label_files(path).items():
+            if filename.endswith(color_store.BINARY):
+                color_store.export_txt(os.path.join(path, filename), os.path.join(folder, label + color_store.TEXT))
+
+    def _color_label_file(self, label, dataset):
+        path = os.path.join(self.parent_dir, dataset)
+        for extension in (color_store.BINARY, color_store.TEXT):
+            filename = os.path.join(path, label + extension)
+            if os.path.exists(filename):
+                return filename
+        return None
+
+    # --- Display ---
+    @property
+    def display(self):
+        """Shadow framebuffer of the controller screen, created on first use."""
+        if self._display is None:
+            from display import Display
+            self._display = Display(self)
+        return self._display
+
+    def _controller_draw_image_desktop(self, pixel_list):
+        """Draws pixel_list (or a PIL image) with as few display frames as possible, sending only what changed."""
+        if not isinstance(pixel_list, (list, PIL.Image.Image)):
+            print(Fore.RED + "Error: the pixel list passed into controller_draw_image() is not a list." + Style.RESET_ALL)
+            return None
+
+        from display import to_bitmap
+        bitmap = to_bitmap(pixel_list)
+        if bitmap is None:
+            print("Can't find image type. Please use a .jpg or .png file")
+            return None
+        return self.display.draw(bitmap)
+
+    def _controller_draw_canvas_desktop(self, image):
+        return self._controller_draw_image_desktop(image)
+
+    def _controller_clear_screen_desktop(self, pixel=DisplayPixel.White):
+        self.sendDisplayClearAll(pixel)
+        self.display.cleared(pixel)
+
+    # --- Metrics ---
+    def metrics_snapshot(self):
+        """Link counters, rates since the last snapshot, decoder failures, queue depth and latency histograms."""
+        return self.metrics.snapshot() if self.metrics is not None else {}
+
+    def metrics_prometheus(self):
+        return self.metrics.prometheus() if self.metrics is not None else ""
+
+    def start_metrics_log(self, filename, interval=1.0):
+        """Appends a metrics snapshot to filename (NDJSON) every interval seconds until stop_metrics_log."""
+        if self.metrics is None:
+            return None
+        self.stop_metrics_log()
+        self._metrics_log = NdjsonExporter(self.metrics, filename, interval).start()
+        return self._metrics_log
+
+    def stop_metrics_log(self):
+        if self._metrics_log is not None:
+            self._metrics_log.stop()
+            self._metrics_log = None
+
+    # --- Capture ---
+    def start_capture(self, filename, index=True):
+        """
+        Records every chunk read from and frame written to the port, with timestamps, to filename.
+
+        Unlike setShowReceiveData/setShowTransferData this keeps the exact bytes in a compact
+        binary file; read it back with capture.CaptureReader or python capture.py filename.
+        """
+        self.stop_capture()
+        self._capture = CaptureWriter(filename, index)
+        return self._capture
+
+    def stop_capture(self):
+        capture, self._capture = self._capture, None
+        if capture is not None:
+            capture.close()
+
+    # --- Connection ---
+    def _open_desktop(self, portname=None, updater=False):
+        """
+        Connects like the library, without its fixed sleeps.
+
+        State is polled with request_and_wait, so connecting moves on as soon as
+        the drone answers Ready. The identification and first telemetry requests
+        then go out in one burst (CONNECT_REQUESTS). Address and CPU ID are left to
+        their getters. connect_stats records how long each stage took.
+        """
+        if not self.fast_connect:
+            return super()._open_desktop(portname, updater)
+
+        start = time.perf_counter()
+        portname = self._find_port(portname)
+        self._open_port(portname)
+        self._printLog("Connected.({0})".format(portname))
+        opened = time.perf_counter()
+
+        # the library asks 10 times, 100 ms apart; stop at the first Ready reply instead
+        polls = 0
+        while True:
+            polls += 1
+            answered = self.request_and_wait(DataType.State, 0.1)
+            ready = self.state_data[2] is ModeFlight.Ready
+            if ready or time.perf_counter() - opened >= 1.0:
+                break
+            if answered:
+                time.sleep(0.1)
+        ready_at = time.perf_counter()
+
+        if ready:
+            self.request_many(CONNECT_REQUESTS, 0.2)
+            identified = time.perf_counter()
+
+            if self.information_data[1] == ModelNumber.Drone_12_Drone_P1:
+                print(Fore.GREEN + "Connected to CoDrone EDU (JROTC ed.)." + Style.RESET_ALL)
+            else:
+                print(Fore.GREEN + "Connected to CoDrone EDU." + Style.RESET_ALL)
+            print(Fore.GREEN + "Battery = {0}%".format(self.state_data[6]) + Style.RESET_ALL)
+
+            # set the speed to medium level and disable the previous YPRT commands
+            self.speed_change(speed_level=2)
+            self.sendControl(0, 0, 0, 0)
+        else:
+            identified = ready_at
+            print(Fore.RED + "Could not connect to CoDrone EDU. "
+                             "Check that the drone is on and paired to the controller." + Style.RESET_ALL)
+            print(Fore.YELLOW + "How to pair: https://youtu.be/kMJhf5ykLSo " + Style.RESET_ALL)
+
+        finished = time.perf_counter()
+        self.connect_stats = {
+            "ready": ready,
+            "state_polls": polls,
+            "open_ms": round((opened - start) * 1000, 3),
+            "ready_ms": round((ready_at - opened) * 1000, 3),
+            "identify_ms": round((identified - ready_at) * 1000, 3),
+            "total_ms": round((finished - start) * 1000, 3),
+        }
+        return True
+
+    def open_raw(self, portname=None):
+        """Opens the port and starts receiving without the connection handshake, e.g. for a device in its bootloader."""
+        portname = self._find_port(portname)
+        self._open_port(portname)
+        self._printLog("Connected.({0})".format(portname))
+        return True
+
+    def _find_port(self, portname):
+        if portname is None:
+            for item in comports():
+                if item.vid == 1155:
+                    portname = item.device
+                    print(Fore.GREEN + "Detected CoDrone EDU controller at port {0}".format(portname) + Style.RESET_ALL)
+                    break
+        return portname
+
+    def _open_port(self, portname):
+        """Opens the serial port and starts the receive thread; exits like the library when it cannot."""
+        try:
+            # the read timeout lets the receive thread notice a close instead of blocking forever
+            self._serialport = serial.Serial(port=portname, baudrate=57600, timeout=0.1)
+        except (serial.SerialException, ValueError):
+            self._printError("Could not connect to device.")
+            print(Fore.RED + "Could not connect to CoDrone EDU controller." + Style.RESET_ALL)
+            self.disconnect()
+            exit()
+
+        if not self.isOpen():
+            self._printError("Could not connect to device.")
+            print(Fore.RED + "Serial device not available. Check the USB cable or USB port. . " + Style.RESET_ALL)
+            self.disconnect()
+            exit()
+
+        self._flagThreadRun = True
+        self._thread = Thread(target=self._receiving, args=(), daemon=True)
+        self._thread.start()
+
+    def _disconnect_desktop(self):
+        self.stop_telemetry()
+        self.stop_metrics_log()
+        self.stop_capture()
+        return super()._disconnect_desktop()
@@ -0,0 +1,222 @@
+#Python code
+import asyncio
+import importlib.metadata
+import inspect
+import time
+from threading import Thread
+
+from serial.tools import list_ports
+from codrone_edu.drone import *
+from codrone_edu.swarm import Swarm
+
+from fast_drone import FastDrone
+from frame_encoder import FrameEncoder
+from histogram import Histogram
+
+
+class FastSwarm(Swarm):
+    """
+    Swarm that keeps one event loop running for its whole lifetime.
+
+    Commands are submitted to the loop instead of starting a new one with
+    asyncio.run each time. all_drones releases every drone through a barrier so
+    they start together, and broadcast_* writes one encoded frame to every port
+    in a single burst. stats() reports start skew and per-command latency.
+    """
+
+    def __init__(self, enable_color=True, enable_print=True, enable_pause=True):
+        super().__init__(enable_color, enable_print, enable_pause)
+        self._encoder = FrameEncoder()
+        self._latency = {}  # method name -> Histogram of ms per drone call
+        self._skew = Histogram()  # ms between the first and last drone starting a command
+        self._burst = Histogram()  # ms to write one broadcast frame to every port
+        self.last_skew_ms = None
+
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = Thread(target=self._loop.run_forever, daemon=True)
+        self._loop_thread.start()
+
+    def _submit(self, coroutine):
+        """Runs coroutine on the swarm's loop and waits for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    ## Swarm Connect Start ##
+    async def _connect(self, portnames=None):
+        if portnames is not None:
+            self._portnames.extend(portnames)
+        else:
+            for element in list_ports.comports(include_links=True):
+                if element.vid == 1155 or element.vid == 6790:
+                    self._portnames.append(str(element.device))
+
+        self._num_drones = len(self._portnames)
+        self._drone_objects.extend(FastDrone(swarm=True) for _ in range(self._num_drones))
+
+        colorama.init()
+        library_name = "codrone-edu"
+        library = importlib.metadata.distribution(library_name).version
+        print(Fore.GREEN + f"Running {library_name} library version {library}" + Style.RESET_ALL)
+
+        await asyncio.gather(*(self._initialize_drone(i) for i in range(self._num_drones)))
+
+        await asyncio.gather(*(self._connect_drone(i, self._portnames[i]) for i in range(self._num_drones)))
+
+    def connect(self, portnames=None):
+        """Pairs every detected controller, or the ports in portnames (e.g. Simulator paths) when given."""
+        self._submit(self._connect(portnames))
+        if self._enable_print and self._enable_color:
+            print()
+            for i in range(self._num_drones):
+                print(Fore.GREEN + f"Drone {i} at port {self._portnames[i]}: {self._led_colors[i]}" + Style.RESET_ALL)
+        if self._enable_pause:
+            input("Press Enter to start swarm...")
+
+    ## Swarm Connect End ##
+
+    async def _Swarm__call_method(self, index, commands):
+        drone = self._drone_objects[index]
+        method_name = commands[0]
+        args = commands[1]
+        kwargs = commands[2]
+        method = getattr(drone, method_name, None)
+        if not callable(method):
+            async with self._print_lock:
+                print("Method ", method_name, " not found")
+                return
+
+        start = time.perf_counter()
+        # swarm methods return a task or coroutine, a few (like set_yaw) return a plain value
+        result = method(*args, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        self._latency.setdefault(method_name, Histogram()).record((time.perf_counter() - start) * 1000)
+        return result
+
+    ## Basic Swarm Start ##
+    async def _all_drones(self, method_name, *args, **kwargs):
+        commands = [method_name, args, kwargs]
+        release = asyncio.Event()
+        starts = [None] * self._num_drones
+
+        async def start_together(index):
+            await release.wait()
+            starts[index] = time.perf_counter()
+            return await self._Swarm__call_method(index, commands)
+
+        tasks = [asyncio.ensure_future(start_together(i)) for i in range(self._num_drones)]
+        # every drone is parked on the barrier before any of them starts
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+        if len(starts) > 1:
+            self.last_skew_ms = (max(starts) - min(starts)) * 1000
+            self._skew.record(self.last_skew_ms)
+        return results
+
+    def all_drones(self, method_name, *args, **kwargs):
+        return self._submit(self._all_drones(method_name, *args, **kwargs))
+
+    def one_drone(self, index, method_name, *args, **kwargs):
+        return self._submit(self._one_drone(index, method_name, *args, **kwargs))
+
+    ## Basic Swarm End ##
+
+    ## Broadcast Start ##
+    async def _broadcast(self, template, values):
+        # on the loop thread, so no drone task writes in the middle of the burst
+        frame = template.encode(*values)
+        ports = [drone._serialport for drone in self._drone_objects
+                 if drone._serialport is not None and drone._serialport.isOpen()]
+        start = time.perf_counter()
+        for port in ports:
+            port.write(frame)
+        self._burst.record((time.perf_counter() - start) * 1000)
+        return len(ports)
+
+    def broadcast_control(self, roll, pitch, yaw, throttle):
+        """Sends one control frame to every drone; returns how many ports it was written to."""
+        return self._submit(self._broadcast(self._encoder.control, (roll, pitch, yaw, throttle)))
+
+    def broadcast_control_position(self, positionX, positionY, positionZ, velocity, heading, rotationalVelocity):
+        return self._submit(self._broadcast(self._encoder.control_position,
+                                            (positionX, positionY, positionZ, velocity, heading, rotationalVelocity)))
+
+    def broadcast_command(self, commandType, option=0):
+        return self._submit(self._broadcast(self._encoder.command, (commandType.value, option)))
+
+    def broadcast_takeoff(self):
+        return self.broadcast_command(CommandType.FlightEvent, FlightEvent.TakeOff.value)
+
+    def broadcast_land(self):
+        # zero the sticks first, as sendLanding does
+        self.broadcast_control(0, 0, 0, 0)
+        return self.broadcast_command(CommandType.FlightEvent, FlightEvent.Landing.value)
+
+    def broadcast_stop(self):
+        return self.broadcast_command(CommandType.Stop)
+
+    ## Broadcast End ##
+
+    ## Run Sync Start ##
+    async def _run(self, sync_obj, type="parallel", delay=None, order=None):
+        if type != "sequential" or sync_obj.get_size() <= 1:
+            return await super()._run(sync_obj, type, delay, order)
+
+        sync_tasks = sync_obj.get_sync()
+        num_synced = len(sync_tasks)
+        max_steps = sync_obj.get_max_num_steps()
+
+        if num_synced > self._num_drones:
+            await self._all_drones('land')
+            await self._disconnect()
+            raise Exception('Number of drones required for sync is higher than number of drones connected!')
+
+        if order is not None and len(order) > max_steps:
+            await self._all_drones('land')
+            await self._disconnect()
+            raise Exception('len(order) is greater than the max number of tasks in sync')
+
+        if delay is None:
+            delay = 0
+        if order is None:
+            order = [[i for i in range(num_synced)] for _ in range(max_steps)]
+
+        return_values = []
+        for i in range(max_steps):
+            temp_return_values = []
+            for index in order[i]:
+                if i <= len(sync_tasks[index]) - 1:
+                    method_name, args, kwargs = sync_tasks[index][i]
+                else:
+                    # if drone doesn't have any more scheduled tasks, it will just hover
+                    method_name, args, kwargs = 'reset_move_values', [], {}
+
+                temp_return_values.append(await self._one_drone(index, method_name, *args, **kwargs))
+                # yield to the loop instead of blocking it, so other drones' I/O keeps flowing
+                await asyncio.sleep(delay)
+            return_values.append(temp_return_values)
+        return return_values
+
+    def run(self, sync_obj, type="parallel", delay=None, order=None):
+        return self._submit(self._run(sync_obj, type, delay, order))
+
+    ## Run Sync End ##
+
+    def stats(self):
+        """Start skew across drones, broadcast burst time and per-command latency, all in ms."""
+        return {
+            "drones": self._num_drones,
+            "last_skew_ms": round(self.last_skew_ms, 3) if self.last_skew_ms is not None else None,
+            "skew_ms": self._skew.snapshot(),
+            "broadcast_ms": self._burst.snapshot(),
+            "commands": {name: histogram.snapshot() for name, histogram in self._latency.items()},
+        }
+
+    def close(self):
+        self._submit(self._disconnect())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join(timeout=1)
+
+    def disconnect(self):
+        self.close()
@@ -0,0 +1,295 @@
+#Python code
+import argparse
+import sys
+import time
+from threading import Condition
+
+from codrone_edu.drone import *
+from codrone_edu.tools.update import Firmware
+
+from fast_drone import FastDrone
+
+
+BLOCK_SIZE = 16
+
+# block 0 makes the bootloader erase flash, so it gets the library's long timer
+FIRST_BLOCK_TIMEOUT = 2.4
+MIN_TIMEOUT = 0.05
+MAX_TIMEOUT = 2.4
+MAX_RETRIES = 30  # the library gives up after 30 unanswered sends, too
+
+# the same UpdateLocation repeated this often means the block after it was lost
+DUPLICATE_ACKS = 2
+
+
+class WindowedUpdater:
+    """
+    Sends a firmware image with several 16-byte blocks in flight instead of one.
+
+    The bootloader answers every Update frame with UpdateLocation, the index of
+    the next block it wants. Every block below that index is acknowledged, and a
+    repeated index points at the block that went missing. Since the bootloader
+    only takes blocks in order, the window is sent again from that block, either
+    right away (duplicate acknowledgements) or when its timer runs out. The timer
+    follows the measured round trip (srtt + 4 * rttvar, as TCP does) and doubles
+    after each timeout.
+    """
+
+    def __init__(self, drone, firmware, window=8, adaptive=True, timeout=0.1, on_progress=None):
+        """
+        :param drone: FastDrone with its port open
+        :param firmware: codrone_edu.tools.update.Firmware
+        :param window: blocks in flight; 1 is the library's stop-and-wait
+        :param adaptive: False keeps a fixed timeout, like the library
+        :param timeout: starting (or fixed) retransmit timeout in seconds
+        :param on_progress: optional callback(bytes_acknowledged, total_bytes)
+        """
+        self.drone = drone
+        self.firmware = firmware
+        self.window = max(1, window)
+        self.adaptive = adaptive
+        self.on_progress = on_progress
+        self.blocks = firmware.length // BLOCK_SIZE
+
+        self.rto = timeout
+        self.srtt = None
+        self.rttvar = None
+
+        self.base = 0  # first block not acknowledged yet
+        self.next = 0  # next block never sent
+        self.complete = False
+        self.failed = None
+        self.frames = 0
+        self.retransmits = 0
+        self.timeouts = 0
+        self.fast_retransmits = 0
+
+        self._sent_at = {}  # block -> time of its latest send
+        self._retried = set()  # blocks sent more than once give no round trip sample (Karn)
+        self._tries = {}
+        self._duplicates = 0
+        self._recovering = False  # the base block was sent again and its answer is due
+        self._condition = Condition()
+        self._header = None
+
+    # --- Events (receive thread) ---
+    def eventUpdateLocation(self, updateLocation):
+        now = time.perf_counter()
+        acknowledged = updateLocation.indexBlockNext
+        with self._condition:
+            if acknowledged > self.base:
+                last = acknowledged - 1
+                if last in self._sent_at and last not in self._retried:
+                    self._sample(now - self._sent_at[last])
+                for block in range(self.base, acknowledged):
+                    self._sent_at.pop(block, None)
+                    self._tries.pop(block, None)
+                    self._retried.discard(block)
+                self.base = acknowledged
+                if self._recovering:
+                    # the first advance after a resend answers the resend: the bootloader
+                    # has dropped everything sent after the lost block, so go back
+                    self._recovering = False
+                    self.next = acknowledged
+                self.next = max(self.next, acknowledged)
+                self._duplicates = 0
+            elif acknowledged == self.base and self.base < self.next:
+                self._duplicates += 1
+            self._condition.notify()
+
+    def eventInformation(self, information):
+        with self._condition:
+            if information.modeUpdate == ModeUpdate.Complete:
+                self.complete = True
+            elif information.modeUpdate == ModeUpdate.Failed:
+                self.failed = "the bootloader reported a failed update"
+            self._condition.notify()
+
+    def _sample(self, rtt):
+        if not self.adaptive:
+            return
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.rto = min(MAX_TIMEOUT, max(MIN_TIMEOUT, self.srtt + 4 * self.rttvar))
+
+    # --- Sending ---
+    def _send(self, block, now):
+        index = block * BLOCK_SIZE
+        data = bytearray(2)
+        data[0] = block & 0xFF
+        data[1] = (block >> 8) & 0xFF
+        data.extend(self.firmware.resource[index:index + BLOCK_SIZE])
+
+        if block in self._sent_at:
+            self._retried.add(block)
+            self.retransmits += 1
+        tries = self._tries[block] = self._tries.get(block, 0) + 1
+        if tries > MAX_RETRIES:
+            self.failed = "no response for block {0}".format(block)
+        self._sent_at[block] = now
+        self.drone.transfer(self._header, data)
+        self.frames += 1
+
+    def _timeout(self, block):
+        return FIRST_BLOCK_TIMEOUT if block == 0 else self.rto
+
+    def run(self, deviceType, completion_timeout=3.0):
+        """
+        Transfers the whole image to deviceType.
+
+        :return: dict with success, bytes, seconds, bytes_per_second and retransmit counts
+        """
+        header = self._header = Header()
+        header.dataType = DataType.Update
+        header.length = 2 + BLOCK_SIZE
+        header.from_ = DeviceType.Updater
+        header.to_ = deviceType
+
+        self.drone.setEventHandler(DataType.UpdateLocation, self.eventUpdateLocation)
+        self.drone.setEventHandler(DataType.Information, self.eventInformation)
+
+        # a bootloader already in ModeUpdate.Update continues where it stopped
+        self.drone.request_and_wait(DataType.UpdateLocation, 0.2, deviceType)
+        first = self.base
+
+        start = time.perf_counter()
+        finished_at = None
+        last_progress = -1
+        with self._condition:
+            while not self.complete and self.failed is None:
+                now = time.perf_counter()
+
+                if self.base >= self.blocks:
+                    # everything is acknowledged; the bootloader checks the image and reports Complete
+                    if finished_at is None:
+                        finished_at = now
+                    elif now - finished_at > completion_timeout:
+                        self.failed = "no completion report"
+                        break
+                    self.drone.sendRequest(deviceType, DataType.Information)
+                    self._condition.wait(0.1)
+                    continue
+
+                # a repeated UpdateLocation means the base block was lost; send it alone
+                # first, since copies of later blocks may still be on their way
+                if self._duplicates >= DUPLICATE_ACKS and not self._recovering:
+                    self.fast_retransmits += 1
+                    self._recovering = True
+                    self._send(self.base, now)
+                elif self.base < self.next and self._sent_at[self.base] + self._timeout(self.base) <= now:
+                    # recover as after duplicate acks: the base block goes alone, and its answer
+                    # sends the window again from there, since whatever followed a lost block was dropped
+                    self.timeouts += 1
+                    self._recovering = True
+                    self._send(self.base, now)
+                    if self.adaptive and self.base != 0:
+                        self.rto = min(MAX_TIMEOUT, self.rto * 2)
+
+                # block 0 goes alone while the bootloader erases
+                window = 1 if self.base == 0 else self.window
+                while self.next < min(self.base + window, self.blocks):
+                    self._send(self.next, now)
+                    self.next += 1
+
+                if self.on_progress is not None and self.base != last_progress:
+                    last_progress = self.base
+                    self.on_progress(self.base * BLOCK_SIZE, self.blocks * BLOCK_SIZE)
+
+                deadline = self._sent_at[self.base] + self._timeout(self.base)
+                self._condition.wait(max(0.0, deadline - time.perf_counter()))
+
+        seconds = time.perf_counter() - start
+        transferred = (min(self.base, self.blocks) - first) * BLOCK_SIZE
+        return {
+            "success": self.complete,
+            "error": self.failed,
+            "bytes": transferred,
+            "seconds": round(seconds, 3),
+            "bytes_per_second": round(transferred / seconds) if seconds else None,
+            "window": self.window,
+            "frames": self.frames,
+            "retransmits": self.retransmits,
+            "timeouts": self.timeouts,
+            "fast_retransmits": self.fast_retransmits,
+            "srtt_ms": round(self.srtt * 1000, 2) if self.srtt is not None else None,
+            "rto_ms": round(self.rto * 1000, 2),
+        }
+
+
+def detect(drone, timeout=0.2):
+    """(DeviceType, Information) of whichever device answers, the drone first, or (None, None)."""
+    for deviceType in (DeviceType.Drone, DeviceType.Controller):
+        found = {}
+
+        def eventInformation(information):
+            found["information"] = information
+
+        drone.setEventHandler(DataType.Information, eventInformation)
+        drone.request_and_wait(DataType.Information, timeout, deviceType)
+        if "information" in found:
+            information = found["information"]
+            return DeviceType((information.modelNumber.value >> 8) & 0xFF), information
+    return None, None
+
+
+def update(drone, firmware, window=8):
+    """Checks the connected device is in its bootloader and matches the image, then sends it; stats or None."""
+    deviceType, information = detect(drone)
+    if deviceType is None:
+        print(Fore.RED + "* Error : Could not detect device." + Style.RESET_ALL)
+        return None
+
+    print(Fore.YELLOW + "* Connected Device : {0}".format(deviceType) + Style.RESET_ALL)
+    print("  Model Number : {0}".format(information.modelNumber))
+    print("   Mode Update : {0}\n".format(information.modeUpdate))
+
+    if information.modelNumber != firmware.header.modelNumber:
+        print(Fore.RED + "* Error : The firmware is for {0}.".format(firmware.header.modelNumber) + Style.RESET_ALL)
+        return None
+    if information.modeUpdate not in (ModeUpdate.Ready, ModeUpdate.Update):
+        print(Fore.RED + "* Error : Firmware update is not available. "
+                         "Check that your device is in bootloader state." + Style.RESET_ALL)
+        return None
+
+    progress = {"next": 0.0}
+
+    def on_progress(done, total):
+        # one carriage-return line, redrawn at most every 100 ms
+        now = time.perf_counter()
+        if now >= progress["next"] or done == total:
+            progress["next"] = now + 0.1
+            sys.stdout.write("\r" + Fore.YELLOW + "{0:8.1f}%".format(done * 100.0 / total) + Style.RESET_ALL)
+            sys.stdout.flush()
+
+    stats = WindowedUpdater(drone, firmware, window, on_progress=on_progress).run(deviceType)
+    print("")
+    if stats["success"]:
+        print(Fore.GREEN + "  Update Complete. {0} bytes/s".format(stats["bytes_per_second"]) + Style.RESET_ALL)
+    else:
+        print(Fore.RED + "* Error : {0}".format(stats["error"]) + Style.RESET_ALL)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sliding-window firmware updater for a device in its bootloader.")
+    parser.add_argument("firmware", help=".eb firmware image")
+    parser.add_argument("--port", help="serial port, detected when omitted")
+    parser.add_argument("--window", type=int, default=8, help="blocks in flight (1 = stop-and-wait)")
+    args = parser.parse_args()
+
+    firmware = Firmware(args.firmware)
+    drone = FastDrone()
+    drone.open_raw(args.port)
+    try:
+        stats = update(drone, firmware, args.window)
+    finally:
+        drone.close()
+    sys.exit(0 if stats and stats["success"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#Python code
+import time
+from binascii import crc_hqx
+
+from codrone_edu.protocol import Header, DataType, DeviceType
+
+
+# Lookup tables so a header byte is validated with one dict access instead of an Enum() call
+DATA_TYPES = {data_type.value: data_type for data_type in DataType}
+DEVICE_TYPES = {device_type.value: device_type for device_type in DeviceType}
+
+SYNC = b"\x0a\x55"
+HEADER_SIZE = 4
+CRC_SIZE = 2
+MAX_LENGTH = 128
+TIMEOUT = 0.6  # same 600 ms limit the library Receiver uses for a partial frame
+
+
+class FrameDecoder:
+    """Pulls complete frames out of a byte stream in chunks instead of one byte at a time."""
+
+    def __init__(self, codecs=None):
+        """
+        :param codecs: optional DataType -> codec.Codec; frames of those types come out as parsed
+                       messages read straight from the buffer, instead of payload bytes
+        """
+        self.codecs = codecs or {}
+        self._buffer = bytearray()
+        self._pending_since = None
+        self.errors = []  # error messages from the last decode() call
+        self.failures = {"header": 0, "crc": 0, "timeout": 0}  # dropped frames by reason, since creation
+        self.discarded = 0  # bytes skipped while looking for a sync
+        self.consumed = 0  # bytes removed from the front of the buffer, so stream offset = consumed + buffer index
+
+    def feed(self, data):
+        """Adds raw bytes read from the serial port."""
+        self._buffer += data
+
+    def pending(self):
+        """Number of bytes waiting to be decoded."""
+        return len(self._buffer)
+
+    def decode(self, offsets=None):
+        """
+        Returns every complete, CRC-valid frame in the buffer as a list of (Header, payload).
+
+        The payload is a parsed message when the DataType has a codec and the length matches it.
+
+        :param offsets: optional list that gets the stream offset of each returned frame's sync appended
+        """
+        buffer = self._buffer
+        codecs = self.codecs
+        view = memoryview(buffer)
+        size = len(buffer)
+        frames = []
+        errors = self.errors = []
+        pos = 0
+
+        try:
+            while True:
+                start = buffer.find(SYNC, pos)
+                if start < 0:
+                    # keep a trailing 0x0A, it may be the first half of the next sync
+                    end = size - 1 if size and buffer[-1] == 0x0A else size
+                    self.discarded += end - pos
+                    pos = end
+                    break
+                self.discarded += start - pos
+
+                if start + 2 + HEADER_SIZE > size:
+                    pos = start
+                    break
+
+                data_type = DATA_TYPES.get(buffer[start + 2])
+                length = buffer[start + 3]
+                from_ = DEVICE_TYPES.get(buffer[start + 4])
+                to_ = DEVICE_TYPES.get(buffer[start + 5])
+
+                if data_type is None or from_ is None or to_ is None or length > MAX_LENGTH:
+                    errors.append("Error / FrameDecoder / Header / Invalid header. 0x{0:02X} [{1}]".format(buffer[start + 2], length))
+                    self.failures["header"] += 1
+                    pos = start + 1
+                    continue
+
+                end = start + 2 + HEADER_SIZE + length
+                if end + CRC_SIZE > size:
+                    pos = start
+                    break
+
+                crc_received = buffer[end] | (buffer[end + 1] << 8)
+                crc_calculated = crc_hqx(view[start + 2:end], 0)
+                if crc_received != crc_calculated:
+                    errors.append("Error / FrameDecoder / CRC Error / {0} / [receive: 0x{1:04X}, calculate: 0x{2:04X}]".format(data_type, crc_received, crc_calculated))
+                    self.failures["crc"] += 1
+                    pos = start + 1
+                    continue
+
+                header = Header()
+                header.dataType = data_type
+                header.length = length
+                header.from_ = from_
+                header.to_ = to_
+                codec = codecs.get(data_type)
+                if codec is not None and length == codec.size:
+                    # parsed in place, so the payload is never copied out of the buffer
+                    frames.append((header, codec.unpack_from(buffer, start + 2 + HEADER_SIZE)))
+                else:
+                    frames.append((header, bytes(view[start + 2 + HEADER_SIZE:end])))
+                if offsets is not None:
+                    offsets.append(self.consumed + start)
+                pos = end + CRC_SIZE
+        finally:
+            view.release()
+
+        if pos:
+            del buffer[:pos]
+            self.consumed += pos
+
+        # drop a partial frame that never completed, like the Receiver "Time over" case
+        if buffer:
+            now = time.perf_counter()
+            if self._pending_since is None or frames:
+                self._pending_since = now
+            elif now - self._pending_since > TIMEOUT:
+                errors.append("Error / FrameDecoder / Time over.")
+                self.failures["timeout"] += 1
+                del buffer[:1]
+                self.consumed += 1
+                self.discarded += 1
+                self._pending_since = None
+        else:
+            self._pending_since = None
+
+        return frames
+
+    def reset(self):
+        self.consumed += len(self._buffer)
+        self._buffer.clear()
+        self._pending_since = None
+        self.errors = []
@@ -0,0 +1,53 @@
+#Python code
+from binascii import crc_hqx
+from struct import Struct
+
+from codrone_edu.protocol import DataType, DeviceType
+
+
+CRC = Struct("<H")
+
+
+class FrameTemplate:
+    """A preallocated frame for one fixed-size command.
+
+    The sync bytes and header are written once and their CRC is cached, so each
+    send only packs the payload in place and finishes the CRC over the payload.
+    """
+
+    def __init__(self, data_type, payload_format, to_=DeviceType.Drone, from_=DeviceType.Base):
+        self.data_type = data_type
+        self._payload = Struct(payload_format)
+        size = self._payload.size
+        header = bytes((data_type.value, size, from_.value, to_.value))
+
+        self.buffer = bytearray(b"\x0a\x55" + header + bytes(size + CRC.size))
+        self._header_crc = crc_hqx(header, 0)
+        self._payload_view = memoryview(self.buffer)[6:6 + size]
+        self._crc_offset = 6 + size
+
+    def encode(self, *values):
+        """Packs the payload into the shared buffer and returns it (valid until the next encode)."""
+        buffer = self.buffer
+        self._payload.pack_into(buffer, 6, *values)
+        CRC.pack_into(buffer, self._crc_offset, crc_hqx(self._payload_view, self._header_crc))
+        return buffer
+
+
+class FrameEncoder:
+    """Frame templates for the commands sent from control loops."""
+
+    def __init__(self):
+        self.control = FrameTemplate(DataType.Control, "<bbbb")
+        self.control_position = FrameTemplate(DataType.Control, "<ffffhh")
+        self.command = FrameTemplate(DataType.Command, "<BB")
+        self.light_drone = FrameTemplate(DataType.LightDefault, "<BHBBB", to_=DeviceType.Drone)
+        self.light_controller = FrameTemplate(DataType.LightDefault, "<BHBBB", to_=DeviceType.Controller)
+        self.buzzer_drone = FrameTemplate(DataType.Buzzer, "<BHH", to_=DeviceType.Drone, from_=DeviceType.Tester)
+        self._requests = {}
+
+    def request(self, device_type):
+        template = self._requests.get(device_type)
+        if template is None:
+            template = self._requests[device_type] = FrameTemplate(DataType.Request, "<B", to_=device_type)
+        return template
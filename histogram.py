@@ -0,0 +1,54 @@
+#Python code
+from bisect import bisect_left
+
+
+# bucket upper bounds in milliseconds
+BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+
+class Histogram:
+    """Fixed-bucket histogram of millisecond values; recording is O(log buckets) and keeps no samples."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """Estimate of the given percentile, interpolated inside its bucket and kept within min and max."""
+        if self.count == 0:
+            return None
+        rank = self.count * percent / 100.0
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = max(self.buckets[i - 1] if i > 0 else 0.0, self.min)
+                upper = min(self.buckets[i] if i < len(self.buckets) else self.max, self.max)
+                value = lower + (upper - lower) * (rank - seen) / count
+                return round(min(max(value, self.min), self.max), 3)
+            seen += count
+        return round(self.max, 3)
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else None,
+            "min": round(self.min, 3) if self.min is not None else None,
+            "max": round(self.max, 3) if self.max is not None else None,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "buckets": {("le_" + str(bound)): count for bound, count in zip(self.buckets, self.counts)},
+            "overflow": self.counts[-1],
+        }
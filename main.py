@@ -2,6 +2,7 @@
 from codrone_edu.drone import *
 import time
 import asyncio
+from aio_drone import AsyncDrone
 
 def emergency_shutdown():
     drone = Drone()
@@ -14,22 +15,21 @@ async def print_message():
     print("Drone is keeping distance...")
 
 async def maintain_distance(drone):
-    drone.keep_distance(3, 60)  # Maintain 60 cm for 10 seconds
-    await asyncio.sleep(3)  # Wait for the keep_distance to complete
+    await drone.keep_distance(3, 60)  # Maintain 60 cm for 3 seconds without blocking the loop
 
 
 async def main():
   try:
     #connect
-    drone = Drone()
-    drone.pair()
-    # drone.close()
+    drone = AsyncDrone()
+    await drone.pair()
+    # await drone.aclose()
 
-    drone.takeoff()
+    await drone.takeoff()
     # drone.set_pitch(50)
     print('starting')
     # drone.move(3)
-    drone.move_forward(50, 'cm', 2)
+    await drone.move_forward(50, 'cm', 2)
     # print('here')
     # print(drone.get_flow_velocity_x())
     # print(drone.get_pos_x())
@@ -46,13 +46,13 @@ async def main():
 
     #land
     print('Successfully executed flight.')
-    drone.land()
-    drone.close()
+    await drone.land()
+    await drone.aclose()
   except Exception as e:
     print('except triggered')
     print(e)
-    drone.land()
-    drone.close()
+    await drone.land()
+    await drone.aclose()
 
 
 if __name__ == "__main__":
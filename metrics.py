@@ -0,0 +1,217 @@
+#Python code
+import json
+import time
+from collections import deque
+from threading import Thread, Event
+
+from frame_decoder import DATA_TYPES
+from histogram import Histogram
+
+
+# replies older than this are not matched to their request any more
+STALE_REQUEST = 1.0
+
+
+class LinkMetrics:
+    """
+    Counters for one drone's serial link, cheap enough to leave on.
+
+    Every hook is a few list updates indexed by the DataType byte; names, rates
+    and histogram summaries are only worked out when a snapshot is taken.
+    Handler time is sampled, one frame in handler_sample, because timing every
+    frame costs about as much as handling it.
+    """
+
+    def __init__(self, decoder=None):
+        self.decoder = decoder  # FrameDecoder whose failure counters are reported
+        self.started = time.perf_counter()
+
+        self.rx_frames = [0] * 256
+        self.rx_bytes = [0] * 256
+        self.tx_frames = [0] * 256
+        self.tx_bytes = [0] * 256
+        self.rx_raw_bytes = 0  # everything read from the port, including bytes that never made a frame
+
+        self.queue_depth = 0
+        self.queue_high_water = 0
+
+        self._requests = {}  # DataType byte -> send times of requests still waiting for a reply
+        self.latency = {}  # DataType byte -> Histogram of request to reply ms
+        self.handler = {}  # DataType byte -> Histogram of event handler ms, sampled
+        self.handler_sample = 16  # time one handled frame in this many, 1 for every frame
+
+        self._last = {}  # reader -> (time, rx frames, rx bytes, tx frames, tx bytes) at its previous snapshot
+
+    # --- Hooks ---
+    def read(self, size, depth):
+        """A chunk of size bytes was read and queued; depth is the receive queue's size after it."""
+        self.rx_raw_bytes += size
+        self.queue_depth = depth
+        if depth > self.queue_high_water:
+            self.queue_high_water = depth
+
+    def received(self, value, size, handler_ms=None):
+        """A frame of DataType byte value with size payload bytes was handled, in handler_ms if it was timed."""
+        self.rx_frames[value] += 1
+        self.rx_bytes[value] += size + 8  # sync, header and crc
+        if handler_ms is not None:
+            histogram = self.handler.get(value)
+            if histogram is None:
+                histogram = self.handler[value] = Histogram()
+            histogram.record(handler_ms)
+
+        pending = self._requests.get(value)
+        if pending:
+            now = time.perf_counter()
+            sent = pending.popleft()
+            while pending and now - sent > STALE_REQUEST:
+                sent = pending.popleft()
+            if now - sent <= STALE_REQUEST:
+                histogram = self.latency.get(value)
+                if histogram is None:
+                    histogram = self.latency[value] = Histogram()
+                histogram.record((now - sent) * 1000)
+
+    def sent(self, value, size):
+        self.tx_frames[value] += 1
+        self.tx_bytes[value] += size
+
+    def requested(self, value):
+        """A request for DataType byte value went out; its reply's arrival closes the latency sample."""
+        pending = self._requests.get(value)
+        if pending is None:
+            pending = self._requests[value] = deque(maxlen=16)
+        pending.append(time.perf_counter())
+
+    # --- Reading ---
+    def failures(self):
+        if self.decoder is None:
+            return {}
+        return dict(self.decoder.failures)
+
+    def snapshot(self, reader="default"):
+        """
+        Totals, per-second rates, failures, queue depth and histograms.
+
+        :param reader: rates cover the time since this reader's previous snapshot, so an exporter and
+                       interactive calls do not shorten each other's intervals
+        """
+        now = time.perf_counter()
+        totals = (list(self.rx_frames), list(self.rx_bytes), list(self.tx_frames), list(self.tx_bytes))
+        last = self._last.get(reader)
+        if last is None:
+            since, previous = self.started, ([0] * 256,) * 4
+        else:
+            since, previous = last[0], last[1:]
+        self._last[reader] = (now,) + totals
+        elapsed = max(now - since, 1e-9)
+
+        def per_type(current, before):
+            return {
+                DATA_TYPES[value].name: {"total": count, "per_second": round((count - before[value]) / elapsed, 1)}
+                for value, count in enumerate(current) if count and value in DATA_TYPES
+            }
+
+        return {
+            "uptime_s": round(now - self.started, 3),
+            "interval_s": round(elapsed, 3),
+            "rx_frames": per_type(totals[0], previous[0]),
+            "rx_bytes": per_type(totals[1], previous[1]),
+            "tx_frames": per_type(totals[2], previous[2]),
+            "tx_bytes": per_type(totals[3], previous[3]),
+            "rx_raw_bytes": self.rx_raw_bytes,
+            "tx_bytes_per_second": round((sum(totals[3]) - sum(previous[3])) / elapsed, 1),
+            "decode_failures": self.failures(),
+            "discarded_bytes": self.decoder.discarded if self.decoder is not None else 0,
+            "queue_depth": self.queue_depth,
+            "queue_high_water": self.queue_high_water,
+            "latency_ms": {DATA_TYPES[value].name: histogram.snapshot() for value, histogram in list(self.latency.items())},
+            "handler_ms": {DATA_TYPES[value].name: histogram.snapshot() for value, histogram in list(self.handler.items())},
+        }
+
+    def prometheus(self, prefix="codrone"):
+        """Everything as Prometheus text exposition format; rates are left to the scraper."""
+        lines = []
+
+        def metric(name, kind, help, samples):
+            lines.append("# HELP {0}_{1} {2}".format(prefix, name, help))
+            lines.append("# TYPE {0}_{1} {2}".format(prefix, name, kind))
+            for labels, value in samples:
+                lines.append("{0}_{1}{2} {3}".format(prefix, name, _labels(labels), value))
+
+        def per_type(counts):
+            return [({"type": DATA_TYPES[value].name}, count)
+                    for value, count in enumerate(counts) if count and value in DATA_TYPES]
+
+        metric("rx_frames_total", "counter", "Frames received per DataType.", per_type(self.rx_frames))
+        metric("rx_bytes_total", "counter", "Frame bytes received per DataType.", per_type(self.rx_bytes))
+        metric("rx_raw_bytes_total", "counter", "Bytes read from the serial port.", [({}, self.rx_raw_bytes)])
+        metric("tx_frames_total", "counter", "Frames sent per DataType.", per_type(self.tx_frames))
+        metric("tx_bytes_total", "counter", "Bytes sent per DataType.", per_type(self.tx_bytes))
+        metric("decode_failures_total", "counter", "Frames dropped by the decoder, by reason.",
+               [({"reason": reason}, count) for reason, count in self.failures().items()])
+        metric("discarded_bytes_total", "counter", "Bytes skipped while looking for a frame start.",
+               [({}, self.decoder.discarded if self.decoder is not None else 0)])
+        metric("rx_queue_depth", "gauge", "Chunks waiting in the receive queue.", [({}, self.queue_depth)])
+        metric("rx_queue_high_water", "gauge", "Most chunks ever waiting in the receive queue.", [({}, self.queue_high_water)])
+        _histogram_lines(lines, prefix + "_request_latency_ms", "Request to reply time per DataType.", self.latency)
+        _histogram_lines(lines, prefix + "_handler_ms", "Event handler time per DataType, sampled.", self.handler)
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join('{0}="{1}"'.format(key, value) for key, value in labels.items()) + "}"
+
+
+def _histogram_lines(lines, name, help, histograms):
+    lines.append("# HELP {0} {1}".format(name, help))
+    lines.append("# TYPE {0} histogram".format(name))
+    for value, histogram in list(histograms.items()):
+        dataType = DATA_TYPES[value].name
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append('{0}_bucket{{type="{1}",le="{2}"}} {3}'.format(name, dataType, bound, cumulative))
+        lines.append('{0}_bucket{{type="{1}",le="+Inf"}} {2}'.format(name, dataType, histogram.count))
+        lines.append('{0}_sum{{type="{1}"}} {2}'.format(name, dataType, round(histogram.total, 3)))
+        lines.append('{0}_count{{type="{1}"}} {2}'.format(name, dataType, histogram.count))
+
+
+class NdjsonExporter:
+    """Appends one snapshot per interval seconds to a newline-delimited JSON file."""
+
+    def __init__(self, metrics, filename, interval=1.0):
+        self.metrics = metrics
+        self.filename = filename
+        self.interval = interval
+        self.written = 0
+        self._stop = Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _run(self):
+        with open(self.filename, "a") as f:
+            while not self._stop.wait(self.interval):
+                self.write(f)
+            # one last line so the end of the run is never lost
+            self.write(f)
+
+    def write(self, f):
+        line = dict(self.metrics.snapshot(reader=self), time=round(time.time(), 3))
+        f.write(json.dumps(line) + "\n")
+        f.flush()
+        self.written += 1
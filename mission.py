@@ -0,0 +1,256 @@
+#Python code
+import time
+from math import sqrt, cos, sin, radians
+from threading import Thread, Event
+
+from codrone_edu.protocol import DataType
+
+from motion import Completion
+
+
+class Leg:
+    """One precomputed mission leg: where it ends and the ControlPosition fields that get it there."""
+
+    def __init__(self, index, target, start_yaw, yaw, velocity, heading, rotationalVelocity, ceiling):
+        self.index = index
+        self.target = target
+        self.yaw = yaw
+        # the drone reads the move in the frame it has when the leg is sent
+        self.cos_yaw = cos(radians(start_yaw))
+        self.sin_yaw = sin(radians(start_yaw))
+        self.velocity = velocity
+        self.heading = heading
+        self.rotationalVelocity = rotationalVelocity
+        self.ceiling = ceiling
+
+    def payload(self, position):
+        """ControlPosition values from position (position_data frame) to this leg's target."""
+        dx = self.target[0] - position[0]
+        dy = self.target[1] - position[1]
+        dz = self.target[2] - position[2]
+        # world deltas into the drone's frame
+        return (dx * self.cos_yaw + dy * self.sin_yaw,
+                -dx * self.sin_yaw + dy * self.cos_yaw,
+                dz, self.velocity, self.heading, self.rotationalVelocity)
+
+
+class Mission:
+    """
+    Flies a list of waypoints and relative moves back to back on a background thread.
+
+    Every leg is planned from one position reading before the mission starts,
+    and the next leg is sent on the control tick where the current one
+    converges. With blend > 0 a leg counts as done once the drone is within
+    blend meters of its end, so corners are cut into a continuous path.
+    """
+
+    def __init__(self, drone, velocity=0.5, blend=0.0, rotationalVelocity=60, tolerance=0.05, on_progress=None):
+        """
+        :param drone: connected FastDrone
+        :param velocity: leg speed in m/s
+        :param blend: corner radius in meters, 0 to stop at every waypoint
+        :param rotationalVelocity: deg/s used by legs that change heading
+        :param tolerance: meters from a waypoint that count as arrived when not blending
+        :param on_progress: callback(index, total, leg_report) after each leg
+        """
+        self.drone = drone
+        self.velocity = velocity
+        self.blend = blend
+        self.rotationalVelocity = rotationalVelocity
+        self.tolerance = tolerance
+        self.on_progress = on_progress
+
+        self.steps = []
+        self.legs = []
+        self.legs_report = []
+        self.state = "idle"
+        self.total_time = 0.0
+
+        self._thread = None
+        self._abort = Event()
+        self._hold = True  # send the zero move once aborted
+        self._cancelled = False  # aborted by drone.cancel_motion rather than abort()
+        self._resume = Event()
+        self._resume.set()
+
+    # --- Building ---
+    def add_waypoint(self, waypoint, heading=None):
+        """Adds a leg to waypoint [x, y, ...] in the world frame used by set_waypoint / goto_waypoint; height is held."""
+        for value in (waypoint[0], waypoint[1]):
+            if not (isinstance(value, float) or isinstance(value, int)):
+                print("Error: waypoint coordinates must be an int or float.")
+                return
+        self.steps.append(("waypoint", float(waypoint[0]), float(waypoint[1]), 0.0, heading))
+
+    def add_waypoints(self, waypoints):
+        for waypoint in waypoints:
+            self.add_waypoint(waypoint)
+
+    def add_move(self, dx, dy, dz=0.0, heading=None):
+        """Adds a leg of (dx, dy, dz) meters in the drone's frame at the end of the previous leg."""
+        self.steps.append(("move", float(dx), float(dy), float(dz), heading))
+
+    def plan(self):
+        """Precomputes every leg from the drone's current position and heading."""
+        drone = self.drone
+        drone.request_many([DataType.Position, DataType.Motion])
+        x, y, z = drone.position_data[1], drone.position_data[2], drone.position_data[3]
+        yaw = drone.motion_data[9]
+
+        self.legs = []
+        for kind, a, b, c, heading in self.steps:
+            if kind == "waypoint":
+                tx = a - drone.previous_land[0]
+                ty = b - drone.previous_land[1]
+                tz = z
+            else:
+                yaw_rad = radians(yaw)
+                tx = x + a * cos(yaw_rad) - b * sin(yaw_rad)
+                ty = y + a * sin(yaw_rad) + b * cos(yaw_rad)
+                tz = z + c
+
+            start_yaw = yaw
+            heading_delta = 0
+            rotationalVelocity = 0
+            if heading is not None:
+                # shortest turn from the heading held so far
+                heading_delta = int(((heading - yaw + 180) % 360) - 180)
+                rotationalVelocity = self.rotationalVelocity if heading_delta else 0
+                yaw = yaw + heading_delta
+
+            distance = sqrt((tx - x) ** 2 + (ty - y) ** 2 + (tz - z) ** 2)
+            ceiling = distance / self.velocity + 1
+            if rotationalVelocity:
+                ceiling = max(ceiling, abs(heading_delta) / rotationalVelocity + 1)
+
+            self.legs.append(Leg(len(self.legs), (tx, ty, tz), start_yaw, yaw, float(self.velocity),
+                                 heading_delta, rotationalVelocity, ceiling + 1.25))
+            x, y, z = tx, ty, tz
+        return self.legs
+
+    # --- Running ---
+    def start(self):
+        """Plans the mission if needed and starts flying it in the background."""
+        if self._thread is not None:
+            return
+        if not self.legs:
+            self.plan()
+        self._abort.clear()
+        self._hold = True
+        self._cancelled = False
+        self._resume.set()
+        self.state = "running"
+        # drone.cancel_motion aborts the mission between legs too, not only the leg in flight
+        self.drone._mission = self
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def run(self):
+        """Flies the mission and blocks until it has finished."""
+        self.start()
+        self.wait()
+        return self.report()
+
+    def pause(self):
+        """Holds position after the current leg."""
+        self._resume.clear()
+
+    def resume(self):
+        self._resume.set()
+
+    def abort(self, hold=True):
+        """Stops within one control tick; hold sends a zero move so the drone stays where it is."""
+        self._hold = hold
+        self._abort.set()
+        self._resume.set()
+
+    def cancel(self, hold=True):
+        """abort() on behalf of drone.cancel_motion; the mission ends as "cancelled"."""
+        self._cancelled = True
+        self.abort(hold)
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.state
+
+    def _run(self):
+        drone = self.drone
+        telemetry = [DataType.Position, DataType.State]
+        if any(leg.rotationalVelocity for leg in self.legs):
+            telemetry.append(DataType.Motion)
+
+        self.legs_report = []
+        start = time.perf_counter()
+        paused_for = 0.0
+        last_done = None
+
+        for leg in self.legs:
+            if not self._resume.is_set():
+                self.state = "paused"
+                paused = time.perf_counter()
+                self._resume.wait()
+                paused_for += time.perf_counter() - paused
+                if last_done is not None:
+                    last_done += time.perf_counter() - paused
+                self.state = "running"
+            if self._abort.is_set():
+                break
+
+            # the previous leg may have been cut short, so aim from where the drone actually is
+            sent = time.perf_counter()
+            position = (drone.position_data[1], drone.position_data[2], drone.position_data[3])
+            drone.sendControlPosition(*leg.payload(position))
+            gap = (sent - last_done) * 1000 if last_done is not None else 0.0
+
+            last = leg.index == len(self.legs) - 1
+            blending = self.blend > 0 and not last
+            completion = Completion(leg.target,
+                                    heading=leg.yaw if leg.rotationalVelocity else None,
+                                    tolerance=self.blend if blending else self.tolerance,
+                                    settle=0.0 if blending else 0.2,
+                                    still=not blending)
+
+            def controller(drone, elapsed, completion=completion):
+                if self._abort.is_set():
+                    return False
+                return completion(drone, elapsed)
+
+            drone.run_control_loop(controller, leg.ceiling, telemetry=telemetry)
+            last_done = time.perf_counter()
+
+            report = {
+                "leg": leg.index,
+                "completed": completion.completed,
+                "elapsed": round(last_done - sent, 3),
+                "ceiling": round(leg.ceiling, 3),
+                "gap_ms": round(gap, 3),
+            }
+            self.legs_report.append(report)
+            if self.on_progress is not None:
+                self.on_progress(leg.index + 1, len(self.legs), report)
+
+        if self._abort.is_set():
+            if self._hold:
+                # a zero move holds the drone where it is
+                drone.sendControlPosition(0.0, 0.0, 0.0, float(self.velocity), 0, 0)
+            self.state = "cancelled" if self._cancelled else "aborted"
+        else:
+            self.state = "done"
+        self.total_time = time.perf_counter() - start - paused_for
+        if drone._mission is self:
+            drone._mission = None
+        self._thread = None
+
+    def report(self):
+        """Total flying time, idle gaps between legs and the time saved against goto_waypoint-style waits."""
+        gaps = [leg["gap_ms"] for leg in self.legs_report[1:]]
+        return {
+            "state": self.state,
+            "legs": len(self.legs_report),
+            "total_time": round(self.total_time, 3),
+            "idle_gap_ms": round(sum(gaps), 3),
+            "max_gap_ms": max(gaps) if gaps else 0.0,
+            "ceiling_time": round(sum(leg["ceiling"] for leg in self.legs_report), 3),
+            "per_leg": self.legs_report,
+        }
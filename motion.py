@@ -0,0 +1,82 @@
+#Python code
+from math import cos, sin, radians, sqrt
+
+from codrone_edu.system import ModeFlight, ModeMovement
+
+
+def to_meters(distance, units="cm"):
+    """Converts a move_* distance to meters, None for an unknown unit."""
+    if units == "cm":
+        return distance / 100
+    elif units == "ft":
+        return distance / 3.28084
+    elif units == "in":
+        return distance / 39.37
+    elif units == "m":
+        return distance * 1
+    return None
+
+
+def body_to_world(drone, dx, dy, dz):
+    """Target in the position_data frame for a move of (dx, dy, dz) in the drone's own frame."""
+    yaw = radians(drone.motion_data[9])
+    return (drone.position_data[1] + dx * cos(yaw) - dy * sin(yaw),
+            drone.position_data[2] + dx * sin(yaw) + dy * cos(yaw),
+            drone.position_data[3] + dz)
+
+
+class Completion:
+    """
+    ControlLoop controller that stops once a motion command has finished.
+
+    A command is finished when the drone is within tolerance of the target
+    position and heading, is in the expected flight mode, is not moving, and
+    has stayed that way for settle seconds. With still=False the drone may
+    still be moving, which lets a mission blend into the next leg.
+    """
+
+    def __init__(self, target=None, heading=None, flight=None, tolerance=0.05, heading_tolerance=5, settle=0.2,
+                 still=True):
+        self.target = target
+        self.heading = heading
+        self.flight = flight
+        self.tolerance = tolerance
+        self.heading_tolerance = heading_tolerance
+        self.settle = settle
+        self.still = still
+
+        self.completed = False
+        self._held_since = None
+
+    def reached(self, drone):
+        if self.flight is not None and drone.state_data[2] is not self.flight:
+            return False
+        if self.still and self.flight is not ModeFlight.Ready and drone.state_data[7] is ModeMovement.Moving:
+            return False
+
+        if self.target is not None:
+            x, y, z = self.target
+            error = sqrt((drone.position_data[1] - x) ** 2 +
+                         (drone.position_data[2] - y) ** 2 +
+                         (drone.position_data[3] - z) ** 2)
+            if error > self.tolerance:
+                return False
+
+        if self.heading is not None:
+            error = (self.heading - drone.motion_data[9] + 180) % 360 - 180
+            if abs(error) > self.heading_tolerance:
+                return False
+
+        return True
+
+    def __call__(self, drone, elapsed):
+        if not self.reached(drone):
+            self._held_since = None
+            return True
+
+        if self._held_since is None:
+            self._held_since = elapsed
+        if elapsed - self._held_since >= self.settle:
+            self.completed = True
+            return False
+        return True
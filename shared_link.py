@@ -0,0 +1,299 @@
+#Python code
+import multiprocessing
+import time
+from binascii import crc_hqx
+from multiprocessing import shared_memory
+from struct import Struct
+from threading import Thread
+
+import serial
+
+from frame_decoder import FrameDecoder
+
+
+# --- Telemetry block ---
+# uint32 frame count per DataType byte, then one 64-byte slot per published DataType:
+# seqlock sequence, payload length, perf_counter and time.time() at arrival, payload
+COUNTS = Struct("<256I")
+SEQUENCE = Struct("<I")
+SLOT_HEADER = Struct("<IIdd")
+SLOT_FIELDS = Struct("<Idd")  # the slot header after its sequence
+SLOT_SIZE = 64
+MAX_PAYLOAD = SLOT_SIZE - SLOT_HEADER.size
+
+# --- Command ring ---
+# head (bytes ever written) and tail (bytes ever read) on separate cache lines, then the data
+HEAD = Struct("<Q")
+TAIL_OFFSET = 64
+RING_DATA = 128
+RING_SIZE = 1 << 16
+LENGTH = Struct("<H")
+
+
+class TelemetryBlock:
+    """
+    Latest payload of each published DataType in shared memory.
+
+    The decoder process is the only writer. Each slot is a seqlock: the sequence
+    is odd while the slot is being written, so a reader that sees it change or
+    odd simply reads again, and neither side ever waits for the other.
+    """
+
+    def __init__(self, values, name=None):
+        """
+        :param values: DataType bytes that get a slot, in slot order
+        :param name: attach to an existing block instead of creating one
+        """
+        self.values = list(values)
+        self.slots = {value: COUNTS.size + i * SLOT_SIZE for i, value in enumerate(self.values)}
+        size = COUNTS.size + len(self.values) * SLOT_SIZE
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.shm.buf[:size] = bytes(size)
+        else:
+            self.shm = _attach(name)
+        self.name = self.shm.name
+        self._counts = [0] * 256  # writer side copy, so publishing never reads shared memory
+
+    # --- Writer (decoder process) ---
+    def count(self, value):
+        count = self._counts[value] = self._counts[value] + 1
+        SEQUENCE.pack_into(self.shm.buf, value * 4, count)
+
+    def publish(self, value, payload, perf, wall):
+        buf = self.shm.buf
+        offset = self.slots[value]
+        sequence = SEQUENCE.unpack_from(buf, offset)[0]
+        SEQUENCE.pack_into(buf, offset, sequence + 1)
+        length = min(len(payload), MAX_PAYLOAD)
+        SLOT_FIELDS.pack_into(buf, offset + SEQUENCE.size, length, perf, wall)
+        buf[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + length] = payload[:length]
+        SEQUENCE.pack_into(buf, offset, sequence + 2)
+
+    # --- Readers ---
+    def frames(self, value):
+        """Frames of DataType byte value received so far."""
+        return SEQUENCE.unpack_from(self.shm.buf, value * 4)[0]
+
+    def sequence(self, value):
+        """Even number that grows by two with every update of the slot; 0 before the first."""
+        return SEQUENCE.unpack_from(self.shm.buf, self.slots[value])[0]
+
+    def arrival(self, value):
+        """perf_counter of the slot's latest update, 0.0 before the first."""
+        buf = self.shm.buf
+        offset = self.slots[value]
+        while True:
+            sequence, length, perf, wall = SLOT_HEADER.unpack_from(buf, offset)
+            if not sequence & 1 and SEQUENCE.unpack_from(buf, offset)[0] == sequence:
+                return perf
+
+    def read(self, value):
+        """(sequence, perf_counter, time.time(), payload) of the slot's latest update; never blocks."""
+        buf = self.shm.buf
+        offset = self.slots[value]
+        while True:
+            sequence, length, perf, wall = SLOT_HEADER.unpack_from(buf, offset)
+            if sequence & 1:
+                continue
+            payload = bytes(buf[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + length])
+            if SEQUENCE.unpack_from(buf, offset)[0] == sequence:
+                return sequence, perf, wall, payload
+
+    def close(self, unlink=False):
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class CommandRing:
+    """
+    Single-producer, single-consumer byte ring in shared memory for outgoing frames.
+
+    The producer only moves head and the consumer only moves tail, so neither
+    takes a lock; the drone's transfer lock already makes its senders one producer.
+    """
+
+    def __init__(self, name=None, size=RING_SIZE):
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=RING_DATA + size)
+            self.shm.buf[:RING_DATA] = bytes(RING_DATA)
+        else:
+            self.shm = _attach(name)
+        self.name = self.shm.name
+        self.size = size  # not shm.size, which some platforms round up to a page
+        self.dropped = 0
+
+    def push(self, data):
+        """Appends one frame; False when the consumer is too far behind to fit it."""
+        buf = self.shm.buf
+        head = HEAD.unpack_from(buf, 0)[0]
+        tail = HEAD.unpack_from(buf, TAIL_OFFSET)[0]
+        record = LENGTH.pack(len(data)) + bytes(data)
+        if head + len(record) - tail > self.size:
+            self.dropped += 1
+            return False
+        self._copy_in(head, record)
+        # publish only after the bytes are in place
+        HEAD.pack_into(buf, 0, head + len(record))
+        return True
+
+    def pop_all(self):
+        """Every frame written since the last call, oldest first."""
+        buf = self.shm.buf
+        head = HEAD.unpack_from(buf, 0)[0]
+        tail = HEAD.unpack_from(buf, TAIL_OFFSET)[0]
+        frames = []
+        while tail < head:
+            length = LENGTH.unpack(self._copy_out(tail, LENGTH.size))[0]
+            frames.append(self._copy_out(tail + LENGTH.size, length))
+            tail += LENGTH.size + length
+        HEAD.pack_into(buf, TAIL_OFFSET, tail)
+        return frames
+
+    def _copy_in(self, position, data):
+        start = position % self.size
+        first = min(len(data), self.size - start)
+        self.shm.buf[RING_DATA + start:RING_DATA + start + first] = data[:first]
+        if first < len(data):
+            self.shm.buf[RING_DATA:RING_DATA + len(data) - first] = data[first:]
+
+    def _copy_out(self, position, length):
+        start = position % self.size
+        first = min(length, self.size - start)
+        data = bytes(self.shm.buf[RING_DATA + start:RING_DATA + start + first])
+        if first < length:
+            data += bytes(self.shm.buf[RING_DATA:RING_DATA + length - first])
+        return data
+
+    def close(self, unlink=False):
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _attach(name):
+    # a spawned process shares its parent's resource tracker, so attaching registers
+    # nothing new and the parent's unlink stays the only cleanup
+    return shared_memory.SharedMemory(name=name)
+
+
+# --- Decoder process ---
+def _serve(portname, published, block_name, ring_name, ring_size, events, doorbell, stop):
+    """Owns the serial port: decodes replies into the block and writes queued command frames."""
+    try:
+        port = serial.Serial(port=portname, baudrate=57600, timeout=0.1)
+    except (serial.SerialException, ValueError) as e:
+        events.send_bytes(b"E" + str(e).encode())
+        return
+
+    block = TelemetryBlock(published, block_name)
+    ring = CommandRing(ring_name, ring_size)
+    slots = block.slots
+    decoder = FrameDecoder()
+    events.send_bytes(b"R")
+
+    def receive():
+        while not stop.is_set():
+            try:
+                data = port.read(1)
+                if not data:
+                    continue
+                waiting = port.in_waiting
+                if waiting:
+                    data += port.read(waiting)
+            except (serial.SerialException, OSError, TypeError):
+                break
+
+            decoder.feed(data)
+            frames = decoder.decode()
+            if not frames:
+                continue
+            perf = time.perf_counter()
+            wall = time.time()
+            for header, payload in frames:
+                value = header.dataType.value
+                if value in slots:
+                    block.publish(value, payload, perf, wall)
+                    block.count(value)
+                else:
+                    # everything else is rare; the drone process decodes and handles it as usual
+                    block.count(value)
+                    body = bytes((value, header.length, header.from_.value, header.to_.value)) + payload
+                    events.send_bytes(b"\x0a\x55" + body + crc_hqx(body, 0).to_bytes(2, "little"))
+
+    receiver = Thread(target=receive, daemon=True)
+    receiver.start()
+    try:
+        while not stop.is_set():
+            doorbell.acquire(timeout=0.1)
+            for frame in ring.pop_all():
+                port.write(frame)
+    finally:
+        stop.set()
+        receiver.join(timeout=1)
+        port.close()
+        block.close()
+        ring.close()
+
+
+class SharedLink:
+    """
+    Port stand-in for a drone whose serial port is owned by a decoder process.
+
+    write() pushes a frame onto the command ring and rings a semaphore so the
+    process wakes at once; telemetry comes back through block, other frames
+    through the events pipe.
+    """
+
+    def __init__(self, portname, published):
+        context = multiprocessing.get_context("spawn")
+        self.block = TelemetryBlock(published)
+        self.ring = CommandRing()
+        self.events, child_events = context.Pipe(duplex=False)
+        self._doorbell = context.Semaphore(0)
+        self._stop = context.Event()
+        self.process = context.Process(target=_serve, daemon=True,
+                                       args=(portname, self.block.values, self.block.name, self.ring.name,
+                                             self.ring.size, child_events, self._doorbell, self._stop))
+        self.process.start()
+        child_events.close()
+        self._open = False
+        self.error = None
+
+    def wait_ready(self, timeout=10.0):
+        """True once the decoder process has opened the port; error holds its message otherwise."""
+        if not self.events.poll(timeout):
+            self.error = "decoder process did not start"
+            return False
+        reply = self.events.recv_bytes()
+        if reply[:1] != b"R":
+            self.error = reply[1:].decode(errors="replace")
+            return False
+        self._open = True
+        return True
+
+    # --- Port interface used by the drone ---
+    def isOpen(self):
+        return self._open
+
+    @property
+    def in_waiting(self):
+        return 0
+
+    def write(self, data):
+        if not self._open or not self.ring.push(data):
+            return 0
+        self._doorbell.release()
+        return len(data)
+
+    def close(self):
+        self._open = False
+        self._stop.set()
+        self._doorbell.release()
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.events.close()
+        self.block.close(unlink=True)
+        self.ring.close(unlink=True)
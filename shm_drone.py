@@ -0,0 +1,139 @@
+#Python code
+import time
+from threading import Thread
+
+from codrone_edu.drone import *
+
+from fast_drone import FastDrone
+from shared_link import SharedLink
+from telemetry import TELEMETRY
+
+
+# how often a getter waiting for a reply looks at the block
+POLL = 0.0002
+
+
+class SharedDrone(FastDrone):
+    """
+    FastDrone whose serial port, frame decoding and telemetry parsing run in a separate process.
+
+    The decoder process publishes the latest payload of every telemetry type
+    (TELEMETRY) into a shared-memory block, and command frames reach it through
+    a lock-free ring. Serial reads and decoding therefore never compete with the
+    program's threads for the GIL. Getters copy the latest value into the
+    usual lists when they are called. A getter whose data is fresh enough, for
+    example with start_telemetry, only reads the block and never waits. Event
+    handlers for telemetry types run at that point, once per new value. Other
+    frames (Information, Error, Count, ...) are sent over a pipe and handled as
+    usual.
+
+        drone = SharedDrone()
+        drone.pair()
+        drone.start_telemetry({DataType.Range: 20})
+        drone.get_range_data()  # reads the block, no request
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._link = None
+        self._seen = {}  # DataType -> block sequence last copied into its list
+        super().__init__(*args, **kwargs)
+
+    # --- Connection ---
+    def _open_port(self, portname):
+        link = SharedLink(portname, [dataType.value for dataType in TELEMETRY])
+        if not link.wait_ready():
+            self._printError("Could not connect to device.")
+            print(Fore.RED + "Could not connect to CoDrone EDU controller. {0}".format(link.error) + Style.RESET_ALL)
+            link.close()
+            self.disconnect()
+            exit()
+
+        self._link = link
+        self._serialport = link
+        self._flagThreadRun = True
+        self._thread = Thread(target=self._receiving, args=(), daemon=True)
+        self._thread.start()
+
+    def _receiving(self):
+        # only the frames that are not telemetry come this way, already checked by the decoder process
+        events = self._link.events
+        while self._flagThreadRun:
+            try:
+                if not events.poll(0.1):
+                    continue
+                data = events.recv_bytes()
+            except (EOFError, OSError):
+                break
+            self._bufferQueue.put(data)
+            self._chunk_read(data)
+
+            if self._flagCheckBackground:
+                self.check()
+
+    def _disconnect_desktop(self):
+        result = super()._disconnect_desktop()
+        self._link = None
+        return result
+
+    # --- Telemetry ---
+    def _published(self, dataType):
+        return self._link is not None and dataType in TELEMETRY
+
+    def getCount(self, dataType):
+        if self._published(dataType):
+            return self._link.block.frames(dataType.value)
+        return super().getCount(dataType)
+
+    def data_age_ms(self, dataType):
+        if self._published(dataType):
+            arrival = self._link.block.arrival(dataType.value)
+            return (time.perf_counter() - arrival) * 1000 if arrival else float("inf")
+        return super().data_age_ms(dataType)
+
+    def _refresh(self, dataType):
+        """Copies the block's latest dataType into its list, if it changed since the last copy."""
+        block = self._link.block
+        value = dataType.value
+        if block.sequence(value) == self._seen.get(dataType, 0):
+            return
+
+        sequence, perf, wall, payload = block.read(value)
+        message = self._parser.d[dataType](payload)
+        if message is None:
+            return
+        self._seen[dataType] = sequence
+        self._storage.d[dataType] = message
+        self._received_at[dataType] = perf
+        self._runEventHandler(dataType)
+        # the handler stamps the copy time; keep the arrival time instead
+        getattr(self, TELEMETRY[dataType])[0] = wall - self.timeStartProgram
+
+    def latest_data(self, dataType):
+        """The list for dataType with the newest published value in it; never sends or waits."""
+        if self._published(dataType):
+            self._refresh(dataType)
+        return getattr(self, TELEMETRY[dataType])
+
+    def _wait_for(self, expected, timeout):
+        if self._link is None:
+            return super()._wait_for(expected, timeout)
+
+        deadline = time.perf_counter() + (self.request_timeout if timeout is None else timeout)
+        with self._arrival:
+            while any(self.getCount(dataType) < count for dataType, count in expected.items()):
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                # telemetry arrives in the block without a notify, so poll it
+                self._arrival.wait(min(remaining, POLL))
+
+        for dataType in expected:
+            if self._published(dataType):
+                self._refresh(dataType)
+        return {dataType: self.getCount(dataType) >= count for dataType, count in expected.items()}
+
+    def _get_telemetry(self, dataType, delay, max_age_ms):
+        data = super()._get_telemetry(dataType, delay, max_age_ms)
+        if self._published(dataType):
+            self._refresh(dataType)
+        return data
@@ -0,0 +1,378 @@
+#Python code
+import math
+import os
+import random
+import threading
+import time
+from binascii import crc_hqx
+from collections import deque
+from struct import pack, unpack_from
+
+import numpy as np
+from codrone_edu.protocol import *
+from codrone_edu.tools.update import Firmware, FirmwareHeader
+
+from codec import CODECS, Count
+from firmware_update import BLOCK_SIZE
+
+
+def make_frame(data_type, payload, from_=DeviceType.Drone, to_=DeviceType.Base):
+    """Builds one wire frame (sync, header, payload, crc) the same way Drone.makeTransferDataArray does."""
+    header = bytes((data_type.value, len(payload), from_.value, to_.value))
+    return b"\x0a\x55" + header + payload + pack("<H", crc_hqx(header + payload, 0))
+
+
+# replies that do not depend on the simulated flight
+REPLIES = {
+    DataType.State: pack("<BBBBBBBB", 0x12, ModeFlight.Ready.value, 0x10, 0x01, 0x02, 2, 0x01, 87),
+    DataType.Altitude: pack("<ffff", 24.5, 101325.0, 12.0, 0.31),
+    DataType.Range: pack("<hhhhhh", 0, 420, 0, 0, 0, 310),
+    DataType.Position: pack("<fff", 0.25, -0.5, 0.8),
+    DataType.RawFlow: pack("<ff", 0.0, 0.0),
+    DataType.Motion: pack("<hhhhhhhhh", 10, -20, 980, 1, 2, 3, 4, 5, 90),
+    DataType.Trim: pack("<hhhh", 0, 0, 0, 0),
+    DataType.CardColor: pack("<hhhhhhhhBBB", 180, 65, 100, 67, 180, 58, 100, 70, 5, 5, 0),
+    DataType.Count: CODECS[DataType.Count].pack(Count(timeSystem=5400, timeFlight=960, countTakeOff=42,
+                                                      countLanding=41, countAccident=1)),
+}
+
+MODELS = {DeviceType.Drone: ModelNumber.Drone_12_Drone_P1, DeviceType.Controller: ModelNumber.Drone_12_Controller_P1}
+
+# --- Flight model ---
+TAKEOFF_HEIGHT = 0.8  # m
+CLIMB_SPEED = 0.5  # m/s during takeoff and landing
+MAX_SPEED = 1.0  # m/s at full roll or pitch
+MAX_CLIMB = 0.8  # m/s at full throttle
+MAX_YAW_RATE = 120.0  # deg/s at full yaw
+MAX_TILT = 30.0  # deg at full roll or pitch
+BATTERY_DRAIN = 0.2  # percent per second of flight
+
+
+class PtyDevice:
+    """
+    A device on a pseudo terminal: reads the frames written to its path and sends replies back.
+
+    The path opens with serial.Serial like a real port, so pair() and open_raw()
+    run unchanged, in this process or another one. Replies go out in order after
+    latency seconds. loss drops incoming frames before they are handled and
+    corrupt flips a bit in outgoing ones, so their CRC check fails. With a
+    baudrate, incoming bytes are consumed at the serial rate instead of at once.
+    POSIX only.
+    """
+
+    def __init__(self, latency=0.01, loss=0.0, corrupt=0.0, baudrate=None, seed=0):
+        import pty
+        import tty
+        self.latency = latency
+        self.loss = loss
+        self.corrupt = corrupt
+        self.byte_time = 10.0 / baudrate if baudrate else 0.0  # start, 8 data and stop bits
+        self.received = 0
+        self.lost = 0
+        self.corrupted = 0
+        self.replies = 0
+        self._random = random.Random(seed)
+        self._queue = deque()
+        self._ready = threading.Condition()
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._slave)
+        self.path = os.ttyname(self._slave)
+        threading.Thread(target=self._serve, daemon=True).start()
+        threading.Thread(target=self._send_replies, daemon=True).start()
+
+    def chance(self, probability):
+        """True with the given probability, from the device's seeded generator."""
+        return probability > 0 and self._random.random() < probability
+
+    def _serve(self):
+        buffer = bytearray()
+        wire_free = 0.0
+        while True:
+            try:
+                buffer += os.read(self._master, 4096)
+            except OSError:
+                return
+            arrival = time.perf_counter()
+            while len(buffer) >= 8:
+                if buffer[0] != 0x0A or buffer[1] != 0x55:
+                    del buffer[0]
+                    continue
+                size = 8 + buffer[3]
+                if len(buffer) < size:
+                    break
+                frame = bytes(buffer[:size])
+                del buffer[:size]
+
+                if self.byte_time:
+                    # the pty delivers at once; hold every frame until the serial line would have
+                    wire_free = max(time.perf_counter(), wire_free) + size * self.byte_time
+                    delay = wire_free - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    arrival = time.perf_counter()
+                if self.chance(self.loss):
+                    self.lost += 1
+                    continue
+                self.received += 1
+                self.handle(frame, arrival)
+
+    def handle(self, frame, arrival):
+        """Called on the reader thread for each frame that was not lost; arrival is its perf_counter."""
+
+    def reply(self, dataType, payload, device=DeviceType.Drone):
+        frame = make_frame(dataType, payload, from_=device)
+        if self.chance(self.corrupt):
+            self.corrupted += 1
+            frame = bytearray(frame)
+            frame[self._random.randrange(6, len(frame))] ^= 1 << self._random.randrange(8)
+            frame = bytes(frame)
+        with self._ready:
+            self._queue.append((time.perf_counter() + self.latency, frame))
+            self._ready.notify()
+
+    def _send_replies(self):
+        # one sender keeps the replies in order, as they are on the radio link
+        while True:
+            with self._ready:
+                while not self._queue:
+                    self._ready.wait()
+                due, frame = self._queue.popleft()
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                os.write(self._master, frame)
+            except OSError:
+                return
+            self.replies += 1
+
+    def close(self):
+        os.close(self._master)
+        os.close(self._slave)
+
+
+class Simulator(PtyDevice):
+    """
+    A controller and drone on a pseudo terminal, for running the library without hardware.
+
+    Requests are answered with CRC-valid frames built from a simple flight
+    model: takeoff and landing events climb and descend, Control sticks set
+    body velocities and yaw rate, and ControlPosition flies a relative move at
+    the requested speed. Position is in metres from the takeoff point with x
+    forward, y left and z up; yaw is in degrees, counterclockwise.
+
+        simulator = Simulator(latency=0.01, loss=0.02)
+        drone = Drone()
+        drone.pair(simulator.path)
+        drone.takeoff()
+    """
+
+    def __init__(self, latency=0.01, loss=0.0, corrupt=0.0, baudrate=None, seed=0):
+        self.x = self.y = self.z = 0.0
+        self.yaw = 0.0
+        self.flight = ModeFlight.Ready
+        self.battery = 100.0
+        self.sticks = (0, 0, 0, 0)  # roll, pitch, yaw, throttle
+        self.target = None  # (x, y, z, yaw, velocity, rotationalVelocity) of a ControlPosition move
+        self.requests = 0
+        self.arrivals = {}  # DataType -> perf_counter of the latest frame of that type
+        self.trace = None  # set to a list to record (perf_counter, DataType byte) of every frame
+        self._clock = time.perf_counter()
+        super().__init__(latency, loss, corrupt, baudrate, seed)
+
+    # --- Flight model ---
+    def step(self, now):
+        """Advances the flight model to perf_counter time now."""
+        dt = now - self._clock
+        self._clock = now
+        if dt <= 0:
+            return
+
+        if self.flight is ModeFlight.TakeOff:
+            self.z = min(TAKEOFF_HEIGHT, self.z + CLIMB_SPEED * dt)
+            if self.z >= TAKEOFF_HEIGHT:
+                self.flight = ModeFlight.Flight
+        elif self.flight is ModeFlight.Landing:
+            self.z = max(0.0, self.z - CLIMB_SPEED * dt)
+            if self.z <= 0.0:
+                self._stop()
+        elif self.flight is ModeFlight.Flight:
+            if self.target is not None:
+                self._fly_to(dt)
+            else:
+                roll, pitch, yaw, throttle = self.sticks
+                self._move(pitch / 100.0 * MAX_SPEED * dt, -roll / 100.0 * MAX_SPEED * dt)
+                self.z = max(0.0, self.z + throttle / 100.0 * MAX_CLIMB * dt)
+                self.yaw -= yaw / 100.0 * MAX_YAW_RATE * dt
+
+        if self.flight is not ModeFlight.Ready:
+            self.battery = max(0.0, self.battery - BATTERY_DRAIN * dt)
+
+    def _move(self, forward, left):
+        heading = math.radians(self.yaw)
+        self.x += forward * math.cos(heading) - left * math.sin(heading)
+        self.y += forward * math.sin(heading) + left * math.cos(heading)
+
+    def _fly_to(self, dt):
+        x, y, z, yaw, velocity, rotation = self.target
+        dx, dy, dz = x - self.x, y - self.y, z - self.z
+        distance = math.sqrt(dx * dx + dy * dy + dz * dz)
+        travel = velocity * dt
+        if distance <= travel:
+            self.x, self.y, self.z = x, y, z
+        else:
+            self.x += dx / distance * travel
+            self.y += dy / distance * travel
+            self.z += dz / distance * travel
+
+        turn = yaw - self.yaw
+        if abs(turn) <= rotation * dt:
+            self.yaw = yaw
+        else:
+            self.yaw += math.copysign(rotation * dt, turn)
+
+        if (self.x, self.y, self.z, self.yaw) == (x, y, z, yaw):
+            self.target = None
+
+    def _stop(self):
+        self.flight = ModeFlight.Ready
+        self.z = 0.0
+        self.sticks = (0, 0, 0, 0)
+        self.target = None
+
+    # --- Frames ---
+    def handle(self, frame, arrival):
+        dataType, device = frame[2], DeviceType(frame[5])
+        self.step(arrival)
+        if self.trace is not None:
+            self.trace.append((arrival, dataType))
+        try:
+            self.arrivals[DataType(dataType)] = arrival
+        except ValueError:
+            pass
+
+        if dataType == DataType.Request.value:
+            self.requests += 1
+            try:
+                requested = DataType(frame[6])
+            except ValueError:
+                return
+            payload = self.telemetry(requested, device)
+            if payload is not None:
+                self.reply(requested, payload, device)
+        elif dataType == DataType.Control.value:
+            if frame[3] == 4:
+                self.sticks = unpack_from("<bbbb", frame, 6)
+                self.target = None
+            elif frame[3] == 20 and self.flight is ModeFlight.Flight:
+                self._position_move(*unpack_from("<ffffhh", frame, 6))
+        elif dataType == DataType.Command.value:
+            self._command(frame[6], frame[7])
+
+    def _position_move(self, forward, left, up, velocity, heading, rotationalVelocity):
+        start = (self.x, self.y, self.z)
+        self._move(forward, left)
+        self.target = (self.x, self.y, start[2] + up, self.yaw + heading,
+                       max(velocity, 0.1), max(abs(rotationalVelocity), 1))
+        self.x, self.y = start[0], start[1]
+
+    def _command(self, commandType, option):
+        if commandType == CommandType.Stop.value:
+            self._stop()
+        elif commandType == CommandType.FlightEvent.value:
+            if option == FlightEvent.TakeOff.value and self.flight is ModeFlight.Ready:
+                self.flight = ModeFlight.TakeOff
+            elif option == FlightEvent.Landing.value and self.flight in (ModeFlight.TakeOff, ModeFlight.Flight):
+                self.flight = ModeFlight.Landing
+                self.target = None
+            elif option == FlightEvent.Stop.value:
+                self._stop()
+
+    def telemetry(self, dataType, device=DeviceType.Drone):
+        """Payload answering a request for dataType from the current flight state, None if there is none."""
+        roll, pitch, yaw_stick, throttle = self.sticks
+        tilt_roll = int(roll / 100.0 * MAX_TILT) if self.target is None else 0
+        tilt_pitch = int(pitch / 100.0 * MAX_TILT) if self.target is None else 0
+        yaw = int((self.yaw + 180.0) % 360.0 - 180.0)
+
+        if dataType is DataType.Information:
+            model = MODELS.get(device, MODELS[DeviceType.Drone])
+            return pack("<BI", ModeUpdate.RunApplication.value, model.value) + pack("<HBB", 1, 2, 3) + pack("<HBB", 2024, 1, 1)
+        if dataType is DataType.State:
+            return pack("<BBBBBBBB", 0x12, self.flight.value, 0x10, 0x01, 0x02, 2, 0x01, int(self.battery))
+        if dataType is DataType.Position:
+            return pack("<fff", self.x, self.y, self.z)
+        if dataType is DataType.Altitude:
+            return pack("<ffff", 24.5, 101325.0 - self.z * 12.0, self.z, self.z)
+        if dataType is DataType.Range:
+            return pack("<hhhhhh", 0, 1000, 0, 0, 0, int(self.z * 1000))
+        if dataType is DataType.Attitude:
+            return pack("<hhh", tilt_roll, tilt_pitch, yaw)
+        if dataType is DataType.Motion:
+            rate = int(-yaw_stick / 100.0 * MAX_YAW_RATE) if self.target is None else 0
+            return pack("<hhhhhhhhh", 0, 0, 1000, 0, 0, rate, tilt_roll, tilt_pitch, yaw)
+        return REPLIES.get(dataType)
+
+
+class FakeBootloader(PtyDevice):
+    """
+    A device in its bootloader on a pseudo terminal, for firmware update tests and benchmarks.
+
+    It takes Update blocks strictly in order and answers each one with
+    UpdateLocation, like the real bootloader. Incoming bytes are consumed at the
+    serial rate, a lost Update frame is simply never seen, and block 0 waits
+    for the flash erase. Once the last block is in, it checks the image and
+    reports ModeUpdate.Complete.
+    """
+
+    def __init__(self, image, model, latency=0.005, loss=0.0, erase=0.05, baudrate=57600, seed=0):
+        self.image = image
+        self.model = model
+        self.update_loss = loss  # only Update frames, so detecting the device never fails
+        self.erase = erase
+        self.blocks = bytearray()
+        self.next = 0
+        self.mode = ModeUpdate.Ready
+        super().__init__(latency, baudrate=baudrate, seed=seed)
+
+    @property
+    def verified(self):
+        return self.mode == ModeUpdate.Complete
+
+    def handle(self, frame, arrival):
+        dataType, device = frame[2], DeviceType(frame[5])
+        if dataType == DataType.Request.value:
+            if frame[6] == DataType.Information.value:
+                self.reply(DataType.Information, self._information(), device)
+            elif frame[6] == DataType.UpdateLocation.value:
+                self.reply(DataType.UpdateLocation, pack("<H", self.next), device)
+        elif dataType == DataType.Update.value:
+            if self.chance(self.update_loss):
+                self.lost += 1
+                return
+            block = frame[6] | (frame[7] << 8)
+            if block == self.next and self.mode != ModeUpdate.Complete:
+                if block == 0:
+                    time.sleep(self.erase)
+                    self.mode = ModeUpdate.Update
+                self.blocks += frame[8:8 + BLOCK_SIZE]
+                self.next += 1
+            self.reply(DataType.UpdateLocation, pack("<H", self.next), device)
+            if self.mode == ModeUpdate.Update and len(self.blocks) >= len(self.image):
+                self.mode = ModeUpdate.Complete if bytes(self.blocks) == self.image else ModeUpdate.Failed
+                self.reply(DataType.Information, self._information(), device)
+
+    def _information(self):
+        return pack("<BI", self.mode.value, self.model.value) + pack("<HBB", 1, 0, 0) + pack("<HBB", 2024, 1, 1)
+
+
+def synthetic_firmware(size, model=ModelNumber.Drone_8_Drone_P1):
+    """A Firmware with a valid header and a random body, without a file (Firmware() prints when it opens one)."""
+    body = np.random.default_rng(0).integers(0, 256, size - FirmwareHeader.getSize(), dtype=np.uint8).tobytes()
+    header = pack("<IIIHBB", model.value, (1 << 24) | 1, len(body), 2024, 1, 1)
+    firmware = Firmware()
+    firmware.resource = header + body
+    firmware.length = len(firmware.resource)
+    firmware.rawHeader = header
+    firmware.header = FirmwareHeader.parse(header)
+    return firmware
@@ -0,0 +1,156 @@
+#Python code
+import asyncio
+import time
+from threading import Thread, Event, Lock
+
+from codrone_edu.protocol import DataType, DeviceType
+
+
+# DataType -> the Drone list its library event handler fills in
+TELEMETRY = {
+    DataType.Altitude: "altitude_data",
+    DataType.Range: "range_data",
+    DataType.Position: "position_data",
+    DataType.RawFlow: "flow_data",
+    DataType.State: "state_data",
+    DataType.Motion: "motion_data",
+    DataType.RawMotion: "raw_motion_data",
+    DataType.CardColor: "color_data",
+    DataType.Joystick: "joystick_data",
+    DataType.Trim: "trim_data",
+}
+
+# 57600 baud moves ~5.7 kB/s, so keep requests at least this far apart
+MIN_GAP = 0.003
+
+
+class TelemetryScheduler:
+    """Interleaves telemetry requests for several DataTypes on one background thread."""
+
+    def __init__(self, drone, gap=MIN_GAP):
+        self._drone = drone
+        self._gap = gap
+        self._periods = {}
+        self._due = {}
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread = None
+        self._task = None
+
+        self._requested = {}
+        self._window_start = time.perf_counter()
+        self._window_requested = {}
+        self._window_received = {}
+        self._achieved = {}
+
+    def register(self, dataType, rate):
+        """Requests dataType about rate times per second; a rate of 0 stops requesting it."""
+        if rate == 0:
+            self.unregister(dataType)
+            return
+        if rate < 0:
+            raise ValueError("telemetry rate for {0} must be positive, got {1}".format(dataType, rate))
+        with self._lock:
+            self._periods[dataType] = 1.0 / rate
+            self._due[dataType] = time.perf_counter()
+            self._requested.setdefault(dataType, 0)
+            self._window_requested[dataType] = self._requested[dataType]
+            self._window_received[dataType] = self._drone.getCount(dataType)
+
+    def unregister(self, dataType):
+        with self._lock:
+            self._periods.pop(dataType, None)
+            self._due.pop(dataType, None)
+
+    def period(self, dataType):
+        return self._periods.get(dataType)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def rates(self):
+        """Target, requested and received rates (Hz) per DataType over the last second."""
+        return {
+            dataType.name: {
+                "target": round(1.0 / period, 1),
+                "requested": self._achieved.get(dataType, (0.0, 0.0))[0],
+                "received": self._achieved.get(dataType, (0.0, 0.0))[1],
+            }
+            for dataType, period in list(self._periods.items())
+        }
+
+    def _run(self):
+        last_send = 0.0
+        while not self._stop.is_set():
+            wait, last_send = self._step(last_send)
+            if wait > 0:
+                self._stop.wait(wait)
+
+    async def run_async(self):
+        """The scheduler loop as a coroutine, for drones that live on an event loop instead of threads."""
+        last_send = 0.0
+        while not self._stop.is_set():
+            wait, last_send = self._step(last_send)
+            await asyncio.sleep(max(0.0, wait))
+
+    def start_async(self):
+        if self._task is not None:
+            return
+        self._stop.clear()
+        self._task = asyncio.ensure_future(self.run_async())
+
+    def _step(self, last_send):
+        """Sends the most overdue request if its time has come; returns (seconds to wait, last send time)."""
+        with self._lock:
+            if self._due:
+                dataType, due = min(self._due.items(), key=lambda item: item[1])
+            else:
+                dataType, due = None, None
+
+        if dataType is None:
+            return 0.05, last_send
+
+        now = time.perf_counter()
+        wait = max(due, last_send + self._gap) - now
+        if wait > 0:
+            return wait, last_send
+
+        self._drone.sendRequest(DeviceType.Drone, dataType)
+
+        with self._lock:
+            self._requested[dataType] += 1
+            # don't burst to catch up if the link fell behind
+            if dataType in self._due:
+                self._due[dataType] = max(due + self._periods[dataType], now)
+
+        if now - self._window_start >= 1.0:
+            self._update_rates(now)
+        return 0.0, now
+
+    def _update_rates(self, now):
+        elapsed = now - self._window_start
+        with self._lock:
+            dataTypes = list(self._periods)
+        for dataType in dataTypes:
+            requested = self._requested.get(dataType, 0)
+            received = self._drone.getCount(dataType)
+            self._achieved[dataType] = (
+                round((requested - self._window_requested.get(dataType, requested)) / elapsed, 1),
+                round((received - self._window_received.get(dataType, received)) / elapsed, 1),
+            )
+            self._window_requested[dataType] = requested
+            self._window_received[dataType] = received
+        self._window_start = now
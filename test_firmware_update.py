@@ -0,0 +1,73 @@
+#Python code
+import pytest
+
+pytest.importorskip("pty")  # the fake bootloader sits on a pseudo terminal
+
+from codrone_edu.protocol import DataType, DeviceType
+
+from fast_drone import FastDrone
+from firmware_update import WindowedUpdater, BLOCK_SIZE
+from simulator import FakeBootloader, synthetic_firmware
+
+SIZE = 2048
+
+
+class DropOnce(FakeBootloader):
+    """Loses the first copy of one block."""
+
+    def __init__(self, image, model, block):
+        super().__init__(image, model)
+        self.drop = block
+
+    def handle(self, frame, arrival):
+        if frame[2] == DataType.Update.value and (frame[6] | (frame[7] << 8)) == self.drop:
+            self.drop = None
+            self.lost += 1
+            return
+        super().handle(frame, arrival)
+
+
+def update(loss=0.0, window=8, drop=None):
+    firmware = synthetic_firmware(SIZE)
+    if drop is None:
+        bootloader = FakeBootloader(firmware.resource, firmware.header.modelNumber, loss=loss, seed=1)
+    else:
+        bootloader = DropOnce(firmware.resource, firmware.header.modelNumber, drop)
+    drone = FastDrone()
+    drone.open_raw(bootloader.path)
+    try:
+        stats = WindowedUpdater(drone, firmware, window=window).run(DeviceType.Drone)
+    finally:
+        drone.close()
+        bootloader.close()
+    return stats, bootloader
+
+
+def test_clean_link():
+    stats, bootloader = update()
+    assert stats["success"], stats["error"]
+    assert bootloader.verified
+    # nothing is lost, but a busy machine can still delay an answer past the timeout, so resends are allowed
+    assert bootloader.lost == 0
+
+
+def test_lossy_link():
+    stats, bootloader = update(loss=0.1)
+    assert stats["success"], stats["error"]
+    assert bootloader.verified
+    assert bootloader.lost > 0
+
+
+def test_stop_and_wait_on_a_lossy_link():
+    stats, bootloader = update(loss=0.1, window=1)
+    assert stats["success"], stats["error"]
+    assert bootloader.verified
+
+
+def test_timeout_sends_the_window_again():
+    # only one block follows the lost one, so a single duplicate ack comes back and the timeout
+    # has to recover: the block after it was dropped too and must not wait for a timeout of its own
+    stats, bootloader = update(drop=SIZE // BLOCK_SIZE - 2)
+    assert stats["success"], stats["error"]
+    assert bootloader.verified
+    assert stats["timeouts"] == 1 and stats["fast_retransmits"] == 0
@@ -0,0 +1,105 @@
+#Python code
+import time
+from threading import Thread
+
+import pytest
+
+pytest.importorskip("pty")  # the simulator sits on a pseudo terminal
+
+from codrone_edu.protocol import ModeFlight
+
+from command_executor import CommandExecutor
+from fast_drone import FastDrone
+from simulator import Simulator
+from voice_grammar import match_command
+
+
+class RecordingSimulator(Simulator):
+    """Keeps the (forward, left, up) of every ControlPosition move it is sent."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.moves = []
+
+    def _position_move(self, forward, left, up, velocity, heading, rotationalVelocity):
+        self.moves.append((forward, left, up))
+        super()._position_move(forward, left, up, velocity, heading, rotationalVelocity)
+
+
+@pytest.fixture
+def flying():
+    simulator = RecordingSimulator(0.002)
+    drone = FastDrone()
+    drone.pair(simulator.path)
+    drone.takeoff()
+    assert drone.get_state_data()[2] is ModeFlight.Flight
+    yield drone, simulator
+    drone.close()
+    simulator.close()
+
+
+def test_cancel_ends_the_whole_mission(flying):
+    drone, simulator = flying
+    reports = []
+    mission = Thread(target=lambda: reports.append(drone.fly_mission([[0.5, 0], [0.5, 0.5], [0, 0.5]])))
+    mission.start()
+    time.sleep(0.3)  # well into the first leg
+    drone.cancel_motion()
+    mission.join(5)
+
+    assert not mission.is_alive()
+    assert reports[0]["state"] == "cancelled"
+    assert reports[0]["legs"] == 1
+    # the first leg, then only the zero move that holds the drone where it is
+    assert len(simulator.moves) == 2
+    assert simulator.moves[1] == (0.0, 0.0, 0.0)
+    assert not drone.motion_cancelled()
+
+
+def test_land_preempts_a_background_mission(flying):
+    drone, simulator = flying
+    missions = []
+
+    def execute(drone, command_data):
+        if command_data["command"] == "land":
+            drone.land()
+        else:
+            missions.append(drone.fly_mission([[0.5, 0], [0.5, 0.5], [0, 0.5]], wait=False))
+
+    executor = CommandExecutor(drone, execute).start()
+    executor.submit({"command": "mission"})
+    time.sleep(0.3)  # the mission command has returned; its first leg is still flying
+    executor.submit({"command": "land"})
+    assert executor.wait_idle(10)
+    executor.close()
+
+    assert missions[0].wait(5) == "cancelled"
+    # land takes over, so not even a hold move follows the first leg
+    assert len(simulator.moves) == 1
+    assert drone.get_state_data()[2] is ModeFlight.Ready
+
+
+def test_stop_holds_a_long_move(flying):
+    drone, simulator = flying
+
+    def execute(drone, command_data):
+        if command_data["command"] == "stop_moving":
+            drone.hover(0.5)
+        else:
+            drone.move_forward(200, "cm", 0.5)
+
+    executor = CommandExecutor(drone, execute).start()
+    started = time.perf_counter()
+    executor.submit({"command": "move_forward"})
+    time.sleep(0.3)  # a few cm into a four second move
+    executor.submit(match_command("stop"))
+    assert executor.wait_idle(10)
+    executor.close()
+
+    assert [entry["command"] for entry in executor.log] == ["move_forward", "stop_moving"]
+    assert executor.log[0]["preempted"]
+    assert time.perf_counter() - started < 2
+    # the move, then the zero move that holds the drone where the stop caught it
+    assert simulator.moves == [(2.0, 0.0, 0.0), (0.0, 0.0, 0.0)]
+    # stop is not emergency_stop: the motors stay on
+    assert drone.get_state_data()[2] is ModeFlight.Flight
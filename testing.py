@@ -17,12 +17,13 @@
 import asyncio
 import time
 from codrone_edu.drone import *
+from aio_drone import AsyncDrone
 
 async def monitor_position(drone):
     try:
       for i in range(40):
           drone.load_color_data()
-          color_data = drone.get_color_data()
+          color_data = await drone.get_color_data()
           print('sensor data acquired?')
           color = drone.predict_colors(color_data)
           print(color_data)
@@ -37,8 +38,8 @@ async def monitor_position(drone):
 async def main():
     try:
         # Initialize drone
-        drone = Drone()
-        drone.pair()
+        drone = AsyncDrone()
+        await drone.pair()
 
         # Start the monitoring task
         task = asyncio.create_task(monitor_position(drone))
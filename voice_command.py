@@ -7,26 +7,37 @@ import json
 import time
 import threading
 import queue
+import argparse
+from statistics import median
 from dotenv import load_dotenv # Optional: for loading API key from .env file
 
+from voice_grammar import match_command, CommandCache
+from fast_drone import FastDrone
+from command_executor import CommandExecutor
+
 # --- Configuration ---
 load_dotenv() # Load environment variables from .env file if it exists
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
-if not OPENAI_API_KEY:
-    raise ValueError("OpenAI API key not found. Set the OPENAI_API_KEY environment variable.")
-if not OPENAI_BASE_URL:
-    raise ValueError("OpenAI API key not found. Set the OPENAI_BASE_URL environment variable.")
 
-openai.api_key = OPENAI_API_KEY
-openai.base_url = OPENAI_BASE_URL
-client = openai.OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL) # Use the new client
+client = None # created in main, so the pipeline pieces can be imported without a key
+
+RECALIBRATE_EVERY = 30.0 # seconds between ambient noise recalibrations of the open microphone
+AUDIO_EXTENSIONS = (".wav", ".flac", ".aiff", ".aif")
+
 
-print('loaded client.')
+def make_client(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL):
+    if not api_key:
+        raise ValueError("OpenAI API key not found. Set the OPENAI_API_KEY environment variable.")
+    if not base_url:
+        raise ValueError("OpenAI API key not found. Set the OPENAI_BASE_URL environment variable.")
+    openai.api_key = api_key
+    openai.base_url = base_url
+    return openai.OpenAI(api_key=api_key, base_url=base_url) # Use the new client
 
 
 ALLOWED_COMMANDS = [
-    "takeoff", "land", "hover", "emergency_stop",
+    "takeoff", "land", "hover", "stop_moving", "emergency_stop",
     "move_forward", "move_backward", "move_left", "move_right",
     "turn_left", "turn_right", "move_up", "move_down",
     "set_throttle", "set_yaw", "set_roll", "set_pitch",
@@ -54,6 +65,7 @@ def get_drone_command_from_text(text):
         Example 4: User says "stop everything" -> {{"command": "emergency_stop", "parameters": {{}}}}
         Example 5: User says "increase altitude" -> {{"command": "move_up", "parameters": {{"duration": 1.0}}}}
         Example 6: User says "set throttle to 50" -> {{"command": "set_throttle", "parameters": {{"power": 50}}}}
+        Example 7: User says "stop" -> {{"command": "stop_moving", "parameters": {{}}}}
 
         If the command is unclear or not on the allowed list, respond with: {{"command": "unknown", "parameters": {{}}}}
         Do not add any explanations outside the JSON structure.
@@ -107,6 +119,52 @@ def get_drone_command_from_text(text):
         return {"command": "error", "parameters": {}}
 
 
+def interpret_command(text, cache, timing):
+    """Local grammar first, then the cache, then ChatGPT; records which one answered and how long it took."""
+    start = time.perf_counter()
+    command_data = match_command(text)
+    route = "grammar"
+    if command_data is None:
+        command_data = cache.get(text)
+        route = "cache"
+    if command_data is None:
+        command_data = get_drone_command_from_text(text)
+        route = "model"
+        if command_data.get("command") != "error":
+            cache.put(text, command_data)
+
+    timing["route"] = route
+    timing["interpret_ms"] = (time.perf_counter() - start) * 1000
+    return command_data
+
+
+# --- Latency ---
+LATENCY_LOG = [] # one timing dict per utterance
+
+
+def report_latency(timing):
+    """Prints one utterance's stage latencies and keeps them for the summary."""
+    LATENCY_LOG.append(timing)
+    stages = ["{0}={1:.0f}ms".format(name[:-3], timing[name])
+              for name in ("capture_ms", "transcribe_ms", "interpret_ms", "to_execute_ms") if name in timing]
+    print("[latency] {0} via {1}: {2}".format(timing.get("text", ""), timing.get("route", "-"), " ".join(stages)))
+
+
+def latency_summary():
+    """Median of each stage, per route, over every utterance so far."""
+    summary = {}
+    for timing in LATENCY_LOG:
+        summary.setdefault(timing.get("route", "-"), []).append(timing)
+    return {
+        route: dict({"utterances": len(timings)}, **{
+            name: round(median(t[name] for t in timings if name in t), 1)
+            for name in ("capture_ms", "transcribe_ms", "interpret_ms", "to_execute_ms")
+            if any(name in t for t in timings)
+        })
+        for route, timings in summary.items()
+    }
+
+
 # --- Drone Command Execution ---
 def execute_drone_command(drone, command_data):
     """Executes the corresponding CoDrone EDU command."""
@@ -133,6 +191,10 @@ def execute_drone_command(drone, command_data):
             duration = float(params.get("duration", 3.0)) # Default hover 3s
             print(f"Executing: Hover for {duration}s")
             drone.hover(duration)
+        elif command == "stop_moving":
+            # the executor already cancelled the move and sent the hold; keep the motors on
+            print("Executing: Stop moving")
+            drone.hover(0.5)
         elif command == "emergency_stop":
             print("Executing: Emergency Stop")
             drone.emergency_stop()
@@ -168,7 +230,7 @@ def execute_drone_command(drone, command_data):
             power = 50 # Default power for timed turn
             print(f"Executing: Turn Left (timed {duration}s)")
             drone.set_yaw(power * -1)
-            time.sleep(duration)
+            drone.move(duration) # cancellable, unlike time.sleep
             drone.set_yaw(0) # Stop turning
             drone.hover(0.5) # Stabilize
         elif command == "turn_right":
@@ -178,17 +240,22 @@ def execute_drone_command(drone, command_data):
             power = 50
             print(f"Executing: Turn Right (timed {duration}s)")
             drone.set_yaw(power)
-            time.sleep(duration)
+            drone.move(duration)
             drone.set_yaw(0)
             drone.hover(0.5)
         elif command == "move_up":
             duration = float(params.get("duration", 1.0))
             print(f"Executing: Move Up for {duration}s")
-            drone.move_up(duration)
+            # the library has no move_up, so climb on throttle for the duration
+            drone.set_throttle(50)
+            drone.move(duration)
+            drone.set_throttle(0)
         elif command == "move_down":
             duration = float(params.get("duration", 1.0))
             print(f"Executing: Move Down for {duration}s")
-            drone.move_down(duration)
+            drone.set_throttle(-50)
+            drone.move(duration)
+            drone.set_throttle(0)
         elif command == "set_throttle":
             power = int(params.get("power", 0))
             print(f"Executing: Set Throttle to {power}")
@@ -225,14 +292,21 @@ def execute_drone_command(drone, command_data):
 
 
 # --- Speech Recognition Thread ---
-def listen_and_transcribe(recognizer, audio_queue, stop_event):
-    """Listens for audio, transcribes it, and puts text into a queue."""
-    while not stop_event.is_set():
-        print("\nListening for command...")
-        with sr.Microphone() as source:
-            recognizer.adjust_for_ambient_noise(source, duration=0.5) # Adjust for noise
+def listen(recognizer, utterance_queue, stop_event, recalibrate_every=RECALIBRATE_EVERY):
+    """Keeps one microphone stream open and queues each phrase's audio as soon as it ends."""
+    with sr.Microphone() as source:
+        recognizer.adjust_for_ambient_noise(source, duration=0.5) # calibrate once up front
+        calibrated = time.perf_counter()
+
+        while not stop_event.is_set():
+            # refresh the noise level now and then, between phrases, instead of before every one
+            if time.perf_counter() - calibrated > recalibrate_every:
+                recognizer.adjust_for_ambient_noise(source, duration=0.3)
+                calibrated = time.perf_counter()
+
+            print("\nListening for command...")
+            start = time.perf_counter()
             try:
-                # Listen for the first phrase and extract it
                 # Timeout: How long to wait for phrase to start
                 # Phrase time limit: Max duration of a phrase
                 audio = recognizer.listen(source, timeout=5, phrase_time_limit=10)
@@ -240,18 +314,66 @@ def listen_and_transcribe(recognizer, audio_queue, stop_event):
                 print("No speech detected within timeout.")
                 continue # Continue listening
 
+            heard = time.perf_counter()
+            utterance_queue.put((audio, None, {"heard": heard, "capture_ms": (heard - start) * 1000}))
+
+
+def replay_recordings(recognizer, directory, utterance_queue, stop_event):
+    """
+    Queues recorded audio files instead of the microphone, for testing offline.
+
+    A .txt file next to a recording holds its transcript, which then stands in
+    for the speech recognition service.
+    """
+    for filename in sorted(os.listdir(directory)):
         if stop_event.is_set():
             break
+        if not filename.lower().endswith(AUDIO_EXTENSIONS):
+            continue
+
+        path = os.path.join(directory, filename)
+        start = time.perf_counter()
+        with sr.AudioFile(path) as source:
+            audio = recognizer.record(source)
+        transcript_file = os.path.splitext(path)[0] + ".txt"
+        transcript = None
+        if os.path.exists(transcript_file):
+            with open(transcript_file) as f:
+                transcript = f.read().strip()
+
+        heard = time.perf_counter()
+        utterance_queue.put((audio, transcript, {"heard": heard, "capture_ms": (heard - start) * 1000}))
+        time.sleep(0.5) # leave room between utterances like a speaker would
+    utterance_queue.put(None)
+
+
+def transcribe(recognizer, utterance_queue, text_queue, stop_event):
+    """Turns queued audio into text on its own thread, so listening never waits on recognition."""
+    while not stop_event.is_set():
+        try:
+            item = utterance_queue.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        if item is None:
+            text_queue.put(None)
+            break
 
+        audio, transcript, timing = item
+        start = time.perf_counter()
         try:
             print("Got audio, recognizing...")
-            # Use Google Web Speech API for potentially better accuracy (requires internet)
-            text = recognizer.recognize_google(audio)
-            # Alternative: Offline recognition (less accurate, needs setup)
-            # text = recognizer.recognize_sphinx(audio)
+            if transcript is not None:
+                text = transcript
+            else:
+                # Use Google Web Speech API for potentially better accuracy (requires internet)
+                text = recognizer.recognize_google(audio)
+                # Alternative: Offline recognition (less accurate, needs setup)
+                # text = recognizer.recognize_sphinx(audio)
             print(f"You said: {text}")
+            timing["transcribe_ms"] = (time.perf_counter() - start) * 1000
+            timing["text"] = text
             if text:
-                audio_queue.put(text) # Put recognized text into the queue
+                text_queue.put((text, timing)) # Put recognized text into the queue
 
         except sr.UnknownValueError:
             print("Speech Recognition could not understand audio")
@@ -260,31 +382,62 @@ def listen_and_transcribe(recognizer, audio_queue, stop_event):
         except Exception as e:
             print(f"An error occurred during speech recognition: {e}")
 
-        time.sleep(0.1) # Small pause to prevent tight loop on errors
-
 
 # --- Main Execution ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fly a CoDrone EDU with voice commands.")
+    parser.add_argument("--audio", help="replay recordings from this folder instead of the microphone")
+    parser.add_argument("--stub", type=float, metavar="DELAY",
+                        help="answer with a local OpenAI-compatible stub that takes DELAY seconds per request")
+    parser.add_argument("--dry-run", action="store_true", help="print commands instead of flying")
+    parser.add_argument("--recalibrate", type=float, default=RECALIBRATE_EVERY,
+                        help="seconds between ambient noise recalibrations")
+    args = parser.parse_args()
+
+    stub = None
+    if args.stub is not None:
+        from voice_stub import StubChatServer
+        stub = StubChatServer(delay=args.stub).start()
+        client = make_client("stub", stub.base_url)
+    else:
+        client = make_client()
+    print('loaded client.')
+
     # drone = codrone_edu.CoDrone()
-    drone = Drone()
+    drone = None if args.dry_run else FastDrone()
+    executor = None
     is_flying = False
+    utterance_queue = queue.Queue() # audio from the listener, waiting to be recognized
     command_queue = queue.Queue() # Queue for commands from listening thread
     stop_listening = threading.Event()
+    cache = CommandCache()
+    listener_thread = None
 
     try:
-        print("Attempting to pair with CoDrone EDU...")
-        drone.pair()
-        print("Paired successfully!")
+        if drone is not None:
+            print("Attempting to pair with CoDrone EDU...")
+            drone.pair()
+            print("Paired successfully!")
 
         # Initialize recognizer
         r = sr.Recognizer()
         # Optional: Adjust energy threshold if mic is too sensitive/insensitive
         # r.energy_threshold = 4000
 
-        # Start the listening thread
-        listener_thread = threading.Thread(target=listen_and_transcribe, args=(r, command_queue, stop_listening))
+        # Start the listening and recognition threads
+        if args.audio:
+            listener_thread = threading.Thread(target=replay_recordings, args=(r, args.audio, utterance_queue, stop_listening))
+        else:
+            listener_thread = threading.Thread(target=listen, args=(r, utterance_queue, stop_listening, args.recalibrate))
         listener_thread.daemon = True # Allows main program to exit even if thread is running
         listener_thread.start()
+        transcriber_thread = threading.Thread(target=transcribe, args=(r, utterance_queue, command_queue, stop_listening))
+        transcriber_thread.daemon = True
+        transcriber_thread.start()
+
+        # commands fly on their own thread, so a spoken stop or land can cut a move short
+        executor = CommandExecutor(drone, execute_drone_command if drone is not None else
+                                   lambda drone, command_data: print(f"Dry run: {command_data}")).start()
 
         print("\nSetup complete. Ready for voice commands.")
         print("Say 'take off' to start flying.")
@@ -294,11 +447,14 @@ if __name__ == "__main__":
         while True:
             try:
                 # Wait for a command from the listener thread (with timeout)
-                transcribed_text = command_queue.get(timeout=1.0) # Check queue every second
+                item = command_queue.get(timeout=1.0) # Check queue every second
+                if item is None:
+                    break # recordings finished
 
+                transcribed_text, timing = item
                 if transcribed_text:
-                    # Get structured command from ChatGPT
-                    command_data = get_drone_command_from_text(transcribed_text)
+                    # Local grammar, cache, or ChatGPT
+                    command_data = interpret_command(transcribed_text, cache, timing)
 
                     # Update flying state BEFORE executing potentially blocking commands
                     command_name = command_data.get("command")
@@ -307,8 +463,11 @@ if __name__ == "__main__":
                     elif command_name in ["land", "emergency_stop"]:
                         is_flying = False
 
-                    # Execute the command
-                    execute_drone_command(drone, command_data)
+                    timing["to_execute_ms"] = (time.perf_counter() - timing["heard"]) * 1000
+                    report_latency(timing)
+
+                    # Queue the command; emergency_stop and land preempt whatever is flying
+                    executor.submit(command_data)
 
                     # If a set_* command was used, hover briefly to let it take effect?
                     # Optional, might interfere with continuous control
@@ -335,10 +494,18 @@ if __name__ == "__main__":
     finally:
         print("Shutting down...")
         stop_listening.set() # Signal the listener thread to stop
-        if listener_thread.is_alive():
+        if executor is not None:
+            executor.close(cancel=not args.audio) # finish replayed recordings, cut live flying short
+            print("Executor:", json.dumps(executor.stats(), indent=2))
+        if listener_thread is not None and listener_thread.is_alive():
              listener_thread.join(timeout=2) # Wait briefly for thread cleanup
 
-        if drone.is_connected():
+        print("Latency by route (median ms):", json.dumps(latency_summary(), indent=2))
+        print(f"Cache: {len(cache)} entries, {cache.hits} hits, {cache.misses} misses")
+        if stub is not None:
+            stub.stop()
+
+        if drone is not None and drone.is_connected():
             if is_flying: # Check if drone THINKS it's flying
                  print("Landing drone before closing...")
                  try:
@@ -353,4 +520,4 @@ if __name__ == "__main__":
 
             print("Closing drone connection.")
             drone.close()
-        print("Program finished.")
\ No newline at end of file
+        print("Program finished.")
@@ -0,0 +1,146 @@
+#Python code
+import re
+from collections import OrderedDict
+
+
+# words that never change which command was meant
+FILLER = {"please", "drone", "the", "a", "can", "you", "now", "go", "ahead", "and", "then", "for", "by", "to", "of"}
+
+NUMBERS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+    "nine": 9, "ten": 10, "fifteen": 15, "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50,
+    "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90, "hundred": 100, "half": 0.5,
+}
+
+UNITS = {
+    "cm": "cm", "centimeter": "cm", "centimeters": "cm", "centimetre": "cm", "centimetres": "cm",
+    "m": "m", "meter": "m", "meters": "m", "metre": "m", "metres": "m",
+    "ft": "ft", "foot": "ft", "feet": "ft",
+    "in": "in", "inch": "in", "inches": "in",
+}
+
+SECONDS = {"s", "sec", "secs", "second", "seconds"}
+
+# phrase (after normalize) -> command; checked longest first
+PHRASES = {
+    "emergency stop": "emergency_stop", "stop everything": "emergency_stop", "kill": "emergency_stop",
+    "abort": "emergency_stop",
+    # a bare "stop" in flight means stop moving, not cut the motors
+    "stop": "stop_moving", "stop moving": "stop_moving", "freeze": "stop_moving",
+    "take off": "takeoff", "takeoff": "takeoff", "lift off": "takeoff", "launch": "takeoff",
+    "land": "land", "touch down": "land", "come down": "land",
+    "hover": "hover", "stay": "hover", "hold": "hover",
+    "flip": "flip", "spiral": "spiral",
+    "move forward": "move_forward", "forward": "move_forward", "fly forward": "move_forward",
+    "move backward": "move_backward", "backward": "move_backward", "back": "move_backward", "fly backward": "move_backward",
+    "move left": "move_left", "left": "move_left", "fly left": "move_left",
+    "move right": "move_right", "right": "move_right", "fly right": "move_right",
+    "turn left": "turn_left", "rotate left": "turn_left",
+    "turn right": "turn_right", "rotate right": "turn_right",
+    "move up": "move_up", "up": "move_up", "ascend": "move_up", "increase altitude": "move_up", "higher": "move_up",
+    "move down": "move_down", "down": "move_down", "descend": "move_down", "decrease altitude": "move_down", "lower": "move_down",
+    "set throttle": "set_throttle", "throttle": "set_throttle",
+    "set yaw": "set_yaw", "yaw": "set_yaw",
+    "set roll": "set_roll", "roll": "set_roll",
+    "set pitch": "set_pitch", "pitch": "set_pitch",
+}
+
+DISTANCE_COMMANDS = {"move_forward", "move_backward", "move_left", "move_right"}
+DURATION_COMMANDS = {"turn_left", "turn_right", "move_up", "move_down", "hover"}
+POWER_COMMANDS = {"set_throttle", "set_yaw", "set_roll", "set_pitch"}
+
+
+def normalize(text):
+    """Lowercase words with punctuation and filler dropped; also the cache key."""
+    text = re.sub(r"(?<=[a-z])-(?=[a-z])", " ", text.lower())
+    words = re.findall(r"-?\d+(?:\.\d+)?|[a-z]+", text)
+    return " ".join(word for word in words if word not in FILLER)
+
+
+def _number(word):
+    if word in NUMBERS:
+        return NUMBERS[word]
+    try:
+        return float(word)
+    except ValueError:
+        return None
+
+
+def match_command(text):
+    """
+    Command dict for the common phrasings of ALLOWED_COMMANDS, or None to ask the model.
+
+    Only whole utterances that are a known phrase plus an optional number and
+    unit match, so anything unusual still goes to the model.
+    """
+    words = normalize(text).split()
+    if not words:
+        return None
+
+    for length in (2, 1):
+        command = PHRASES.get(" ".join(words[:length]))
+        if command is not None:
+            rest = words[length:]
+            break
+    else:
+        return None
+
+    sign = 1
+    if rest and rest[0] in ("minus", "negative"):
+        sign = -1
+        rest = rest[1:]
+
+    parameters = {}
+    if rest:
+        value = _number(rest[0])
+        if value is None:
+            return None
+        unit = rest[1] if len(rest) > 1 else None
+        if len(rest) > 2:
+            return None
+        value = sign * value
+
+        if command in DISTANCE_COMMANDS and unit in UNITS:
+            # without a unit "forward 2" could mean metres as well as cm, so the model decides
+            parameters = {"distance": float(value), "unit": UNITS[unit]}
+        elif command in DURATION_COMMANDS and (unit is None or unit in SECONDS):
+            parameters = {"duration": float(value)}
+        elif command in POWER_COMMANDS and unit is None:
+            parameters = {"power": int(value)}
+        else:
+            return None
+    elif command in POWER_COMMANDS:
+        # a power change without a value is ambiguous
+        return None
+
+    return {"command": command, "parameters": parameters}
+
+
+class CommandCache:
+    """LRU of normalized transcript -> command dict for answers that came from the model."""
+
+    def __init__(self, size=256):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, text):
+        key = normalize(text)
+        command = self._entries.get(key)
+        if command is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return {"command": command["command"], "parameters": dict(command["parameters"])}
+
+    def put(self, text, command):
+        key = normalize(text)
+        self._entries[key] = {"command": command["command"], "parameters": dict(command.get("parameters", {}))}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
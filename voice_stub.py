@@ -0,0 +1,82 @@
+#Python code
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from voice_grammar import match_command
+
+
+class StubChatServer:
+    """
+    Minimal OpenAI-compatible /chat/completions server for running voice_command.py offline.
+
+    It answers with the local grammar's command (or "unknown") after delay seconds,
+    so the model round trip and the cache can be measured without a network.
+    """
+
+    def __init__(self, port=0, delay=0.8, responses=None):
+        """
+        :param port: 0 picks a free port
+        :param delay: seconds each completion takes, standing in for the model
+        :param responses: optional transcript -> command dict overrides
+        """
+        self.delay = delay
+        self.responses = responses or {}
+        self.requests = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return "http://127.0.0.1:{0}/v1/".format(self._server.server_address[1])
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def answer(self, text):
+        command = self.responses.get(text) or match_command(text) or {"command": "unknown", "parameters": {}}
+        return json.dumps(command)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.rstrip("/").endswith("chat/completions"):
+                    self.send_error(404)
+                    return
+
+                stub.requests += 1
+                time.sleep(stub.delay)
+                text = body.get("messages", [{}])[-1].get("content", "")
+                reply = json.dumps({
+                    "id": "chatcmpl-stub-{0}".format(stub.requests),
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "stub"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": stub.answer(text)},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                }).encode()
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(reply)))
+                self.end_headers()
+                self.wfile.write(reply)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler